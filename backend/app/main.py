@@ -1,157 +1,839 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Blueprint, Flask, Response, render_template, request, jsonify, stream_with_context
+import json
 import os
-import pandas as pd
 from datetime import datetime
-from services.extract_signals import extract_signals_from_channel
-from services.plot_backtest_stats import (
-    get_equity_curve_data,
-    get_win_loss_data,
-    get_gain_distribution_data,
-    get_drawdown_distribution_data,
-    get_coin_performance_data
-)
-
-app = Flask(__name__, static_folder="static", template_folder="templates")
-
-# Directory for storing session CSVs
+from services import telemetry
+
+# Service modules are imported inside the functions that use them, so importing this
+# module or starting a worker that only serves charts never loads Telethon, the Binance
+# client or the optimizers, and reads no credentials. create_app() builds the app.
+
 APP_ROOT = os.path.dirname(os.path.abspath(__file__))
-SESSIONS_DIR = os.path.join(APP_ROOT, "data", "sessions")
+DATA_DIR = os.path.join(APP_ROOT, "data")
 REQUIRED_COLUMNS = ['timestamp', 'coin', 'direction', 'raw_message']
 
-def list_sessions():
-    sessions = []
-    print("Looking for sessions in:", SESSIONS_DIR)
-    print("Files found:", os.listdir(SESSIONS_DIR))
-    if not os.path.exists(SESSIONS_DIR):
-        os.makedirs(SESSIONS_DIR)
-    for fname in os.listdir(SESSIONS_DIR):
-        if fname.endswith(".csv"):
-            fpath = os.path.join(SESSIONS_DIR, fname)
-            stat = os.stat(fpath)
-            sessions.append({
-                "name": fname.replace(".csv", ""),
-                "created": stat.st_ctime,
-                "modified": stat.st_mtime,
-                "path": fpath
-            })
-    sessions.sort(key=lambda x: x["modified"], reverse=True)
-    print("Sessions found:", [s["name"] for s in sessions])
-    return sessions
-
-@app.template_filter('datetimeformat')
+routes = Blueprint("routes", __name__)
+
+# Storage, chart cache and job workers, set up by create_app()
+session_catalog = None
+session_store = None
+session_cache = None
+jobs = None
+
+# Current live tracking session (at most one), see /api/live
+live = None
+
+def create_app(data_dir=DATA_DIR, sync_catalog=True):
+    """
+    Builds the Flask app: sessions under data_dir/sessions (Parquet when pyarrow is installed,
+    CSV otherwise), their SQLite catalog, the chart cache and the job workers.
+    Telegram and Binance clients are only created when a job or route first needs them.
+    """
+    global session_catalog, session_store, session_cache, jobs
+    from services.jobs import JobManager
+    from services.session_cache import SessionCache
+    from services.session_catalog import SessionCatalog
+    from services.session_storage import SessionStore
+
+    sessions_dir = os.path.join(data_dir, "sessions")
+    os.makedirs(sessions_dir, exist_ok=True)
+    # Indexed listing of the sessions directory, kept current by session_store.write()
+    session_catalog = SessionCatalog(os.path.join(data_dir, "sessions.sqlite3"))
+    session_store = SessionStore(sessions_dir, catalog=session_catalog)
+    if sync_catalog:
+        session_catalog.sync(session_store)
+
+    # Parsed sessions and chart payloads, invalidated when a session file changes
+    session_cache = SessionCache()
+
+    # Background workers for extraction, enrichment and optimization
+    jobs = JobManager(os.path.join(data_dir, "jobs.sqlite3"))
+    for kind, handler in JOB_HANDLERS.items():
+        jobs.register(kind, handler)
+
+    app = Flask(__name__, static_folder="static", template_folder="templates")
+    telemetry.install(app)
+    telemetry.registry.add_collector(lambda: {f"session_cache_{k}": v for k, v in session_cache.stats().items()})
+    app.register_blueprint(routes)
+    return app
+
+def __getattr__(name):
+    # Keeps `main.app` (e.g. `flask --app main run`) working: the app is built on first access
+    if name == "app":
+        app = globals()["app"] = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def load_session(session_name, columns=None):
+    """Returns the (cached) session DataFrame, or None if the session does not exist."""
+    session_path = session_store.path(session_name)
+    if session_path is None:
+        return None
+    return session_cache.load(session_path, session_store.read_path, columns)
+
+def chart_response(session_name, builder, columns=None, **params):
+    """Returns the cached chart payload for a session, or a 404 if it does not exist."""
+    session_path = session_store.path(session_name)
+    if session_path is None:
+        return jsonify({"error": "Session not found."}), 404
+    timed_builder = telemetry.timer("chart_compute_seconds", chart=builder.__name__)(builder)
+    payload = session_cache.payload(session_path, builder.__name__, timed_builder, session_store.read_path, columns, **params)
+    return jsonify(payload)
+
+def stream_params():
+    """Reads offset/limit/columns/batch_size/format query parameters for streaming endpoints."""
+    columns = request.args.get("columns")
+    limit = request.args.get("limit")
+    return {
+        "offset": int(request.args.get("offset", 0)),
+        "limit": int(limit) if limit else None,
+        "columns": columns.split(",") if columns else None,
+        "batch_size": int(request.args.get("batch_size", 10_000)),
+        "format": request.args.get("format", "json"),
+    }
+
+def value_list(params, name, cast=float, choices=None):
+    """
+    Reads a list parameter given as a JSON array or a comma-separated form value ("1,2,3").
+    Returns None when absent or empty; raises ValueError naming the parameter on bad input.
+    """
+    value = params.get(name)
+    if value is None or value == "" or value == []:
+        return None
+    items = value.split(",") if isinstance(value, str) else value
+    if not isinstance(items, list):
+        raise ValueError(f"{name} must be a list or a comma-separated string.")
+    try:
+        values = [cast(item.strip() if isinstance(item, str) else item) for item in items]
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} has an invalid value: {value!r}") from None
+    if choices is not None and any(v not in choices for v in values):
+        raise ValueError(f"{name} values must be among {', '.join(choices)}.")
+    return values
+
+def streamed(chunks, fmt="json"):
+    mimetype = "application/x-ndjson" if fmt == "ndjson" else "application/json"
+    return Response(stream_with_context(chunks), mimetype=mimetype)
+
+def list_sessions(**filters):
+    """Sessions from the catalog, newest first unless filters say otherwise."""
+    return session_catalog.list(**filters)
+
+def flag(value):
+    return None if value in (None, "") else value.lower() in ("1", "true", "yes", "on")
+
+@routes.app_template_filter('datetimeformat')
 def datetimeformat(value):
     """Format timestamps for display in templates."""
     return datetime.fromtimestamp(value).strftime('%Y-%m-%d %H:%M')
 
 # --- Navigation Routes ---
 
-@app.route("/")
+@routes.route("/")
 def home():
     sessions = list_sessions()
     return render_template("index.html", sessions=sessions)
 
-@app.route("/working")
+@routes.route("/working")
 def working():
     sessions = list_sessions()
     return render_template("working.html", sessions=sessions)
 
-@app.route("/analysis")
+@routes.route("/analysis")
 def analysis():
     sessions = list_sessions()
     return render_template("analysis.html", sessions=sessions)
 
+# --- Background jobs ---
+
+def run_extraction(ctx, channels, months_back, session_name=None, incremental=False):
+    """Scrapes channels concurrently with the shared Telegram client into one channel-tagged session."""
+    from services.incremental_extraction import append_signals, load_high_water_mark, new_signals, save_high_water_mark
+    from services.telegram_pool import shared_pool
+    session_name = session_name or f"session_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+
+    existing_df = load_session(session_name) if incremental else None
+    appended = None
+    for channel in channels:
+        channel["min_id"] = load_high_water_mark(session_name, channel["channel_id"]) if existing_df is not None else 0
+    signals_df, newest, errors = shared_pool().extract_channels(
+        channels, months_back, progress=lambda scanned: ctx.progress(scanned, message="messages scanned")
+    )
+    if errors and not newest:
+        raise RuntimeError("; ".join(f"{channel_id}: {error}" for channel_id, error in errors.items()))
+    result = {"session_name": session_name, "channels": len(channels), "errors": errors}
+    if existing_df is not None:
+        if signals_df.empty:
+            for channel_id, newest_id in newest.items():
+                save_high_water_mark(session_name, channel_id, newest_id)
+            return {"message": "No new signals since last extraction.", **result}
+        appended = new_signals(existing_df, signals_df)
+        signals_df = append_signals(existing_df, signals_df)
+    if signals_df is None or signals_df.empty:
+        raise ValueError("No signals extracted.")
+    session_store.write(session_name, signals_df, appended=appended)
+    # Marks move only after the session is saved, so a failed write gets rescanned
+    for channel_id, newest_id in newest.items():
+        save_high_water_mark(session_name, channel_id, newest_id)
+    return {"message": "Signals extracted and session saved.", "rows": len(signals_df), **result}
+
+def run_enrichment(ctx, session_name, lookahead_minutes=60 * 6):
+    from services.add_prices_to_signals import enrich_signals
+    signals_df = load_session(session_name)
+    if signals_df is None:
+        raise ValueError("Session not found.")
+    enriched_df = enrich_signals(
+        signals_df, lookahead_minutes=lookahead_minutes,
+        progress=lambda done, total: ctx.progress(done, total, "kline chunks downloaded")
+    )
+    if enriched_df.empty:
+        raise ValueError("No price data found for this session.")
+    enriched_name = f"{session_name}_priced"
+    session_store.write(enriched_name, enriched_df)
+    return {"message": "Signals enriched with price data.", "session_name": enriched_name, "rows": len(enriched_df)}
+
+def with_horizon_columns(df, lookahead_values):
+    """Adds gain_pct_{h}/drawdown_pct_{h} from the stored candles and keeps the signals that have them."""
+    import numpy as np
+    import pandas as pd
+    from services.add_prices_to_signals import candle_store
+    from services.path_simulation import build_candle_arrays, horizon_columns
+    arrays = build_candle_arrays(df, candle_store, max(lookahead_values))
+    has_path = ~np.isnan(arrays["entry_price"])
+    if not has_path.any():
+        raise ValueError("No stored candles for this session; enrich it first.")
+    return pd.concat([df, horizon_columns(df, arrays, lookahead_values)], axis=1)[has_path].reset_index(drop=True)
+
+# One result schema for both optimization paths, so the frontend always gets the same keys
+OPTIMIZATION_COLUMNS = ['SL%', 'TP%', 'Risk %', 'Lookahead', 'Direction', 'Trades', 'Final Balance',
+                        'Total Return %', 'Max Drawdown %']
+
+def run_optimization(ctx, session_name, sl_values=None, tp_values=None, risk_per_trade=0.01, risk_values=None,
+                     lookahead_values=None, directions=None, processes=None, top_n=20):
+    """
+    SL/TP grid search. With processes > 1 or a direction filter the grid is split across a
+    process pool (services.sweep), streaming progress and stopping early on cancel;
+    otherwise it runs in-process with optimize_strategy.
+    """
+    from services.optimize_strategy import optimize_strategy, trade_arrays
+    df = load_session(session_name, ['timestamp', 'coin', 'direction', 'gain_pct', 'drawdown_pct'])
+    if df is None:
+        raise ValueError("Session not found.")
+    if lookahead_values:
+        df = with_horizon_columns(df, lookahead_values)
+    ctx.check_cancelled()
+    if (processes and processes > 1) or directions:
+        from services.sweep import sweep_to_frame
+        result_df = sweep_to_frame(
+            df,
+            sl_values or [1, 1.5, 2, 2.5, 3],
+            tp_values or [3, 4.5, 5, 6, 7],
+            risk_values=risk_values or [risk_per_trade],
+            lookahead_values=lookahead_values or [None],
+            directions=directions or ["all"],
+            processes=processes,
+            progress=lambda done, total: ctx.progress(done, total, "grid points evaluated"),
+            cancel_event=ctx.cancel_event
+        )
+        ctx.check_cancelled()
+        return result_df[OPTIMIZATION_COLUMNS].head(top_n).to_dict(orient="records")
+    result_df = optimize_strategy(
+        df,
+        sl_values=sl_values or [1, 1.5, 2, 2.5, 3],
+        tp_values=tp_values or [3, 4.5, 5, 6, 7],
+        risk_per_trade=risk_per_trade,
+        risk_values=risk_values or None,
+        lookahead_values=lookahead_values or None,
+        output_dir=None
+    )
+    # optimize_strategy only adds the columns of the dimensions it was given
+    if 'Risk %' not in result_df.columns:
+        result_df['Risk %'] = risk_per_trade * 100
+    if 'Lookahead' not in result_df.columns:
+        result_df['Lookahead'] = None
+    trades = {}
+    for h in result_df['Lookahead'].unique():
+        suffix = "" if h is None else f"_{h}"
+        trades[h] = len(trade_arrays(df, f"gain_pct{suffix}", f"drawdown_pct{suffix}")[0])
+    result_df['Direction'] = "all"
+    result_df['Trades'] = [trades[h] for h in result_df['Lookahead']]
+    return result_df[OPTIMIZATION_COLUMNS].head(top_n).to_dict(orient="records")
+
+def run_walk_forward(ctx, session_name, sl_values=None, tp_values=None, risk_values=None,
+                     train_days=30, test_days=7, step_days=None, anchored=False):
+    from services.walk_forward import walk_forward
+    df = load_session(session_name, ['timestamp', 'direction', 'gain_pct', 'drawdown_pct'])
+    if df is None:
+        raise ValueError("Session not found.")
+    ctx.check_cancelled()
+    result_df = walk_forward(
+        df,
+        sl_values=sl_values or [1, 1.5, 2, 2.5, 3],
+        tp_values=tp_values or [3, 4.5, 5, 6, 7],
+        risk_values=risk_values or [0.01],
+        train_days=train_days,
+        test_days=test_days,
+        step_days=step_days,
+        anchored=anchored
+    )
+    for col in ['Train Start', 'Test Start', 'Test End']:
+        if col in result_df:
+            result_df[col] = result_df[col].astype(str)
+    return result_df.to_dict(orient="records")
+
+def run_monte_carlo(ctx, session_name, n_paths=10_000, method="bootstrap", risk_per_trade=0.01,
+                    ruin_pct=50, sl=None, tp=None, seed=None):
+    from services.monte_carlo import monte_carlo, session_trades
+    df = load_session(session_name, ['direction', 'gain_pct', 'drawdown_pct'])
+    if df is None:
+        raise ValueError("Session not found.")
+    return monte_carlo(
+        session_trades(df, sl, tp),
+        n_paths=n_paths,
+        method=method,
+        risk_per_trade=risk_per_trade,
+        ruin_pct=ruin_pct,
+        seed=seed,
+        progress=lambda done, total: ctx.progress(done, total, "path chunks simulated")
+    )
+
+def run_portfolio(ctx, session_name, risk_per_trade=0.01, initial_balance=1000, max_positions=None,
+                  max_coin_exposure=None, max_exposure=1.0, hold_minutes=60 * 6, mark_to_market=False):
+    from services.portfolio import path_marks, portfolio_backtest
+    df = load_session(session_name)
+    if df is None:
+        raise ValueError("Session not found.")
+    if 'gain_pct' not in df.columns:
+        raise ValueError("Session has no backtest results (gain_pct).")
+    marks = None
+    if mark_to_market:
+        # Open positions are valued at every event from the stored candle paths
+        from services.add_prices_to_signals import candle_store
+        from services.path_simulation import build_candle_arrays
+        ctx.progress(0, len(df), "loading candle paths")
+        marks = path_marks(df, build_candle_arrays(df, candle_store, hold_minutes))
+    return portfolio_backtest(
+        df,
+        risk_per_trade=risk_per_trade,
+        initial_balance=initial_balance,
+        max_positions=max_positions,
+        max_coin_exposure=max_coin_exposure,
+        max_exposure=max_exposure,
+        hold_minutes=hold_minutes,
+        marks=marks,
+        progress=lambda done, total: ctx.progress(done, total, "signals processed")
+    )
+
+DEFAULT_EXIT_MODELS = {
+    "fixed": {"sl": [0.02, 0.05], "tp": [0.05, 0.10, 0.15]},
+    "breakeven": {"sl": [0.02, 0.05], "tp": [0.10, 0.15], "trigger": [0.02, 0.05]},
+    "ladder": {"sl": [0.02, 0.05], "breakeven_after": [0, 1]},
+    "trailing": {"sl": [0.05], "trail": [0.01, 0.02, 0.03]},
+    "atr_trailing": {"sl": [0.05], "atr_mult": [2.0, 3.0, 4.0]},
+}
+
+def run_exit_sweep(ctx, session_name, models=None, risk_values=None, time_stops=None,
+                   lookahead_minutes=60 * 6, top_n=20):
+    import numpy as np
+    from services.add_prices_to_signals import candle_store
+    from services.exit_models import sweep_exit_models
+    from services.path_simulation import build_candle_arrays, direction_sign
+    df = load_session(session_name, ['timestamp', 'coin', 'direction'])
+    if df is None:
+        raise ValueError("Session not found.")
+    arrays = build_candle_arrays(df, candle_store, lookahead_minutes)
+    has_path = ~np.isnan(arrays["entry_price"])
+    if not has_path.any():
+        raise ValueError("No stored candles for this session; enrich it first.")
+    results = sweep_exit_models(
+        arrays["entry_price"][has_path], direction_sign(df['direction'])[has_path],
+        arrays["high"][has_path], arrays["low"][has_path], arrays["close"][has_path],
+        models or DEFAULT_EXIT_MODELS,
+        risk_values=risk_values or [0.01],
+        time_stops=time_stops or [None],
+        progress=lambda done, total: ctx.progress(done, total, "signal chunks simulated")
+    )
+    return {"results": results.head(top_n).to_dict(orient="records"), "combinations": len(results)}
+
+JOB_HANDLERS = {
+    "extract": run_extraction,
+    "enrich": run_enrichment,
+    "optimize": run_optimization,
+    "walk_forward": run_walk_forward,
+    "monte_carlo": run_monte_carlo,
+    "portfolio": run_portfolio,
+    "exit_sweep": run_exit_sweep,
+}
+
+def job_accepted(job_id):
+    return jsonify({"message": "Job submitted.", "job_id": job_id, "status_url": f"/api/jobs/{job_id}"}), 202
+
 # --- API Endpoints ---
 
-@app.route("/api/extract_signals", methods=["POST"])
+@routes.route("/api/extract_signals", methods=["POST"])
 def extract_signals_api():
     try:
-        channel_id = int(request.form["channel_id"])
-        access_hash = int(request.form["access_hash"])
-        months_back = int(request.form["months_back"])
-        session_name = request.form.get("session_name")
-        # Use a unique session name for Telethon session file
-        telethon_session = f"session_{datetime.now().strftime('%Y%m%d_%H%M%S')}" if not session_name else session_name
-
-        signals_df = extract_signals_from_channel(channel_id, access_hash, months_back, session_name=telethon_session)
-        if signals_df is None or signals_df.empty:
-            return jsonify({"error": "No signals extracted."}), 400
-        session_path = os.path.join(SESSIONS_DIR, f"{telethon_session}.csv")
-        signals_df.to_csv(session_path, index=False)
-        return jsonify({"message": "Signals extracted and session saved.", "session_name": telethon_session})
+        job_id = jobs.submit(
+            "extract",
+            channels=[{"channel_id": int(request.form["channel_id"]), "access_hash": int(request.form["access_hash"])}],
+            months_back=int(request.form["months_back"]),
+            session_name=request.form.get("session_name") or None,
+            incremental=request.form.get("incremental") in ("1", "true", "on")
+        )
+        return job_accepted(job_id)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@routes.route("/api/extract_channels", methods=["POST"])
+def extract_channels_api():
+    """
+    JSON body: {"channels": [{"channel_id", "access_hash", "patterns" (optional)}, ...], "months_back",
+    "session_name", "incremental"}. patterns opts a channel into extra message formats, e.g. ["hashtag", "long_short"].
+    """
+    from services.signal_parser import patterns_for
+    try:
+        params = request.get_json(silent=True) or {}
+        channels = []
+        for c in params.get("channels", []):
+            channel = {"channel_id": int(c["channel_id"]), "access_hash": int(c["access_hash"])}
+            if c.get("patterns"):
+                patterns_for(c["patterns"])
+                channel["patterns"] = list(c["patterns"])
+            channels.append(channel)
+        if not channels:
+            return jsonify({"error": "channels must list at least one {channel_id, access_hash}."}), 400
+        job_id = jobs.submit(
+            "extract",
+            channels=channels,
+            months_back=int(params["months_back"]),
+            session_name=params.get("session_name") or None,
+            incremental=bool(params.get("incremental", False))
+        )
+        return job_accepted(job_id)
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@routes.route("/api/enrich_signals", methods=["POST"])
+def enrich_signals_api():
+    try:
+        session_name = request.form["session_name"]
+        if not session_store.exists(session_name):
+            return jsonify({"error": "Session not found."}), 404
+        job_id = jobs.submit(
+            "enrich",
+            session_name=session_name,
+            lookahead_minutes=int(request.form.get("lookahead_minutes", 60 * 6))
+        )
+        return job_accepted(job_id)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@routes.route("/api/optimize", methods=["POST"])
+def optimize_api():
+    try:
+        params = request.get_json(silent=True) or request.form.to_dict()
+        session_name = params["session_name"]
+        if not session_store.exists(session_name):
+            return jsonify({"error": "Session not found."}), 404
+        job_id = jobs.submit(
+            "optimize",
+            session_name=session_name,
+            sl_values=value_list(params, "sl_values"),
+            tp_values=value_list(params, "tp_values"),
+            risk_per_trade=float(params.get("risk_per_trade", 0.01)),
+            risk_values=value_list(params, "risk_values"),
+            lookahead_values=value_list(params, "lookahead_values", int),
+            directions=value_list(params, "directions", str.lower, ("all", "bullish", "bearish")),
+            processes=int(params["processes"]) if params.get("processes") else None,
+            top_n=int(params.get("top_n", 20))
+        )
+        return job_accepted(job_id)
+    except (KeyError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@app.route("/api/sessions")
+@routes.route("/api/walk_forward", methods=["POST"])
+def walk_forward_api():
+    try:
+        params = request.get_json(silent=True) or request.form.to_dict()
+        session_name = params["session_name"]
+        if not session_store.exists(session_name):
+            return jsonify({"error": "Session not found."}), 404
+        job_id = jobs.submit(
+            "walk_forward",
+            session_name=session_name,
+            sl_values=value_list(params, "sl_values"),
+            tp_values=value_list(params, "tp_values"),
+            risk_values=value_list(params, "risk_values"),
+            train_days=float(params.get("train_days", 30)),
+            test_days=float(params.get("test_days", 7)),
+            step_days=float(params["step_days"]) if params.get("step_days") else None,
+            anchored=params.get("anchored") in (True, "1", "true", "on")
+        )
+        return job_accepted(job_id)
+    except (KeyError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@routes.route("/api/monte_carlo/<session_name>", methods=["POST"])
+def monte_carlo_api(session_name):
+    try:
+        if not session_store.exists(session_name):
+            return jsonify({"error": "Session not found."}), 404
+        params = request.get_json(silent=True) or request.form.to_dict()
+        job_id = jobs.submit(
+            "monte_carlo",
+            session_name=session_name,
+            n_paths=int(params.get("n_paths", 10_000)),
+            method=params.get("method", "bootstrap"),
+            risk_per_trade=float(params.get("risk_per_trade", 0.01)),
+            ruin_pct=float(params.get("ruin_pct", 50)),
+            sl=float(params["sl"]) if params.get("sl") is not None else None,
+            tp=float(params["tp"]) if params.get("tp") is not None else None,
+            seed=int(params["seed"]) if params.get("seed") is not None else None
+        )
+        return job_accepted(job_id)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@routes.route("/api/portfolio/<session_name>", methods=["POST"])
+def portfolio_api(session_name):
+    """
+    Portfolio backtest with overlapping positions: max_positions, max_coin_exposure and max_exposure caps.
+    mark_to_market values open positions from the stored candles instead of at cost.
+    """
+    try:
+        if not session_store.exists(session_name):
+            return jsonify({"error": "Session not found."}), 404
+        params = request.get_json(silent=True) or request.form.to_dict()
+        job_id = jobs.submit(
+            "portfolio",
+            session_name=session_name,
+            risk_per_trade=float(params.get("risk_per_trade", 0.01)),
+            initial_balance=float(params.get("initial_balance", 1000)),
+            max_positions=int(params["max_positions"]) if params.get("max_positions") else None,
+            max_coin_exposure=float(params["max_coin_exposure"]) if params.get("max_coin_exposure") else None,
+            max_exposure=float(params.get("max_exposure", 1.0)),
+            hold_minutes=int(params.get("hold_minutes", 60 * 6)),
+            mark_to_market=params.get("mark_to_market") in (True, "1", "true", "on")
+        )
+        return job_accepted(job_id)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@routes.route("/api/exit_sweep/<session_name>", methods=["POST"])
+def exit_sweep_api(session_name):
+    """
+    Sweeps exit models over the session's stored candle paths. JSON body: models
+    ({model: {param: [values]}}, defaults to DEFAULT_EXIT_MODELS), risk_values,
+    time_stops (candles, null = none), lookahead_minutes, top_n.
+    """
+    try:
+        if not session_store.exists(session_name):
+            return jsonify({"error": "Session not found."}), 404
+        params = request.get_json(silent=True) or {}
+        job_id = jobs.submit(
+            "exit_sweep",
+            session_name=session_name,
+            models=params.get("models"),
+            risk_values=params.get("risk_values"),
+            time_stops=params.get("time_stops"),
+            lookahead_minutes=int(params.get("lookahead_minutes", 60 * 6)),
+            top_n=int(params.get("top_n", 20))
+        )
+        return job_accepted(job_id)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@routes.route("/api/jobs")
+def list_jobs():
+    return jsonify(jobs.list(limit=int(request.args.get("limit", 50))))
+
+@routes.route("/api/jobs/<job_id>")
+def job_status(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found."}), 404
+    return jsonify(job)
+
+@routes.route("/api/jobs/<job_id>/result")
+def job_result(job_id):
+    job = jobs.get(job_id, include_result=True)
+    if job is None:
+        return jsonify({"error": "Job not found."}), 404
+    if job["status"] != "done":
+        return jsonify({"error": f"Job is {job['status']}.", "status": job["status"], "detail": job["error"]}), 409
+    return jsonify(job["result"])
+
+@routes.route("/api/jobs/<job_id>/cancel", methods=["POST"])
+def cancel_job(job_id):
+    if not jobs.cancel(job_id):
+        return jsonify({"error": "Job not found or already finished."}), 404
+    return jsonify({"message": "Cancellation requested.", "job_id": job_id})
+
+@routes.route("/api/sessions")
 def get_sessions():
-    sessions = list_sessions()
+    """Lists sessions. Query params: sort, order=asc|desc, coin, cleaned, enriched, q, since, until, limit, offset, refresh."""
+    if flag(request.args.get("refresh")):
+        session_catalog.sync(session_store)
+    limit = request.args.get("limit")
+    try:
+        sessions = list_sessions(
+            sort=request.args.get("sort", "modified"),
+            descending=request.args.get("order", "desc") != "asc",
+            coin=request.args.get("coin"),
+            cleaned=flag(request.args.get("cleaned")),
+            enriched=flag(request.args.get("enriched")),
+            search=request.args.get("q"),
+            since=request.args.get("since"),
+            until=request.args.get("until"),
+            limit=int(limit) if limit else None,
+            offset=int(request.args.get("offset", 0))
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     # Format timestamps for frontend
     for s in sessions:
         s["created"] = datetimeformat(s["created"])
         s["modified"] = datetimeformat(s["modified"])
     return jsonify(sessions)
 
-@app.route("/api/session/<session_name>")
+@routes.route("/api/session/<session_name>")
 def get_session_data(session_name):
-    session_path = os.path.join(SESSIONS_DIR, f"{session_name}.csv")
-    if not os.path.exists(session_path):
+    """Streams session rows as a JSON array (or NDJSON with format=ndjson), batch by batch."""
+    from services.streaming import stream_records
+    if not session_store.exists(session_name):
         return jsonify({"error": "Session not found."}), 404
-    df = pd.read_csv(session_path)
     # Check if session is cleaned
-    is_cleaned = all(col in df.columns for col in REQUIRED_COLUMNS)
+    is_cleaned = all(col in session_store.columns(session_name) for col in REQUIRED_COLUMNS)
     if not is_cleaned:
         return jsonify({"error": "Session is not cleaned. Please clean it before analysis."}), 400
-    return jsonify(df.to_dict(orient="records"))
+    params = stream_params()
+    batches = session_store.iter_batches(
+        session_name, params["columns"], params["batch_size"], params["offset"], params["limit"]
+    )
+    return streamed(stream_records(batches, params["format"]), params["format"])
 
-@app.route("/api/chart/<session_name>/equity_curve")
-def api_equity_curve(session_name):
-    session_path = os.path.join(SESSIONS_DIR, f"{session_name}.csv")
-    if not os.path.exists(session_path):
+@routes.route("/api/session/<session_name>/export.csv")
+def export_session_csv(session_name):
+    if not session_store.exists(session_name):
         return jsonify({"error": "Session not found."}), 404
-    df = pd.read_csv(session_path)
-    return jsonify(get_equity_curve_data(df))
+    return Response(
+        session_store.export_csv(session_name),
+        mimetype="text/csv",
+        headers={"Content-Disposition": f"attachment; filename={session_name}.csv"}
+    )
 
-@app.route("/api/chart/<session_name>/win_loss")
+@routes.route("/api/session/import", methods=["POST"])
+def import_session_csv():
+    try:
+        session_name = request.form["session_name"]
+        session_store.import_csv(session_name, request.files["file"])
+        return jsonify({"message": "Session imported.", "session_name": session_name})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@routes.route("/api/chart/<session_name>/equity_curve")
+def api_equity_curve(session_name):
+    from services.plot_backtest_stats import DEFAULT_MAX_POINTS, get_equity_curve_data
+    return chart_response(
+        session_name, get_equity_curve_data, ['timestamp', 'gain_pct'],
+        max_points=int(request.args.get("max_points", DEFAULT_MAX_POINTS)),
+        method=request.args.get("method", "lttb")
+    )
+
+@routes.route("/api/chart/<session_name>/win_loss")
 def api_win_loss(session_name):
-    session_path = os.path.join(SESSIONS_DIR, f"{session_name}.csv")
-    if not os.path.exists(session_path):
+    from services.plot_backtest_stats import get_win_loss_from_index
+    if not session_store.exists(session_name):
         return jsonify({"error": "Session not found."}), 404
-    df = pd.read_csv(session_path)
-    return jsonify(get_win_loss_data(df))
+    return jsonify(get_win_loss_from_index(session_store.index(session_name)))
 
-@app.route("/api/chart/<session_name>/gain_distribution")
+@routes.route("/api/chart/<session_name>/gain_distribution")
 def api_gain_distribution(session_name):
-    session_path = os.path.join(SESSIONS_DIR, f"{session_name}.csv")
-    if not os.path.exists(session_path):
+    """Histogram of gain_pct; bins=0 streams the raw samples instead."""
+    from services.plot_backtest_stats import DEFAULT_BINS, get_gain_distribution_data
+    from services.streaming import stream_values
+    bins = int(request.args.get("bins", DEFAULT_BINS))
+    if bins > 0:
+        return chart_response(session_name, get_gain_distribution_data, ['gain_pct'], bins=bins)
+    if not session_store.exists(session_name):
         return jsonify({"error": "Session not found."}), 404
-    df = pd.read_csv(session_path)
-    return jsonify(get_gain_distribution_data(df))
+    params = stream_params()
+    batches = session_store.iter_batches(
+        session_name, ['gain_pct'], params["batch_size"], params["offset"], params["limit"]
+    )
+    return streamed(stream_values(batches, 'gain_pct'))
 
-@app.route("/api/chart/<session_name>/drawdown_distribution")
+@routes.route("/api/chart/<session_name>/drawdown_distribution")
 def api_drawdown_distribution(session_name):
-    session_path = os.path.join(SESSIONS_DIR, f"{session_name}.csv")
-    if not os.path.exists(session_path):
+    """Drawdown histogram with per-coin summary; bins=0 streams the raw (coin, drawdown) samples."""
+    from services.plot_backtest_stats import DEFAULT_BINS, DEFAULT_MAX_COINS, get_drawdown_distribution_data
+    from services.streaming import stream_columns
+    bins = int(request.args.get("bins", DEFAULT_BINS))
+    if bins > 0:
+        return chart_response(
+            session_name, get_drawdown_distribution_data, ['coin', 'drawdown_pct'], bins=bins,
+            max_coins=int(request.args.get("max_coins", DEFAULT_MAX_COINS))
+        )
+    if not session_store.exists(session_name):
         return jsonify({"error": "Session not found."}), 404
-    df = pd.read_csv(session_path)
-    return jsonify(get_drawdown_distribution_data(df))
+    params = stream_params()
+    if not {'coin', 'drawdown_pct'} <= set(session_store.columns(session_name)):
+        return jsonify({"coins": [], "drawdowns": []})
 
-@app.route("/api/chart/<session_name>/coin_performance")
+    def batches(columns):
+        return session_store.iter_batches(
+            session_name, columns, params["batch_size"], params["offset"], params["limit"]
+        )
+    return streamed(stream_columns(batches, {"coins": 'coin', "drawdowns": 'drawdown_pct'}))
+
+@routes.route("/api/chart/<session_name>/coin_performance")
 def api_coin_performance(session_name):
-    session_path = os.path.join(SESSIONS_DIR, f"{session_name}.csv")
-    if not os.path.exists(session_path):
+    from services.plot_backtest_stats import get_coin_performance_from_index
+    if not session_store.exists(session_name):
+        return jsonify({"error": "Session not found."}), 404
+    return jsonify(get_coin_performance_from_index(session_store.index(session_name)))
+
+@routes.route("/api/session/<session_name>/summary")
+def api_session_summary(session_name):
+    """Per coin/direction/outcome/day counts and moments from the session's aggregate index."""
+    if not session_store.exists(session_name):
         return jsonify({"error": "Session not found."}), 404
-    df = pd.read_csv(session_path)
-    return jsonify(get_coin_performance_data(df))
+    return jsonify(session_store.index(session_name))
+
+# --- Live mode ---
+
+@routes.route("/api/live/start", methods=["POST"])
+def start_live():
+    """
+    Starts live tracking. JSON body: risk_pct, risk_reward, risk_per_trade, initial_balance and
+    either source="binance" with channels=[{channel_id, access_hash}] to listen to, or
+    source="replay" with session_name to replay its signals over the stored candles.
+    """
+    import pandas as pd
+    from services.add_prices_to_signals import candle_store, get_symbol
+    from services.live import LiveSession, LiveTracker, PollingFeed, ReplayFeed
+    from services.telegram_pool import shared_pool
+    global live
+    try:
+        params = request.get_json(silent=True) or request.form.to_dict()
+        if live is not None and live.running():
+            return jsonify({"error": "Live mode is already running."}), 409
+        tracker = LiveTracker(
+            risk_pct=float(params.get("risk_pct", 0.05)),
+            risk_reward=float(params.get("risk_reward", 3.0)),
+            risk_per_trade=float(params.get("risk_per_trade", 0.01)),
+            initial_balance=float(params.get("initial_balance", 1000))
+        )
+        if params.get("source", "binance") == "replay":
+            signals_df = load_session(params["session_name"], ['timestamp', 'coin', 'direction'])
+            if signals_df is None:
+                return jsonify({"error": "Session not found."}), 404
+            timestamps = pd.to_datetime(signals_df['timestamp'], utc=True)
+            feed = ReplayFeed(
+                candle_store, signals_df['coin'].astype(str).map(get_symbol).unique(),
+                timestamps.min().value // 1_000_000, (timestamps.max().value // 1_000_000) + 6 * 3_600_000,
+                delay=float(params.get("delay", 0))
+            )
+            live = LiveSession(tracker, feed, signals_df).start()
+        else:
+            live = LiveSession(tracker, PollingFeed(on_error=tracker.mark_error)).start()
+            if params.get("channels"):
+                try:
+                    live.listen(shared_pool(), params["channels"])
+                except Exception:
+                    # Without its listener the session would poll forever with nothing to stop it
+                    live.stop()
+                    raise
+        return jsonify({"message": "Live mode started."})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@routes.route("/api/live/stop", methods=["POST"])
+def stop_live():
+    if live is None:
+        return jsonify({"error": "Live mode is not running."}), 404
+    live.stop()
+    return jsonify({"message": "Live mode stopped."})
+
+@routes.route("/api/live/signal", methods=["POST"])
+def add_live_signal():
+    """Adds a signal by hand (coin, direction, optional timestamp) to the running live session."""
+    import pandas as pd
+    if live is None or not live.running():
+        return jsonify({"error": "Live mode is not running."}), 404
+    params = request.get_json(silent=True) or request.form.to_dict()
+    position = live.add_signal({
+        "coin": params["coin"], "direction": params["direction"],
+        "timestamp": params.get("timestamp") or pd.Timestamp.now(tz="UTC")
+    })
+    if position is None:
+        return jsonify({"error": "Unknown direction."}), 400
+    return jsonify(position.as_dict())
+
+@routes.route("/api/live")
+def live_state():
+    """Balance, open positions, recent trades and the equity curve of the live session."""
+    if live is None:
+        return jsonify({"error": "Live mode is not running."}), 404
+    return jsonify({**live.tracker.snapshot(), "running": live.running(), "error": live.error})
+
+@routes.route("/api/live/stream")
+def live_stream():
+    """Server-sent events: one live snapshot whenever positions open or close."""
+    if live is None:
+        return jsonify({"error": "Live mode is not running."}), 404
+    session = live
+
+    def events():
+        version = None
+        while True:
+            if version is not None and session.tracker.wait(version, timeout=15) == version:
+                if not session.running():
+                    break
+                yield ": keepalive\n\n"
+                continue
+            version = session.tracker.version
+            yield f"data: {json.dumps(session.tracker.snapshot(), default=str)}\n\n"
+    return Response(stream_with_context(events()), mimetype="text/event-stream")
+
+# --- Telemetry ---
+
+@routes.route("/metrics")
+def metrics():
+    """Counters and latency histograms in Prometheus text format (?format=json for a summary)."""
+    if request.args.get("format") == "json":
+        return jsonify(telemetry.registry.snapshot())
+    return Response(telemetry.registry.render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+@routes.route("/metrics/profiles")
+def list_profiles():
+    return jsonify([{"id": k, "path": v["path"], "samples": v["samples"]} for k, v in reversed(telemetry.profiles.items())])
+
+@routes.route("/metrics/profiles/<profile_id>")
+def get_profile(profile_id):
+    profile = telemetry.profiles.get(profile_id)
+    if profile is None:
+        return jsonify({"error": "Profile not found."}), 404
+    return jsonify(profile)
 
 # --- Placeholder for future analysis endpoints ---
-# @app.route("/api/stop_loss_optimization", methods=["POST"])
+# @routes.route("/api/stop_loss_optimization", methods=["POST"])
 # def stop_loss_optimization():
 #     # Implement stop-loss optimization logic here
 #     pass
 
-# @app.route("/api/target_suggestion", methods=["POST"])
+# @routes.route("/api/target_suggestion", methods=["POST"])
 # def target_suggestion():
 #     # Implement target suggestion logic here
 #     pass
 
 if __name__ == "__main__":
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    import logging
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    create_app().run(debug=True, port=5000)
\ No newline at end of file
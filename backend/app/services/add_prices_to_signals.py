@@ -1,75 +1,316 @@
-import pandas as pd
-from binance.client import Client
-from datetime import datetime, timedelta
+import json
+import logging
+import threading
 import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from services.candle_store import CandleStore, candles_to_frame, interval_to_ms, to_ms
+from services.telemetry import inc, timed
+
+BINANCE_API_URL = "https://api.binance.com"
+KLINES_LIMIT = 1000          # max candles per /api/v3/klines call
+KLINES_WEIGHT = 2            # request weight of a klines call with limit 1000
+WEIGHT_PER_MINUTE = 6000     # Binance spot REQUEST_WEIGHT limit per IP
+INVALID_SYMBOL_CODE = -1121  # Binance error code for an unknown/unlisted symbol
+
+log = logging.getLogger(__name__)
+
+
+class ExchangeError(Exception):
+    """Raised when the exchange rejects a request that should not be retried."""
+
+
+class InvalidSymbol(ExchangeError):
+    """The exchange does not list the symbol (e.g. a coin that never traded against USDT)."""
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket used to stay under the exchange request-weight limit.
+    pause() empties the bucket for a while, e.g. after a 429 with Retry-After.
+    """
+
+    def __init__(self, capacity=WEIGHT_PER_MINUTE, refill_per_second=WEIGHT_PER_MINUTE / 60):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now >= self.paused_until:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_per_second)
+                    self.updated = now
+                    if self.tokens >= tokens:
+                        self.tokens -= tokens
+                        return
+                    wait = (tokens - self.tokens) / self.refill_per_second
+                else:
+                    wait = self.paused_until - now
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0
+            self.updated = self.paused_until
+
+
+class KlineFetcher:
+    """
+    Minimal Binance klines client: paginates, goes through a shared TokenBucket and
+    retries transient errors with exponential backoff. base_url can point at a local
+    fake server for testing.
+    """
+
+    def __init__(self, base_url=BINANCE_API_URL, limiter=None, max_retries=5, backoff=0.5, timeout=10):
+        self.base_url = base_url.rstrip("/")
+        self.limiter = limiter or TokenBucket()
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+
+    def _request(self, params):
+        url = f"{self.base_url}/api/v3/klines?{urllib.parse.urlencode(params)}"
+        for attempt in range(self.max_retries + 1):
+            with timed("binance_rate_limit_wait_seconds"):
+                self.limiter.acquire(KLINES_WEIGHT)
+            try:
+                with timed("binance_request_seconds", endpoint="klines"):
+                    with urllib.request.urlopen(url, timeout=self.timeout) as res:
+                        rows = json.loads(res.read())
+                inc("binance_requests_total", endpoint="klines", status=200)
+                return rows
+            except urllib.error.HTTPError as e:
+                inc("binance_requests_total", endpoint="klines", status=e.code)
+                if e.code in (418, 429):
+                    retry_after = float(e.headers.get("Retry-After") or self.backoff * 2 ** attempt)
+                    self.limiter.pause(retry_after)
+                elif e.code < 500:
+                    body = e.read().decode(errors='replace')
+                    if e.code == 400 and _error_code(body) == INVALID_SYMBOL_CODE:
+                        raise InvalidSymbol(params['symbol']) from e
+                    raise ExchangeError(f"{e.code}: {body}") from e
+                error = e
+            except (urllib.error.URLError, TimeoutError, ConnectionError) as e:
+                inc("binance_requests_total", endpoint="klines", status="error")
+                error = e
+            if attempt < self.max_retries:
+                time.sleep(self.backoff * 2 ** attempt)
+        raise ExchangeError(f"Giving up on {params['symbol']} after {self.max_retries + 1} attempts: {error}")
 
-# Load your signal CSV
-signals_df = pd.read_csv("backend/app/data/strategies.csv", parse_dates=["timestamp"])
+    def __call__(self, symbol, interval, start_ms, end_ms):
+        """Returns raw kline rows with open time in [start_ms, end_ms]."""
+        step = interval_to_ms(interval)
+        rows = []
+        cursor = start_ms
+        while cursor <= end_ms:
+            batch = self._request({
+                "symbol": symbol, "interval": interval,
+                "startTime": cursor, "endTime": end_ms, "limit": KLINES_LIMIT,
+            })
+            if not batch:
+                break
+            rows.extend(batch)
+            cursor = int(batch[-1][0]) + step
+            if len(batch) < KLINES_LIMIT:
+                break
+        return rows
+
+
+def _error_code(body):
+    try:
+        return json.loads(body).get("code")
+    except (ValueError, AttributeError):
+        return None
+
+
+# Shared defaults for callers that do not bring their own
+candle_store = CandleStore()
+fetcher = KlineFetcher()
 
-# Binance client (no auth needed for historical data)
-client = Client()
 
 def get_symbol(coin):
     return f"{coin.upper()}USDT"
 
+
 def fetch_ohlcv(symbol, start_time, interval="1m", lookahead_minutes=60*6):
     end_time = start_time + timedelta(minutes=lookahead_minutes)
-    klines = client.get_historical_klines(
-        symbol,
-        interval,
-        start_time.strftime("%d %b %Y %H:%M:%S"),
-        end_time.strftime("%d %b %Y %H:%M:%S")
-    )
-    if not klines:
+    candles = candle_store.get(symbol, interval, to_ms(start_time), to_ms(end_time), fetcher)
+    if not len(candles):
         return None
-    df = pd.DataFrame(klines, columns=[
-        'timestamp', 'open', 'high', 'low', 'close', 'volume',
-        'close_time', 'quote_asset_volume', 'number_of_trades',
-        'taker_buy_base_volume', 'taker_buy_quote_volume', 'ignore'
-    ])
-    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-    df.set_index('timestamp', inplace=True)
-    df = df.astype(float)
-    return df
-
-# Add price data
-results = []
-for index, row in signals_df.iterrows():
-    coin = row['coin']
-    direction = row['direction']
-    timestamp = row['timestamp']
-    symbol = get_symbol(coin)
-
-    print(f"Fetching {symbol} at {timestamp}...")
+    return candles_to_frame(candles)
 
-    try:
-        ohlcv = fetch_ohlcv(symbol, timestamp)
-        if ohlcv is None:
-            continue
 
-        entry_candle = ohlcv.iloc[0]
-        future_high = ohlcv['high'].max()
-        future_low = ohlcv['low'].min()
+def plan_windows(starts_by_symbol, lookahead_ms, merge_gap_ms, max_window_ms):
+    """
+    Merges the [start, start + lookahead] windows of each symbol when they overlap or are
+    less than merge_gap_ms apart, as long as the merged window stays under max_window_ms.
+    Returns a list of (symbol, start_ms, end_ms).
+    """
+    windows = []
+    for symbol, starts in starts_by_symbol.items():
+        current = None
+        for start in sorted(starts):
+            end = start + lookahead_ms
+            if current and start <= current[2] + merge_gap_ms and end - current[1] <= max_window_ms:
+                current[2] = max(current[2], end)
+                continue
+            if current:
+                windows.append(tuple(current))
+            current = [symbol, start, end]
+        if current:
+            windows.append(tuple(current))
+    return windows
+
 
-        entry_price = entry_candle['close']
+def enrich_signals(
+    signals_df,
+    lookahead_minutes=60*6,
+    interval="1m",
+    store=None,
+    fetch=None,
+    max_workers=8,
+    merge_gap_minutes=60,
+    max_window_minutes=60*24*3,
+    progress=None
+):
+    """
+    Adds entry_price, future_high and future_low to every signal.
+    Signals are grouped by symbol, nearby windows merged, and only candles missing from the
+    candle store are downloaded, with up to max_workers requests in flight under the fetcher's
+    rate limiter. Symbols the exchange reports as invalid are stored as covered without
+    candles, so a re-run does not ask for them again. Signals without candle data (unlisted
+    coins, or a window overlapping a chunk that failed to download) are dropped.
+    progress(done, total) is called as download chunks complete; an exception raised from
+    it aborts the run and drops the chunks not started yet.
+    """
+    store = store or candle_store
+    fetch = fetch or fetcher
+    step = interval_to_ms(interval)
+    lookahead_ms = lookahead_minutes * 60_000
 
-        results.append({
-            'timestamp': timestamp,
-            'coin': coin,
-            'direction': direction,
-            'entry_price': entry_price,
-            'future_high': future_high,
-            'future_low': future_low,
-            'raw_message': row['raw_message']
-        })
+    df = signals_df.copy()
+    df['timestamp'] = pd.to_datetime(df['timestamp'], utc=True)
+    df['symbol'] = df['coin'].astype(str).map(get_symbol)
+    start_ms = df['timestamp'].map(to_ms).to_numpy(dtype="int64")
+
+    starts_by_symbol = {s: start_ms[idx] for s, idx in df.groupby('symbol').indices.items()}
+    windows = plan_windows(starts_by_symbol, lookahead_ms, merge_gap_minutes * 60_000, max_window_minutes * 60_000)
+
+    # Split every uncached gap into single-request chunks
+    chunks = []
+    for symbol, start, end in windows:
+        for gap_start, gap_end in store.missing(symbol, interval, start, end):
+            for chunk_start in range(gap_start, gap_end, KLINES_LIMIT * step):
+                chunks.append((symbol, chunk_start, min(gap_end, chunk_start + KLINES_LIMIT * step)))
+
+    failed = {}  # symbol -> [start, end) chunks that could not be downloaded
+    invalid = set()
+
+    def fetch_chunk(symbol, s, e):
+        # Once one chunk reported the symbol as unlisted, skip the request for the others
+        if symbol in invalid:
+            raise InvalidSymbol(symbol)
+        try:
+            return fetch(symbol, interval, s, e - 1)
+        except InvalidSymbol:
+            invalid.add(symbol)
+            raise
+
+    # Downloaded chunks are buffered per symbol and written once its last chunk is in, since
+    # every store write rewrites the symbol's whole file
+    remaining = {}
+    for symbol, _, _ in chunks:
+        remaining[symbol] = remaining.get(symbol, 0) + 1
+    buffered = {}
+
+    def flush(symbol):
+        batches = buffered.pop(symbol, None)
+        if batches:
+            store.put_many(symbol, interval, batches)
+
+    if chunks:
+        log.info("Fetching %d kline chunks for %d windows", len(chunks), len(windows))
+        pool = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            futures = {pool.submit(fetch_chunk, symbol, s, e): (symbol, s, e) for symbol, s, e in chunks}
+            for done, future in enumerate(as_completed(futures), start=1):
+                symbol, s, e = futures[future]
+                try:
+                    buffered.setdefault(symbol, []).append((s, e, future.result()))
+                    inc("enrich_chunks_total", status="ok")
+                except InvalidSymbol:
+                    # Known missing: cover the range with no candles
+                    buffered.setdefault(symbol, []).append((s, e, []))
+                    inc("enrich_chunks_total", status="invalid_symbol")
+                except Exception as ex:
+                    log.warning("Fetching %s candles %d-%d failed: %s", symbol, s, e, ex)
+                    inc("enrich_chunks_total", status="error")
+                    failed.setdefault(symbol, []).append((s, e))
+                remaining[symbol] -= 1
+                if not remaining[symbol]:
+                    flush(symbol)
+                if progress:
+                    progress(done, len(chunks))
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+            # An aborted run still keeps what it downloaded
+            for symbol in list(buffered):
+                flush(symbol)
+    if invalid:
+        log.info("Not listed on the exchange: %s", ", ".join(sorted(invalid)))
+
+    entry_price = np.full(len(df), np.nan)
+    future_high = np.full(len(df), np.nan)
+    future_low = np.full(len(df), np.nan)
+    for symbol, idx in df.groupby('symbol').indices.items():
+        starts = start_ms[idx]
+        if symbol in failed:
+            # Only drop the signals whose window overlaps a failed chunk
+            window_start = -(-starts // step) * step
+            window_end = starts + lookahead_ms
+            ok = np.ones(len(idx), dtype=bool)
+            for s, e in failed[symbol]:
+                ok &= ~((window_start < e) & (window_end >= s))
+            idx, starts = idx[ok], starts[ok]
+            if not len(idx):
+                continue
+        candles = store.load(symbol, interval, int(starts.min()), int(starts.max()) + lookahead_ms)
+        if not len(candles):
+            continue
+        times = candles[:, 0]
+        lo = np.searchsorted(times, -(-starts // step) * step, side="left")
+        hi = np.searchsorted(times, starts + lookahead_ms, side="right")
+        for i, a, b in zip(idx, lo, hi):
+            if b > a:
+                entry_price[i] = candles[a, 4]
+                future_high[i] = candles[a:b, 2].max()
+                future_low[i] = candles[a:b, 3].min()
 
-        time.sleep(0.3)  # Prevent IP ban
+    df['entry_price'] = entry_price
+    df['future_high'] = future_high
+    df['future_low'] = future_low
+    df = df.dropna(subset=['entry_price']).drop(columns='symbol')
+    columns = ['timestamp', 'coin', 'direction', 'entry_price', 'future_high', 'future_low']
+    return df[columns + [c for c in df.columns if c not in columns]]
 
-    except Exception as e:
-        print(f"Error with {symbol}: {e}")
-        continue
 
-# Save result
-df = pd.DataFrame(results)
-df.to_csv("signals_with_price_data.csv", index=False)
-print(f"\n✅ Done. Saved {len(df)} signals with price data.")
+if __name__ == "__main__":
+    # Example usage: python -m services.add_prices_to_signals
+    logging.basicConfig(level=logging.INFO)
+    signals_df = pd.read_csv("backend/app/data/strategies.csv", parse_dates=["timestamp"])
+    df = enrich_signals(signals_df)
+    df.to_csv("signals_with_price_data.csv", index=False)
+    print(f"\n✅ Done. Saved {len(df)} signals with price data.")
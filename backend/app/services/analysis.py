@@ -1,5 +1,7 @@
 import pandas as pd
 
+from services.session_index import group_stats
+
 def coin_performance(df):
     """Returns average gain per coin."""
     return df.groupby('coin')['gain_pct'].mean().sort_values()
@@ -8,4 +10,13 @@ def win_loss_count(df):
     """Returns win/loss/none counts."""
     return df['outcome'].value_counts().to_dict()
 
+def coin_performance_from_index(index):
+    """Average gain per coin from a session's aggregate index, without rescanning rows."""
+    stats = group_stats(index, 'coin', 'gain_pct')
+    return pd.Series({coin: s["mean"] for coin, s in stats.items() if "mean" in s}, dtype=float).sort_values()
+
+def win_loss_count_from_index(index):
+    """Outcome counts from a session's aggregate index."""
+    return {outcome: s["rows"] for outcome, s in group_stats(index, 'outcome').items()}
+
 # Add more analysis functions as needed
\ No newline at end of file
@@ -0,0 +1,189 @@
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CANDLES_DIR = os.path.join(APP_ROOT, "data", "candles")
+
+# Columns kept for every candle, in storage order. open_time is epoch milliseconds.
+CANDLE_COLUMNS = ['open_time', 'open', 'high', 'low', 'close', 'volume']
+
+_INTERVAL_UNITS = {"m": 60_000, "h": 3_600_000, "d": 86_400_000, "w": 604_800_000}
+
+
+def interval_to_ms(interval):
+    """Converts a Binance interval string such as '1m' or '4h' to milliseconds."""
+    return int(interval[:-1]) * _INTERVAL_UNITS[interval[-1]]
+
+
+def to_ms(value):
+    """Converts a datetime/Timestamp/epoch-ms value to epoch milliseconds (UTC)."""
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize("UTC")
+    return int(ts.value // 1_000_000)
+
+
+def align_range(start_ms, end_ms, step):
+    """
+    Snaps a time range onto the candle grid.
+    Returns a half-open range [start, end) of candle open times: the first candle opening
+    at or after start_ms up to (and including) the candle opening at end_ms.
+    """
+    start = -(-start_ms // step) * step
+    end = (end_ms // step) * step + step
+    return start, max(start, end)
+
+
+def subtract_ranges(start, end, covered):
+    """Returns the parts of [start, end) not covered by the sorted, merged ranges in covered."""
+    missing = []
+    cursor = start
+    for c_start, c_end in covered:
+        if c_end <= cursor:
+            continue
+        if c_start >= end:
+            break
+        if c_start > cursor:
+            missing.append((cursor, min(c_start, end)))
+        cursor = max(cursor, c_end)
+        if cursor >= end:
+            break
+    if cursor < end:
+        missing.append((cursor, end))
+    return missing
+
+
+def merge_ranges(ranges):
+    """Merges overlapping or touching [start, end) ranges."""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+class CandleStore:
+    """
+    Persistent local OHLCV store.
+    Candles for each (symbol, interval) live in one sorted .npy array that is opened
+    memory-mapped, next to a small JSON file listing the time ranges already downloaded.
+    Reads only hit the network for ranges that were never fetched before.
+    """
+
+    def __init__(self, root=CANDLES_DIR):
+        self.root = root
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def _paths(self, symbol, interval):
+        base = os.path.join(self.root, f"{symbol.upper()}_{interval}")
+        return base + ".npy", base + ".ranges.json"
+
+    def _lock(self, symbol, interval):
+        key = (symbol.upper(), interval)
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _read(self, symbol, interval):
+        data_path, ranges_path = self._paths(symbol, interval)
+        if not os.path.exists(data_path) or not os.path.exists(ranges_path):
+            return np.empty((0, len(CANDLE_COLUMNS))), []
+        with open(ranges_path) as f:
+            covered = json.load(f)
+        return np.load(data_path, mmap_mode="r"), covered
+
+    def coverage(self, symbol, interval):
+        """Returns the list of [start_ms, end_ms) ranges stored for symbol/interval."""
+        return self._read(symbol, interval)[1]
+
+    def missing(self, symbol, interval, start_ms, end_ms):
+        """Returns the aligned [start, end) ranges of the request that are not stored yet."""
+        step = interval_to_ms(interval)
+        start, end = align_range(int(start_ms), int(end_ms), step)
+        return subtract_ranges(start, end, self.coverage(symbol, interval))
+
+    def put(self, symbol, interval, start_ms, end_ms, rows):
+        """
+        Merges downloaded candles into the store and marks [start_ms, end_ms) as covered.
+        rows is a Binance kline list or any 2-D array whose first six columns follow CANDLE_COLUMNS.
+        Coverage is clipped to the last closed candle so still-forming candles get refetched.
+        """
+        self.put_many(symbol, interval, [(start_ms, end_ms, rows)])
+
+    def put_many(self, symbol, interval, batches):
+        """
+        put() for several (start_ms, end_ms, rows) downloads of one symbol at once. Every put
+        rewrites the symbol's whole file, so callers fetching many chunks should merge them
+        here and write once instead of paying O(chunks x file size) in I/O.
+        """
+        step = interval_to_ms(interval)
+        last_closed = (int(time.time() * 1000) // step) * step
+        new, ranges = [], []
+        for start_ms, end_ms, rows in batches:
+            start_ms, end_ms = int(start_ms), min(int(end_ms), last_closed)
+            chunk = np.asarray([r[:len(CANDLE_COLUMNS)] for r in rows], dtype=float).reshape(-1, len(CANDLE_COLUMNS))
+            new.append(chunk[chunk[:, 0] < end_ms])
+            if end_ms > start_ms:
+                ranges.append([start_ms, end_ms])
+        new = np.concatenate(new) if new else np.empty((0, len(CANDLE_COLUMNS)))
+
+        with self._lock(symbol, interval):
+            data, covered = self._read(symbol, interval)
+            combined = np.concatenate([np.asarray(data), new]) if len(new) else np.asarray(data)
+            if len(combined):
+                _, keep = np.unique(combined[::-1, 0], return_index=True)
+                combined = combined[::-1][keep]  # sorted by open_time, newest download wins
+            if ranges:
+                covered = merge_ranges(covered + ranges)
+            self._write(symbol, interval, combined, covered)
+
+    def _write(self, symbol, interval, data, covered):
+        os.makedirs(self.root, exist_ok=True)
+        data_path, ranges_path = self._paths(symbol, interval)
+        tmp_data = data_path + ".tmp.npy"
+        np.save(tmp_data, np.ascontiguousarray(data, dtype=float))
+        os.replace(tmp_data, data_path)
+        with open(ranges_path + ".tmp", "w") as f:
+            json.dump(covered, f)
+        os.replace(ranges_path + ".tmp", ranges_path)
+
+    def load(self, symbol, interval, start_ms, end_ms):
+        """Returns the stored candles with open_time in the aligned range as an (n, 6) array."""
+        start, end = align_range(start_ms, end_ms, interval_to_ms(interval))
+        data, _ = self._read(symbol, interval)
+        if not len(data):
+            return np.empty((0, len(CANDLE_COLUMNS)))
+        times = data[:, 0]
+        lo, hi = np.searchsorted(times, [start, end], side="left")
+        return np.array(data[lo:hi])
+
+    def get(self, symbol, interval, start_ms, end_ms, fetcher):
+        """
+        Read-through access: fetches only the missing ranges with
+        fetcher(symbol, interval, start_ms, end_ms) -> kline rows, stores them, then loads.
+        """
+        batches = []
+        try:
+            for gap_start, gap_end in self.missing(symbol, interval, start_ms, end_ms):
+                batches.append((gap_start, gap_end, fetcher(symbol, interval, gap_start, gap_end - 1) or []))
+        finally:
+            # One write for all gaps; gaps fetched before a failure are still kept
+            if batches:
+                self.put_many(symbol, interval, batches)
+        return self.load(symbol, interval, start_ms, end_ms)
+
+
+def candles_to_frame(candles):
+    """Turns a stored candle array into the timestamp-indexed float DataFrame used by the services."""
+    df = pd.DataFrame(candles, columns=CANDLE_COLUMNS)
+    df['timestamp'] = pd.to_datetime(df['open_time'].astype("int64"), unit='ms')
+    return df.drop(columns='open_time').set_index('timestamp')
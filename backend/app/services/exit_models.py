@@ -0,0 +1,234 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from services.metrics import compound_equity, max_drawdown_pct, win_rate
+from services.optimize_strategy import MAX_CHUNK_ELEMENTS
+from services.path_simulation import first_true
+
+# Every model turns per-signal candle arrays into a per-candle stop level plus take-profit
+# targets, expressed as signed returns from entry (>0 is in the trade's favour), and
+# exit_kernel() resolves them. Models are plain functions registered in EXIT_MODELS and
+# take the four arrays of signed_moves(); sign is only needed where price levels matter.
+
+
+def signed_moves(entry, sign, high, low, close, time_stop=None, dtype=np.float32):
+    """
+    Favourable, adverse and close moves relative to entry, (n, T) each, truncated to the
+    first time_stop candles, plus the (n, 1) direction sign. NaN padding stays NaN so padded
+    candles never trigger exits.
+    """
+    entry = np.asarray(entry, dtype=dtype)[:, None]
+    sign = np.asarray(sign, dtype=dtype)[:, None]
+    if time_stop:
+        high, low, close = high[:, :time_stop], low[:, :time_stop], close[:, :time_stop]
+    long = sign > 0
+    favorable = (np.where(long, high, low).astype(dtype) / entry - 1) * sign
+    adverse = (np.where(long, low, high).astype(dtype) / entry - 1) * sign
+    moves = (np.asarray(close, dtype=dtype) / entry - 1) * sign
+    return favorable, adverse, moves, sign
+
+
+def _after(idx, T):
+    """(n, T) mask of candles strictly after idx (stop changes apply from the next candle)."""
+    return np.arange(T)[None, :] > idx[:, None]
+
+
+def exit_kernel(favorable, adverse, moves, stop_level, targets=(), sizes=()):
+    """
+    Resolves one exit model for all signals. stop_level is an (n, T) array (or scalar) of the
+    stop as a signed return; targets/sizes are take-profit returns and the fraction of the
+    position closed at each. A target only fills if touched before the stop candle (the stop
+    wins ties, as in simulate_paths); whatever is left after the stop or the last candle
+    exits there. Returns gain_pct of the whole position, exit index, targets hit and outcome.
+    """
+    n, T = favorable.shape
+    with np.errstate(invalid="ignore"):
+        stop_idx = first_true(adverse <= stop_level)
+        hit_idx = [first_true(favorable >= t) for t in targets]
+    last_idx = np.maximum((~np.isnan(moves)).sum(axis=1) - 1, 0)
+    rows = np.arange(n)
+
+    gain = np.zeros(n)
+    filled = np.zeros(n)
+    targets_hit = np.zeros(n, dtype=np.int8)
+    target_exit = np.zeros(n, dtype=np.int64)
+    for target, size, idx in zip(targets, sizes, hit_idx):
+        hit = (idx < T) & (idx < stop_idx)
+        gain += np.where(hit, size * target, 0.0)
+        filled += np.where(hit, size, 0.0)
+        targets_hit += hit
+        target_exit = np.where(hit, np.maximum(target_exit, idx), target_exit)
+
+    remaining = np.clip(1 - filled, 0, None)
+    stopped = stop_idx < T
+    level = np.broadcast_to(stop_level, favorable.shape)[rows, np.minimum(stop_idx, T - 1)]
+    rest = np.where(stopped, level, np.nan_to_num(moves[rows, last_idx]))
+    closed_by_targets = remaining <= 1e-9
+    gain += np.where(closed_by_targets, 0.0, remaining * rest)
+    exit_idx = np.where(closed_by_targets, target_exit, np.where(stopped, stop_idx, last_idx))
+    outcome = np.where(closed_by_targets, "TP", np.where(stopped, "SL", "None"))
+    return {"gain_pct": gain * 100, "exit_idx": exit_idx, "targets_hit": targets_hit, "outcome": outcome}
+
+
+def fixed_exit(favorable, adverse, moves, sign, sl=0.05, tp=0.15):
+    """One stop loss and one take profit (what simulate_paths does)."""
+    return exit_kernel(favorable, adverse, moves, -sl, [tp], [1.0])
+
+
+def breakeven_exit(favorable, adverse, moves, sign, sl=0.05, tp=0.15, trigger=0.05, offset=0.0):
+    """Stop moves to entry (+offset) once the trade has been trigger in profit."""
+    trigger_idx = first_true(favorable >= trigger)
+    stop = np.where(_after(trigger_idx, favorable.shape[1]), offset, -sl)
+    return exit_kernel(favorable, adverse, moves, stop, [tp] if tp else [], [1.0] if tp else [])
+
+
+def ladder_exit(favorable, adverse, moves, sign, sl=0.05, targets=(0.05, 0.10, 0.15), sizes=(1 / 3, 1 / 3, 1 / 3),
+                breakeven_after=1):
+    """
+    Partial exits at TP1..TPn. After target number breakeven_after (1-based, 0 = never)
+    fills, the stop on the rest of the position moves to entry.
+    """
+    stop = -sl
+    if breakeven_after:
+        trigger_idx = first_true(favorable >= targets[breakeven_after - 1])
+        stop = np.where(_after(trigger_idx, favorable.shape[1]), 0.0, -sl)
+    return exit_kernel(favorable, adverse, moves, stop, list(targets), list(sizes))
+
+
+def _trailing_stop(favorable, distance, sl, activation):
+    """Stop trailing the best favourable move of the previous candles by distance (return units)."""
+    peak = np.fmax.accumulate(np.nan_to_num(favorable, nan=-np.inf), axis=1)
+    previous_peak = np.concatenate([np.zeros((len(peak), 1), dtype=peak.dtype), peak[:, :-1]], axis=1)
+    previous_peak = np.maximum(previous_peak, 0)
+    trail = previous_peak - distance
+    if activation:
+        trail = np.where(previous_peak >= activation, trail, -np.inf)
+    return np.maximum(trail, -sl)
+
+
+def trailing_exit(favorable, adverse, moves, sign, sl=0.05, trail=0.03, activation=0.0, tp=None):
+    """Percent trailing stop: trail of the best price so far, armed once activation is reached."""
+    peak = np.maximum(np.fmax.accumulate(np.nan_to_num(favorable, nan=-np.inf), axis=1), 0)
+    # Best price relative to entry: the high (1 + peak) for longs, the low (1 - peak) for shorts
+    best_price = 1 + sign * peak
+    distance = np.concatenate([np.full((len(peak), 1), trail, dtype=peak.dtype),
+                               trail * best_price[:, :-1]], axis=1)
+    stop = _trailing_stop(favorable, distance, sl, activation)
+    return exit_kernel(favorable, adverse, moves, stop, [tp] if tp else [], [1.0] if tp else [])
+
+
+def atr_trailing_exit(favorable, adverse, moves, sign, sl=0.05, atr_mult=3.0, atr_period=14, activation=0.0, tp=None):
+    """
+    ATR trailing stop: atr_mult average true ranges (of the candles so far, in return
+    units) behind the best price. Before any range is known the plain stop loss applies.
+    """
+    n, T = favorable.shape
+    # In return units the candle range is favorable - adverse, and gaps come from the previous close
+    previous = np.concatenate([np.zeros((n, 1), dtype=moves.dtype), moves[:, :-1]], axis=1)
+    true_range = np.nan_to_num(
+        np.maximum(favorable - adverse, np.maximum(np.abs(favorable - previous), np.abs(adverse - previous)))
+    )
+    csum = np.cumsum(true_range, axis=1)
+    window = np.minimum(np.arange(1, T + 1), atr_period)
+    lagged = np.concatenate([np.zeros((n, atr_period), dtype=csum.dtype), csum[:, :-atr_period]], axis=1)[:, :T]
+    atr = (csum - lagged) / window
+    # Use the ATR known at the previous candle's close
+    distance = np.concatenate([np.full((n, 1), np.inf, dtype=atr.dtype), atr_mult * atr[:, :-1]], axis=1)
+    stop = _trailing_stop(favorable, distance, sl, activation)
+    return exit_kernel(favorable, adverse, moves, stop, [tp] if tp else [], [1.0] if tp else [])
+
+
+EXIT_MODELS = {
+    "fixed": fixed_exit,
+    "breakeven": breakeven_exit,
+    "ladder": ladder_exit,
+    "trailing": trailing_exit,
+    "atr_trailing": atr_trailing_exit,
+}
+
+
+def register_exit_model(name, model):
+    """model(favorable, adverse, moves, sign, **params) -> exit_kernel() result."""
+    EXIT_MODELS[name] = model
+
+
+def simulate_exits(entry, sign, high, low, close, model="fixed", time_stop=None, **params):
+    """
+    Runs a registered exit model over (n, T) candle buffers in row chunks of at most
+    MAX_CHUNK_ELEMENTS. time_stop (candles) closes whatever is still open at that candle.
+    """
+    if model not in EXIT_MODELS:
+        raise ValueError(f"Unknown exit model: {model}")
+    n, T = np.shape(high)
+    T = min(T, time_stop) if time_stop else T
+    step = max(1, MAX_CHUNK_ELEMENTS // max(T, 1))
+    parts = []
+    for start in range(0, n, step):
+        rows = slice(start, start + step)
+        moves = signed_moves(entry[rows], sign[rows], high[rows], low[rows], close[rows], time_stop)
+        parts.append(EXIT_MODELS[model](*moves, **params))
+    if not parts:
+        return {"gain_pct": np.zeros(0), "exit_idx": np.zeros(0, dtype=np.int64),
+                "targets_hit": np.zeros(0, dtype=np.int8), "outcome": np.zeros(0, dtype=object)}
+    return {key: np.concatenate([p[key] for p in parts]) for key in parts[0]}
+
+
+def parameter_grid(grid):
+    """{"sl": [..], "trail": [..]} -> list of parameter dicts (cartesian product)."""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[k] for k in names))]
+
+
+def sweep_exit_models(entry, sign, high, low, close, models, risk_values=(0.01,), initial_balance=1000,
+                      time_stops=(None,), progress=None):
+    """
+    Evaluates every parameter combination of every model. models maps a registered model name
+    to its parameter grid ({"sl": [...], ...}). Candle moves are computed once per signal chunk
+    and time stop, then reused by all combinations. Returns one row per (model, params,
+    time stop, risk) with the sequential-compounding results, best final balance first.
+    """
+    points = [(name, params) for name, grid in models.items() for params in parameter_grid(grid)]
+    for name, _ in points:
+        if name not in EXIT_MODELS:
+            raise ValueError(f"Unknown exit model: {name}")
+    n, T = np.shape(high)
+    step = max(1, MAX_CHUNK_ELEMENTS // max(T, 1))
+    gains = {(p, ts): np.empty(n) for p in range(len(points)) for ts in time_stops}
+    total = -(-n // step) * len(time_stops) if n else 0
+    done = 0
+    for start in range(0, n, step):
+        rows = slice(start, start + step)
+        for time_stop in time_stops:
+            moves = signed_moves(entry[rows], sign[rows], high[rows], low[rows], close[rows], time_stop)
+            for p, (name, params) in enumerate(points):
+                gains[(p, time_stop)][rows] = EXIT_MODELS[name](*moves, **params)["gain_pct"]
+            done += 1
+            if progress:
+                progress(done, total)
+
+    records = []
+    risks = np.asarray(risk_values, dtype=float)
+    for (p, time_stop), gain in gains.items():
+        name, params = points[p]
+        equity = compound_equity(gain[None, :], risks[:, None], initial_balance)
+        final = equity[:, -1] if n else np.full(len(risks), float(initial_balance))
+        drawdown = np.atleast_1d(max_drawdown_pct(equity, initial_balance))
+        for r, risk in enumerate(risks):
+            records.append({
+                'Model': name,
+                'Params': params,
+                'Time Stop': time_stop,
+                'Risk %': risk * 100,
+                'Trades': n,
+                'Win Rate %': round(float(win_rate(gain)), 2),
+                'Avg Gain %': round(float(gain.mean()), 3) if n else 0.0,
+                'Final Balance': round(float(final[r]), 2),
+                'Total Return %': round(float((final[r] - initial_balance) / initial_balance * 100), 2),
+                'Max Drawdown %': round(float(drawdown[r]), 2),
+            })
+    frame = pd.DataFrame(records)
+    # Keep "no time stop" as None rather than letting pandas turn the column into floats with NaN
+    frame['Time Stop'] = pd.Series([r['Time Stop'] for r in records], dtype=object)
+    return frame.sort_values('Final Balance', ascending=False, kind="stable").reset_index(drop=True)
@@ -1,12 +1,19 @@
-from telethon.sync import TelegramClient
+from services.telegram_pool import CLIENT_SESSION, telegram_config
 
-api_id = 1369657
-api_hash = '58dee73868918be3ac7ba66e8754546b'
-phone = +971589579932
 
-client = TelegramClient('session_name', api_id, api_hash)
+def print_channels(session_path=CLIENT_SESSION):
+    """Prints name, ID and access hash of every channel the account has joined."""
+    from telethon.sync import TelegramClient
 
-with client:
-    for dialog in client.iter_dialogs():
-        if dialog.is_channel:
-            print(f"{dialog.name} | ID: {dialog.entity.id} | Access Hash: {dialog.entity.access_hash}")
+    api_id, api_hash, phone = telegram_config()
+    client = TelegramClient(session_path, api_id, api_hash)
+
+    with client.start(phone):
+        for dialog in client.iter_dialogs():
+            if dialog.is_channel:
+                print(f"{dialog.name} | ID: {dialog.entity.id} | Access Hash: {dialog.entity.access_hash}")
+
+
+if __name__ == "__main__":
+    # Run from backend/app: python -m services.get_dialogs
+    print_channels()
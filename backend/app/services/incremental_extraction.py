@@ -0,0 +1,129 @@
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from services.signal_parser import DEFAULT_PATTERNS, parse_messages
+from services.telemetry import inc, timed
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATE_PATH = os.path.join(APP_ROOT, "data", "extraction_state.json")
+
+_state_lock = threading.Lock()
+
+
+def load_high_water_mark(session_name, channel_id, state_path=STATE_PATH):
+    """Returns the newest message id already scanned for this session/channel, or 0."""
+    if not os.path.exists(state_path):
+        return 0
+    with open(state_path) as f:
+        state = json.load(f)
+    return int(state.get(session_name, {}).get(str(channel_id), 0))
+
+
+def save_high_water_mark(session_name, channel_id, message_id, state_path=STATE_PATH):
+    """Records message_id as scanned; never moves the mark backwards."""
+    with _state_lock:
+        state = {}
+        if os.path.exists(state_path):
+            with open(state_path) as f:
+                state = json.load(f)
+        channels = state.setdefault(session_name, {})
+        channels[str(channel_id)] = max(int(message_id), int(channels.get(str(channel_id), 0)))
+        os.makedirs(os.path.dirname(state_path), exist_ok=True)
+        with open(state_path + ".tmp", "w") as f:
+            json.dump(state, f, indent=2)
+        os.replace(state_path + ".tmp", state_path)
+
+
+def message_text(message):
+    if getattr(message, 'message', None):
+        return message.message.strip()
+    if getattr(message, 'caption', None):
+        return message.caption.strip()
+    return None
+
+
+def signals_frame(texts, dates, message_ids, patterns=DEFAULT_PATTERNS):
+    """Parses message texts and returns the session layout (timestamp, coin, direction, raw_message, levels)."""
+    parsed = parse_messages(texts, patterns)
+    idx = parsed['message_idx'].to_numpy()
+    signals = pd.DataFrame({
+        'timestamp': [dates[i] for i in idx],
+        'coin': parsed['coin'].astype(str),
+        'direction': parsed['direction'].astype(str),
+        'raw_message': [texts[i] for i in idx],
+        'message_id': [message_ids[i] for i in idx],
+    })
+    for col in ['continuation', 'entry', 'entry_high', 'take_profit', 'stop_loss', 'leverage']:
+        signals[col] = parsed[col].to_numpy()
+    return signals
+
+
+async def collect_signals(messages, start_date, patterns=DEFAULT_PATTERNS, progress=None, progress_every=500):
+    """
+    Consumes an async iterator of messages, newest first (as Telethon's iter_messages yields
+    them), and stops at the first message older than start_date.
+    progress(scanned) is called every progress_every messages.
+    Returns (signals DataFrame, newest message id seen or 0).
+    """
+    texts, dates, ids = [], [], []
+    newest_id = 0
+    scanned = 0
+    async for message in messages:
+        scanned += 1
+        if progress and scanned % progress_every == 0:
+            progress(scanned)
+        if message.date and message.date < start_date:
+            break
+        newest_id = max(newest_id, message.id)
+        text = message_text(message)
+        if text and message.date:
+            texts.append(text)
+            dates.append(message.date)
+            ids.append(message.id)
+    inc("telegram_messages_scanned_total", scanned)
+    with timed("signal_parse_seconds"):
+        return signals_frame(texts, dates, ids, patterns), newest_id
+
+
+def _message_keys(df):
+    return pd.MultiIndex.from_arrays([pd.to_datetime(df['timestamp'], utc=True), df['raw_message'].astype(str)])
+
+
+def new_signals(existing_df, new_df):
+    """
+    Returns the rows of new_df whose messages the session does not hold yet. Rows are matched
+    by message id; session rows saved without one (extracted before ids were recorded) are
+    matched by timestamp and raw message instead.
+    """
+    if existing_df is None or existing_df.empty:
+        return new_df
+    fresh = np.ones(len(new_df), dtype=bool)
+    if 'message_id' in existing_df.columns and 'message_id' in new_df.columns:
+        with_ids = existing_df[existing_df['message_id'].notna()]
+        # Message ids are only unique within a channel
+        if 'channel_id' in existing_df.columns and 'channel_id' in new_df.columns:
+            keys = ['channel_id', 'message_id']
+            seen = pd.MultiIndex.from_frame(with_ids[keys].dropna().astype('int64'))
+            fresh &= ~pd.MultiIndex.from_frame(new_df[keys].astype('int64')).isin(seen)
+        else:
+            fresh &= ~new_df['message_id'].isin(with_ids['message_id']).to_numpy()
+        legacy = existing_df[existing_df['message_id'].isna()]
+    else:
+        legacy = existing_df
+    if len(legacy) and {'timestamp', 'raw_message'} <= set(legacy.columns) & set(new_df.columns):
+        fresh &= ~_message_keys(new_df).isin(_message_keys(legacy))
+    return new_df[fresh]
+
+
+def append_signals(existing_df, new_df):
+    """Appends newly extracted rows to a session, dropping messages it already holds."""
+    if existing_df is None or existing_df.empty:
+        return new_df
+    new_df = new_signals(existing_df, new_df)
+    combined = pd.concat([existing_df, new_df], ignore_index=True)
+    combined['timestamp'] = pd.to_datetime(combined['timestamp'], utc=True)
+    return combined.sort_values('timestamp', ascending=False, kind="stable").reset_index(drop=True)
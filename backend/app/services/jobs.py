@@ -0,0 +1,164 @@
+import contextlib
+import json
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from services.telemetry import inc, observe
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when cancellation was requested."""
+
+
+class JobContext:
+    """Handed to every job function for progress reporting and cooperative cancellation."""
+
+    def __init__(self, manager, job_id, cancel_event):
+        self.manager = manager
+        self.job_id = job_id
+        self.cancel_event = cancel_event
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+
+    def progress(self, done, total=None, message=None):
+        """Records progress and raises JobCancelled if the job was cancelled meanwhile."""
+        self.manager._update(self.job_id, progress=done, total=total, message=message)
+        self.check_cancelled()
+
+
+class JobManager:
+    """
+    Worker pool for long-running work (extraction, enrichment, optimization) with a
+    persistent SQLite job table. submit() returns a job id immediately; status, progress,
+    result and errors are polled from the table. Jobs still queued or running when the
+    process died are marked failed on startup.
+    """
+
+    def __init__(self, db_path, max_workers=4):
+        self.db_path = db_path
+        self.handlers = {}
+        self._events = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        with self._connect() as db:
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    params TEXT,
+                    progress REAL,
+                    total REAL,
+                    message TEXT,
+                    result TEXT,
+                    error TEXT,
+                    created REAL,
+                    started REAL,
+                    finished REAL
+                )
+            """)
+            db.execute(
+                "UPDATE jobs SET status = 'failed', error = 'Interrupted by server restart.', finished = ? "
+                "WHERE status IN ('queued', 'running')",
+                (time.time(),)
+            )
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """A connection that commits (or rolls back) and is closed when the with block exits."""
+        db = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def _update(self, job_id, **fields):
+        fields = {k: v for k, v in fields.items() if v is not None}
+        if not fields:
+            return
+        assignments = ", ".join(f"{k} = ?" for k in fields)
+        with self._lock, self._connect() as db:
+            db.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def register(self, kind, handler):
+        """handler(ctx, **params) runs in a worker thread and returns a JSON-serialisable result."""
+        self.handlers[kind] = handler
+
+    def submit(self, kind, **params):
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job type: {kind}")
+        job_id = uuid.uuid4().hex
+        with self._lock, self._connect() as db:
+            db.execute(
+                "INSERT INTO jobs (id, kind, status, params, created) VALUES (?, ?, 'queued', ?, ?)",
+                (job_id, kind, json.dumps(params), time.time())
+            )
+            self._events[job_id] = threading.Event()
+        self._executor.submit(self._run, job_id, kind, params)
+        return job_id
+
+    def _run(self, job_id, kind, params):
+        event = self._events[job_id]
+        if event.is_set():
+            self._update(job_id, status="cancelled", finished=time.time())
+            return
+        self._update(job_id, status="running", started=time.time())
+        start = time.perf_counter()
+        status = "failed"
+        try:
+            result = self.handlers[kind](JobContext(self, job_id, event), **params)
+            self._update(job_id, status="done", result=json.dumps(result), finished=time.time())
+            status = "done"
+        except JobCancelled:
+            self._update(job_id, status="cancelled", finished=time.time())
+            status = "cancelled"
+        except Exception as e:
+            traceback.print_exc()
+            self._update(job_id, status="failed", error=str(e), finished=time.time())
+        finally:
+            observe("job_duration_seconds", time.perf_counter() - start, kind=kind)
+            inc("jobs_total", kind=kind, status=status)
+            with self._lock:
+                self._events.pop(job_id, None)
+
+    def cancel(self, job_id):
+        """Requests cancellation; returns False if the job is unknown or already finished."""
+        with self._lock:
+            event = self._events.get(job_id)
+        if event is None:
+            return False
+        event.set()
+        return True
+
+    def get(self, job_id, include_result=False):
+        with self._connect() as db:
+            db.row_factory = sqlite3.Row
+            row = db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["params"] = json.loads(job["params"] or "{}")
+        result = job.pop("result")
+        if include_result:
+            job["result"] = json.loads(result) if result else None
+        return job
+
+    def list(self, limit=50):
+        with self._connect() as db:
+            db.row_factory = sqlite3.Row
+            rows = db.execute(
+                "SELECT id, kind, status, progress, total, message, error, created, started, finished "
+                "FROM jobs ORDER BY created DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [dict(r) for r in rows]
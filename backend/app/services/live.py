@@ -0,0 +1,435 @@
+import heapq
+import logging
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from services.add_prices_to_signals import InvalidSymbol, get_symbol
+from services.candle_store import interval_to_ms, to_ms
+from services.incremental_extraction import message_text, signals_frame
+from services.metrics import max_drawdown_pct
+from services.plot_backtest_stats import DEFAULT_MAX_POINTS, lttb_indices
+from services.signal_parser import DEFAULT_PATTERNS, patterns_for
+from services.telemetry import inc
+
+SIGNS = {"bullish": 1, "bearish": -1}
+
+log = logging.getLogger(__name__)
+
+
+class Position:
+    """State of one tracked signal; updated in place on every candle of its symbol."""
+
+    __slots__ = (
+        "id", "symbol", "coin", "direction", "sign", "signal_time", "entry_after", "entry_time", "entry",
+        "tp_price", "sl_price", "candles", "mae", "mfe", "last_close", "message_id", "channel_id", "error",
+    )
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__ if name not in ("sign", "entry_after")}
+
+
+class LiveTracker:
+    """
+    Tracks open signals as candles arrive and closes them on TP/SL with the same rules as
+    services.path_simulation.simulate_paths: entry is the close of the first candle opening at
+    or after the signal, that candle's high/low already count, SL wins when both levels are
+    touched in one candle and trades still open after max_candles exit at the last close.
+    Each candle only touches the open positions of its own symbol, O(1) work per position.
+    Closed trades compound into a balance the same way as services.metrics.compound_equity;
+    the equity curve also gets a mark-to-market point (balance with the open positions'
+    unrealized gains compounded in) for every candle time.
+    """
+
+    def __init__(self, risk_pct=0.05, risk_reward=3.0, risk_per_trade=0.01, initial_balance=1000,
+                 interval="1m", lookahead_minutes=60 * 6):
+        self.risk_pct = risk_pct
+        self.risk_reward = risk_reward
+        self.risk_per_trade = risk_per_trade
+        self.initial_balance = initial_balance
+        self.balance = initial_balance
+        self.step = interval_to_ms(interval)
+        self.max_candles = lookahead_minutes * 60_000 // self.step
+        self.open_by_symbol = {}
+        self.closed = []
+        self.errored = []
+        self.wins = 0
+        self.equity_times = []
+        self.equity = []
+        self.last_time = None
+        self.version = 0
+        self._next_id = 0
+        self._unrealized = {}
+        self._changed = threading.Condition()
+
+    def add_signal(self, coin, direction, timestamp, message_id=None, channel_id=None):
+        """Starts tracking a signal; returns its Position, or None for an unknown direction."""
+        sign = SIGNS.get(str(direction).lower())
+        if sign is None:
+            return None
+        p = Position()
+        p.id = self._next_id
+        p.coin = str(coin).upper()
+        p.symbol = get_symbol(p.coin)
+        p.direction = direction
+        p.sign = sign
+        p.signal_time = to_ms(timestamp)
+        p.entry_after = -(-p.signal_time // self.step) * self.step
+        p.entry_time = p.entry = p.tp_price = p.sl_price = p.last_close = None
+        p.candles = 0
+        p.mae = p.mfe = 0.0
+        p.message_id = message_id
+        p.channel_id = channel_id
+        p.error = None
+        with self._changed:
+            self._next_id += 1
+            self.open_by_symbol.setdefault(p.symbol, []).append(p)
+            self._notify()
+        inc("live_signals_total")
+        return p
+
+    def symbols(self):
+        return list(self.open_by_symbol)
+
+    def on_candle(self, symbol, candle):
+        """
+        Feeds one closed candle (open_time, open, high, low, close[, volume]) of symbol.
+        Returns the trades it closed.
+        """
+        open_time, high, low, close = int(candle[0]), float(candle[2]), float(candle[3]), float(candle[4])
+        closed = []
+        with self._changed:
+            positions = self.open_by_symbol.get(symbol)
+            if not positions:
+                return closed
+            still_open = []
+            for p in positions:
+                if open_time < p.entry_after:
+                    still_open.append(p)
+                    continue
+                if p.entry is None:
+                    p.entry = close
+                    p.entry_time = open_time
+                    p.sl_price = close * (1 - p.sign * self.risk_pct)
+                    p.tp_price = close * (1 + p.sign * self.risk_pct * self.risk_reward)
+                p.candles += 1
+                p.last_close = close
+                p.error = None
+                favorable = p.sign * ((high if p.sign > 0 else low) / p.entry - 1)
+                adverse = p.sign * ((low if p.sign > 0 else high) / p.entry - 1)
+                p.mfe = max(p.mfe, favorable)
+                p.mae = min(p.mae, adverse)
+                if adverse <= -self.risk_pct:
+                    closed.append(self._close(p, "SL", p.sl_price, open_time))
+                elif favorable >= self.risk_pct * self.risk_reward:
+                    closed.append(self._close(p, "TP", p.tp_price, open_time))
+                elif p.candles >= self.max_candles:
+                    closed.append(self._close(p, "None", close, open_time))
+                else:
+                    still_open.append(p)
+            if still_open:
+                self.open_by_symbol[symbol] = still_open
+            else:
+                del self.open_by_symbol[symbol]
+            self._mark(symbol, open_time)
+            self.last_time = open_time if self.last_time is None else max(self.last_time, open_time)
+            if closed:
+                self._notify()
+        return closed
+
+    def _close(self, p, outcome, exit_price, exit_time):
+        gain_pct = p.sign * (exit_price / p.entry - 1) * 100
+        self.balance *= 1 + self.risk_per_trade * gain_pct / 100
+        trade = {
+            **p.as_dict(), "outcome": outcome, "exit_time": exit_time, "exit_price": exit_price,
+            "gain_pct": gain_pct, "mae_pct": -p.mae * 100, "mfe_pct": p.mfe * 100, "balance": self.balance,
+        }
+        self.closed.append(trade)
+        self.wins += gain_pct > 0
+        inc("live_trades_closed_total", outcome=outcome)
+        return trade
+
+    def _mark(self, symbol, open_time):
+        # Per-symbol factors keep a mark O(open symbols) instead of O(open positions)
+        factor = 1.0
+        for p in self.open_by_symbol.get(symbol, ()):
+            if p.entry is not None:
+                factor *= 1 + self.risk_per_trade * p.sign * (p.last_close / p.entry - 1)
+        if factor != 1.0:
+            self._unrealized[symbol] = factor
+        else:
+            self._unrealized.pop(symbol, None)
+        equity = self.balance * float(np.prod(list(self._unrealized.values())))
+        # One point per candle time: later candles (and closes) of the same time replace it
+        if self.equity_times and self.equity_times[-1] == open_time:
+            self.equity[-1] = equity
+        else:
+            self.equity_times.append(open_time)
+            self.equity.append(equity)
+
+    def mark_error(self, symbol, error, drop=False):
+        """
+        Records a failed candle fetch on the open positions of symbol. With drop (e.g. the
+        exchange does not list the symbol) they stop being tracked and move to the errored
+        list without touching the balance; otherwise they wait for the next successful fetch.
+        """
+        with self._changed:
+            positions = self.open_by_symbol.get(symbol, [])
+            for p in positions:
+                p.error = str(error)
+            if drop and positions:
+                del self.open_by_symbol[symbol]
+                self._unrealized.pop(symbol, None)
+                self.errored.extend({**p.as_dict(), "outcome": "Error"} for p in positions)
+                inc("live_positions_errored_total", value=len(positions))
+            self._notify()
+
+    def _notify(self):
+        self.version += 1
+        self._changed.notify_all()
+
+    def wait(self, since_version, timeout=None):
+        """Blocks until the state changed after since_version (or timeout); returns the new version."""
+        with self._changed:
+            self._changed.wait_for(lambda: self.version != since_version, timeout)
+            return self.version
+
+    def snapshot(self, max_points=DEFAULT_MAX_POINTS):
+        """Balance, open positions with their unrealized gain, recent trades and the (downsampled) equity curve."""
+        with self._changed:
+            positions = [p for ps in self.open_by_symbol.values() for p in ps]
+            open_positions = [
+                {**p.as_dict(), "unrealized_pct": None if p.entry is None else p.sign * (p.last_close / p.entry - 1) * 100}
+                for p in positions
+            ]
+            times = np.asarray(self.equity_times, dtype="int64")
+            equity = np.asarray(self.equity, dtype=float)
+            recent = self.closed[-20:]
+            errored = list(self.errored)
+            version, balance, n_closed, last_time = self.version, self.balance, len(self.closed), self.last_time
+            wins = self.wins
+        keep = lttb_indices(times, equity, max_points)
+        return {
+            "version": version,
+            "balance": balance,
+            "initial_balance": self.initial_balance,
+            "last_candle": last_time,
+            "closed_trades": n_closed,
+            "win_rate": wins / n_closed * 100 if n_closed else 0.0,
+            "max_drawdown_pct": float(max_drawdown_pct(equity, self.initial_balance)),
+            "open_positions": open_positions,
+            "recent_trades": recent,
+            "errored_positions": errored,
+            "equity_curve": {
+                "timestamps": pd.to_datetime(times[keep], unit="ms", utc=True).strftime('%Y-%m-%d %H:%M').tolist(),
+                "equity": equity[keep].round(2).tolist(),
+                "total_points": len(equity),
+            },
+        }
+
+    def run(self, feed, signals=None, stop=None):
+        """
+        Drives the tracker from a feed of (symbol, candle) in time order until it ends or stop is set.
+        signals (a session DataFrame, for replays) are added once the feed reaches their time.
+        """
+        pending = []
+        if signals is not None and len(signals):
+            ordered = signals.assign(_ms=pd.to_datetime(signals['timestamp'], utc=True).map(to_ms)).sort_values('_ms')
+            pending = ordered.to_dict("records")[::-1]
+        for symbol, candle in feed:
+            if stop is not None and stop.is_set():
+                break
+            while pending and pending[-1]['_ms'] <= candle[0]:
+                s = pending.pop()
+                self.add_signal(s['coin'], s['direction'], s['_ms'], s.get('message_id'), s.get('channel_id'))
+            self.on_candle(symbol, candle)
+
+
+class ReplayFeed:
+    """Recorded candles from a CandleStore for the given symbols, merged into one time-ordered stream."""
+
+    def __init__(self, store, symbols, start_ms, end_ms, interval="1m", delay=0.0):
+        self.store = store
+        self.symbols = list(symbols)
+        self.start_ms = start_ms
+        self.end_ms = end_ms
+        self.interval = interval
+        self.delay = delay
+
+    def subscribe(self, symbol):
+        pass
+
+    def _stream(self, symbol):
+        for candle in self.store.load(symbol, self.interval, self.start_ms, self.end_ms):
+            yield candle[0], symbol, candle
+
+    def __iter__(self):
+        streams = [self._stream(symbol) for symbol in self.symbols]
+        for open_time, symbol, candle in heapq.merge(*streams, key=lambda item: item[0]):
+            yield symbol, candle
+            if self.delay:
+                time.sleep(self.delay)
+
+
+class PollingFeed:
+    """
+    Closed candles polled from Binance (a KlineFetcher) for the subscribed symbols every
+    poll_seconds. Candles are yielded once each, oldest first per poll.
+    A failed fetch only skips its symbol: the error is kept in errors and passed to
+    on_error(symbol, error, drop), and the symbol is retried on the next poll unless the
+    exchange rejected it as invalid (drop=True), which unsubscribes it.
+    """
+
+    def __init__(self, fetcher=None, interval="1m", poll_seconds=5.0, symbols=(), on_error=None):
+        if fetcher is None:
+            from services.add_prices_to_signals import fetcher
+        self.fetcher = fetcher
+        self.interval = interval
+        self.step = interval_to_ms(interval)
+        self.poll_seconds = poll_seconds
+        self.last_seen = {}
+        # subscribe() runs on the Telegram listener thread, poll() on the feed thread
+        self._lock = threading.Lock()
+        self.errors = {}
+        self.on_error = on_error
+        self.stopped = threading.Event()
+        for symbol in symbols:
+            self.subscribe(symbol)
+
+    def subscribe(self, symbol):
+        # Start from the candle still forming, so only candles closing from now on are replayed
+        with self._lock:
+            self.last_seen.setdefault(symbol, (int(time.time() * 1000) // self.step - 1) * self.step)
+
+    def stop(self):
+        self.stopped.set()
+
+    def poll(self):
+        last_closed = (int(time.time() * 1000) // self.step - 1) * self.step
+        batch = []
+        with self._lock:
+            subscribed = list(self.last_seen.items())
+        # Fetches run without the lock so subscribe() never waits on the network
+        for symbol, seen in subscribed:
+            if seen >= last_closed:
+                continue
+            try:
+                rows = self.fetcher(symbol, self.interval, seen + self.step, last_closed)
+            except Exception as e:
+                self._failed(symbol, e)
+                continue
+            self.errors.pop(symbol, None)
+            for row in rows:
+                candle = np.asarray(row[:6], dtype=float)
+                if candle[0] <= last_closed:
+                    batch.append((candle[0], symbol, candle))
+            with self._lock:
+                self.last_seen[symbol] = last_closed
+        return [(symbol, candle) for _, symbol, candle in sorted(batch, key=lambda item: item[0])]
+
+    def _failed(self, symbol, error):
+        drop = isinstance(error, InvalidSymbol)
+        if drop:
+            with self._lock:
+                self.last_seen.pop(symbol, None)
+        self.errors[symbol] = str(error)
+        inc("live_poll_errors_total", dropped=str(drop).lower())
+        log.warning("Polling %s failed%s: %s", symbol, " (unsubscribed)" if drop else "", error)
+        if self.on_error:
+            self.on_error(symbol, error, drop)
+
+    def __iter__(self):
+        while not self.stopped.is_set():
+            yield from self.poll()
+            self.stopped.wait(self.poll_seconds)
+
+
+class LiveSession:
+    """A tracker driven by a feed on a background thread; new signals also subscribe the feed to their symbol."""
+
+    def __init__(self, tracker, feed, signals=None):
+        self.tracker = tracker
+        self.feed = feed
+        self.signals = signals
+        self.started = time.time()
+        self.error = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._unlisten = None
+
+    def add_signal(self, signal):
+        position = self.tracker.add_signal(
+            signal['coin'], signal['direction'], signal['timestamp'], signal.get('message_id'), signal.get('channel_id')
+        )
+        if position is not None:
+            self.feed.subscribe(position.symbol)
+        return position
+
+    def _run(self):
+        try:
+            self.tracker.run(self.feed, self.signals, self._stop)
+        except Exception as e:
+            self.error = str(e)
+            log.exception("Live feed stopped")
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="live-feed", daemon=True)
+        self._thread.start()
+        return self
+
+    def listen(self, pool, channels, patterns=DEFAULT_PATTERNS):
+        self._unlisten = listen_for_signals(pool, channels, self.add_signal, patterns)
+        return self
+
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def stop(self):
+        if self._unlisten:
+            self._unlisten()
+            self._unlisten = None
+        self._stop.set()
+        if hasattr(self.feed, "stop"):
+            self.feed.stop()
+        if self._thread:
+            self._thread.join(timeout=10)
+
+
+def listen_for_signals(pool, channels, on_signal, patterns=DEFAULT_PATTERNS):
+    """
+    Registers a Telethon NewMessage handler for channels on the pool's client. Messages are
+    parsed with the extraction patterns (a channel's own "patterns" names, if set) and every
+    signal row is passed to on_signal(dict). Returns a function that removes the handler.
+    """
+    from telethon import events
+
+    channel_patterns = {
+        c["channel_id"]: patterns_for(c["patterns"]) if c.get("patterns") else patterns for c in channels
+    }
+
+    async def handler(event):
+        message = event.message
+        text = message_text(message)
+        if not text or not message.date:
+            return
+        channel_id = getattr(message.peer_id, "channel_id", None)
+        parse_with = channel_patterns.get(channel_id, patterns)
+        for signal in signals_frame([text], [message.date], [message.id], parse_with).to_dict("records"):
+            signal['channel_id'] = channel_id
+            on_signal(signal)
+
+    event_filter = events.NewMessage(chats=[pool.peer_factory(c["channel_id"], c["access_hash"]) for c in channels])
+
+    async def attach():
+        client = await pool.client()
+        client.add_event_handler(handler, event_filter)
+        return client
+
+    client = pool.run(attach())
+
+    async def detach():
+        client.remove_event_handler(handler, event_filter)
+
+    return lambda: pool.run(detach())
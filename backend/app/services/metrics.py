@@ -0,0 +1,97 @@
+import numpy as np
+
+# All kernels take trades along the last axis, so they work on a single trade sequence
+# (n_trades,) as well as on stacked grids (n_points, n_trades).
+
+
+def compound_equity(gain_pct, risk, initial_balance=1000):
+    """
+    Balance after each trade when every trade risks `risk` (a fraction, broadcastable
+    against gain_pct) of the current balance and returns gain_pct percent of that stake.
+    """
+    factors = 1 + np.asarray(risk, dtype=float) * np.asarray(gain_pct, dtype=float) / 100
+    return initial_balance * np.cumprod(factors, axis=-1)
+
+
+def max_drawdown_pct(equity, initial_balance=None):
+    """Largest peak-to-trough drop in percent. initial_balance, if given, counts as the first peak."""
+    equity = np.asarray(equity, dtype=float)
+    if equity.shape[-1] == 0:
+        return np.zeros(equity.shape[:-1])[()]
+    peak = np.maximum.accumulate(equity, axis=-1)
+    if initial_balance is not None:
+        peak = np.maximum(peak, initial_balance)
+    return np.max((1 - equity / peak) * 100, axis=-1)[()]
+
+
+def _ratio(numerator, denominator):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denominator > 0, numerator / denominator, 0.0)[()]
+
+
+def sharpe_ratio(returns):
+    """Mean over sample standard deviation of per-trade returns (not annualised)."""
+    returns = np.asarray(returns, dtype=float)
+    if returns.shape[-1] < 2:
+        return np.zeros(returns.shape[:-1])[()]
+    return _ratio(returns.mean(axis=-1), returns.std(axis=-1, ddof=1))
+
+
+def sortino_ratio(returns):
+    """Mean over downside deviation (root mean square of the losing returns)."""
+    returns = np.asarray(returns, dtype=float)
+    if returns.shape[-1] == 0:
+        return np.zeros(returns.shape[:-1])[()]
+    downside = np.sqrt(np.mean(np.minimum(returns, 0) ** 2, axis=-1))
+    return _ratio(returns.mean(axis=-1), downside)
+
+
+def profit_factor(returns):
+    """Gross profit over gross loss; inf when nothing was lost, 0 without winning trades."""
+    returns = np.asarray(returns, dtype=float)
+    gross_profit = np.where(returns > 0, returns, 0).sum(axis=-1)
+    gross_loss = -np.where(returns < 0, returns, 0).sum(axis=-1)
+    return np.where(gross_loss > 0, _ratio(gross_profit, gross_loss), np.where(gross_profit > 0, np.inf, 0.0))[()]
+
+
+def win_rate(returns):
+    """Percentage of trades with a positive return."""
+    returns = np.asarray(returns, dtype=float)
+    if returns.shape[-1] == 0:
+        return np.zeros(returns.shape[:-1])[()]
+    return (np.mean(returns > 0, axis=-1) * 100)[()]
+
+
+def longest_streak(mask):
+    """Length of the longest run of True in a 1D boolean array."""
+    mask = np.asarray(mask, dtype=bool)
+    if not mask.any():
+        return 0
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return int((np.flatnonzero(edges == -1) - np.flatnonzero(edges == 1)).max())
+
+
+def trade_metrics(gain_pct, risk, initial_balance=1000):
+    """
+    Summary statistics of one sequence of trade returns (in percent): the equity curve,
+    final balance, total return, max drawdown, Sharpe/Sortino, profit factor, win rate
+    and the longest win/loss streaks. Profit factor is None ("undefined") whenever no trade
+    lost, including an empty trade list: there is no gross loss to divide by, and the inf
+    of profit_factor() is not valid JSON while these results go straight to jsonify.
+    """
+    gain_pct = np.asarray(gain_pct, dtype=float)
+    equity = compound_equity(gain_pct, risk, initial_balance)
+    final = float(equity[-1]) if len(equity) else float(initial_balance)
+    pf = float(profit_factor(gain_pct))
+    return {
+        "equity": equity,
+        "final_balance": final,
+        "total_return_pct": (final - initial_balance) / initial_balance * 100,
+        "max_drawdown_pct": float(max_drawdown_pct(equity, initial_balance)),
+        "sharpe": float(sharpe_ratio(gain_pct)),
+        "sortino": float(sortino_ratio(gain_pct)),
+        "profit_factor": pf if (gain_pct < 0).any() else None,
+        "win_rate_pct": float(win_rate(gain_pct)),
+        "longest_win_streak": longest_streak(gain_pct > 0),
+        "longest_loss_streak": longest_streak(gain_pct < 0),
+    }
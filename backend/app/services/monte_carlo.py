@@ -0,0 +1,133 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from services.metrics import compound_equity, max_drawdown_pct
+from services.optimize_strategy import MAX_CHUNK_ELEMENTS, capped_gains, trade_arrays
+from services.plot_backtest_stats import histogram
+
+METHODS = ("bootstrap", "shuffle")
+QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+
+# Worker-side copy of the trade returns, set once per process
+_trades = {}
+
+
+def _init_worker(gain_pct):
+    _trades["gain"] = gain_pct
+
+
+def resample_paths(gain_pct, n_paths, method, rng):
+    """
+    (n_paths, n_trades) array of trade returns: "bootstrap" draws trades with replacement,
+    "shuffle" permutes the original sequence (same trades, different order).
+    """
+    n = len(gain_pct)
+    if method == "bootstrap":
+        return gain_pct[rng.integers(0, n, size=(n_paths, n))]
+    if method == "shuffle":
+        return gain_pct[rng.permuted(np.broadcast_to(np.arange(n), (n_paths, n)), axis=1)]
+    raise ValueError(f"Unknown method: {method}")
+
+
+def simulate_chunk(n_paths, seed, method, risk_per_trade, initial_balance, ruin_balance, gain_pct=None):
+    """Final balance, max drawdown % and ruin flag of n_paths resampled equity paths."""
+    gain_pct = _trades["gain"] if gain_pct is None else gain_pct
+    rng = np.random.default_rng(seed)
+    equity = compound_equity(resample_paths(gain_pct, n_paths, method, rng), risk_per_trade, initial_balance)
+    return (
+        equity[:, -1],
+        max_drawdown_pct(equity, initial_balance),
+        equity.min(axis=1) <= ruin_balance,
+    )
+
+
+def _distribution(values, bins):
+    return {
+        **histogram(values, bins),
+        "quantiles": {f"p{round(q * 100)}": float(v) for q, v in zip(QUANTILES, np.quantile(values, QUANTILES))},
+    }
+
+
+def monte_carlo(
+    gain_pct,
+    n_paths=10_000,
+    method="bootstrap",
+    risk_per_trade=0.01,
+    initial_balance=1000,
+    ruin_pct=50,
+    seed=None,
+    processes=None,
+    bins=40,
+    progress=None
+):
+    """
+    Resamples the trade sequence n_paths times and compounds every path at once as a 2-D
+    array. Paths are split into chunks of at most MAX_CHUNK_ELEMENTS trades, each with its
+    own RNG stream spawned from seed, so results are reproducible whatever the number of
+    processes. processes=1 runs in-process.
+    A path is ruined once its balance falls to (1 - ruin_pct / 100) of the initial balance.
+    progress(done, total) is called per finished chunk; an exception raised from it aborts the run.
+    Returns distributions of final balance and max drawdown, plus the risk of ruin.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown method: {method}")
+    gain_pct = np.asarray(gain_pct, dtype=float)
+    gain_pct = gain_pct[np.isfinite(gain_pct)]
+    if not len(gain_pct):
+        raise ValueError("No trades to resample.")
+
+    per_chunk = max(1, MAX_CHUNK_ELEMENTS // len(gain_pct))
+    sizes = [min(per_chunk, n_paths - start) for start in range(0, n_paths, per_chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    ruin_balance = initial_balance * (1 - ruin_pct / 100)
+    args = [(size, s, method, risk_per_trade, initial_balance, ruin_balance) for size, s in zip(sizes, seeds)]
+
+    results = [None] * len(args)
+    if len(args) == 1 or processes == 1:
+        for i, a in enumerate(args):
+            results[i] = simulate_chunk(*a, gain_pct=gain_pct)
+            if progress:
+                progress(i + 1, len(args))
+    else:
+        # spawn: this runs in a job thread, and forking a threaded process can deadlock
+        pool = ProcessPoolExecutor(
+            max_workers=processes or os.cpu_count(), mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker, initargs=(gain_pct,)
+        )
+        try:
+            futures = {pool.submit(simulate_chunk, *a): i for i, a in enumerate(args)}
+            for done, future in enumerate(as_completed(futures), start=1):
+                results[futures[future]] = future.result()
+                if progress:
+                    progress(done, len(args))
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    final, drawdown, ruined = (np.concatenate(parts) for parts in zip(*results))
+    actual = compound_equity(gain_pct, risk_per_trade, initial_balance)
+    return {
+        "paths": int(n_paths),
+        "trades": int(len(gain_pct)),
+        "method": method,
+        "seed": seed,
+        "actual": {
+            "final_balance": float(actual[-1]),
+            "max_drawdown_pct": float(max_drawdown_pct(actual, initial_balance)),
+        },
+        "final_balance": _distribution(final, bins),
+        "max_drawdown_pct": _distribution(drawdown, bins),
+        "prob_loss": float(np.mean(final < initial_balance)),
+        "risk_of_ruin": float(np.mean(ruined)),
+        "ruin_pct": ruin_pct,
+    }
+
+
+def session_trades(df, sl=None, tp=None):
+    """Trade returns of a backtested session, optionally re-capped at a given SL/TP."""
+    gain, drawdown = trade_arrays(df)
+    if sl is None or tp is None:
+        return gain
+    return capped_gains(gain, drawdown, [sl], [tp])[0]
@@ -1,7 +1,88 @@
 import os
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+
+from services.metrics import compound_equity, max_drawdown_pct
+
+# Upper bound on grid points x trades held in memory at once
+MAX_CHUNK_ELEMENTS = 4_000_000
+
+
+def trade_arrays(df, gain_col='gain_pct', drawdown_col='drawdown_pct'):
+    """
+    Returns (gain, drawdown) float arrays for the rows with a recognised direction.
+    Missing values count as 0, like the row.get(..., 0) lookups they replace.
+    """
+    if 'direction' in df.columns:
+        direction = df['direction'].astype(str).str.lower()
+        valid = direction.isin(["bullish", "bearish"]).to_numpy()
+    else:
+        valid = np.zeros(len(df), dtype=bool)
+
+    def column(name):
+        if name not in df.columns:
+            return np.zeros(int(valid.sum()))
+        return pd.to_numeric(df[name], errors='coerce').fillna(0).to_numpy(dtype=float)[valid]
+
+    return column(gain_col), np.abs(column(drawdown_col))
+
+
+def capped_gains(gain, drawdown, sl, tp):
+    """
+    Applies SL/TP to every trade for every grid point.
+    gain/drawdown are (n_trades,), sl/tp are (n_points,); returns (n_points, n_trades).
+    A trade whose drawdown reached the SL is a loss of -SL, else it is capped at TP.
+    """
+    sl = np.asarray(sl, dtype=float)[:, None]
+    tp = np.asarray(tp, dtype=float)[:, None]
+    return np.where(drawdown[None, :] >= sl, -sl, np.minimum(gain[None, :], tp))
+
+
+def equity_matrix(gain, drawdown, sl, tp, risk, initial_balance=1000):
+    """Compounded equity after each trade, shape (n_points, n_trades), via cumprod over trades."""
+    risk = np.asarray(risk, dtype=float)[:, None]
+    return compound_equity(capped_gains(gain, drawdown, sl, tp), risk, initial_balance)
+
+
+def final_balances(gain, drawdown, sl, tp, risk, initial_balance=1000, with_drawdown=False):
+    """
+    Final balance for every grid point, evaluated in chunks to bound memory.
+    with_drawdown=True returns (final balances, max drawdown %) from the same equity chunks.
+    """
+    sl, tp, risk = (np.asarray(v, dtype=float) for v in (sl, tp, risk))
+    out = np.full(len(sl), float(initial_balance))
+    max_dd = np.zeros(len(sl))
+    if len(gain):
+        step = max(1, MAX_CHUNK_ELEMENTS // len(gain))
+        for i in range(0, len(sl), step):
+            s = slice(i, i + step)
+            equity = equity_matrix(gain, drawdown, sl[s], tp[s], risk[s], initial_balance)
+            out[s] = equity[:, -1]
+            if with_drawdown:
+                max_dd[s] = max_drawdown_pct(equity, initial_balance)
+    return (out, max_dd) if with_drawdown else out
+
+
+def equity_curves(df, configs, initial_balance=1000, risk_per_trade=0.01):
+    """
+    Recomputes the equity curves for selected rows of an optimize_strategy result
+    (e.g. result_df.head(10)). Returns an (n_configs, n_trades) array in configs order.
+    """
+    configs = configs.reset_index(drop=True)
+    risk = configs['Risk %'].to_numpy(dtype=float) / 100 if 'Risk %' in configs else np.full(len(configs), risk_per_trade)
+    horizons = configs['Lookahead'].tolist() if 'Lookahead' in configs else [None] * len(configs)
+    curves = np.empty((len(configs), 0))
+    for horizon in dict.fromkeys(horizons):
+        idx = np.array([i for i, h in enumerate(horizons) if h == horizon])
+        suffix = "" if horizon is None else f"_{horizon}"
+        gain, drawdown = trade_arrays(df, f"gain_pct{suffix}", f"drawdown_pct{suffix}")
+        if curves.shape[1] != len(gain):
+            curves = np.empty((len(configs), len(gain)))
+        curves[idx] = equity_matrix(
+            gain, drawdown, configs['SL%'].to_numpy()[idx], configs['TP%'].to_numpy()[idx], risk[idx], initial_balance
+        )
+    return curves
+
 
 def optimize_strategy(
     df,
@@ -9,85 +90,66 @@ def optimize_strategy(
     tp_values=[3, 4.5, 5, 6, 7],
     risk_per_trade=0.01,
     initial_balance=1000,
-    output_dir="simulations"
+    output_dir="simulations",
+    risk_values=None,
+    lookahead_values=None,
+    render_top_n=0
 ):
     """
     Run SL/TP optimization on the given DataFrame.
-    Saves equity curves and a heatmap to output_dir.
-    Returns a DataFrame with results for each SL/TP combination.
+    The whole grid is evaluated with NumPy broadcasting, so fine grids of thousands
+    of combinations are cheap. Optional extra dimensions:
+      risk_values      - list of risk-per-trade fractions (adds a 'Risk %' column)
+      lookahead_values - list of horizons h (minutes), read from gain_pct_{h}/drawdown_pct_{h}
+                         columns (adds a 'Lookahead' column); build them from stored
+                         candles with services.path_simulation.horizon_columns
+    Max Drawdown % comes from the same equity curves (see services.metrics).
+    Saves strategy_summary.csv to output_dir and returns the results DataFrame, best first;
+    the CSV keeps its original columns, so Max Drawdown % is only in the DataFrame.
+    Charts are opt-in: render_top_n > 0 renders the heatmap and the top-N equity curves
+    (see services.render_charts); equity_curves() gives the raw arrays.
     """
-    os.makedirs(output_dir, exist_ok=True)
-    results = []
-
-    for sl in sl_values:
-        for tp in tp_values:
-            balance = initial_balance
-            equity_curve = []
-
-            for _, row in df.iterrows():
-                drawdown = abs(row.get('drawdown_pct', 0))
-                direction = str(row.get('direction', '')).lower()
-                gain_pct = None
-
-                if direction == "bullish":
-                    if drawdown >= sl:
-                        gain_pct = -sl
-                    elif row.get('gain_pct', 0) >= tp:
-                        gain_pct = tp
-                    else:
-                        gain_pct = row.get('gain_pct', 0)
-                elif direction == "bearish":
-                    if drawdown >= sl:
-                        gain_pct = -sl
-                    elif row.get('gain_pct', 0) >= tp:
-                        gain_pct = tp
-                    else:
-                        gain_pct = row.get('gain_pct', 0)
-                else:
-                    continue  # skip unrecognized
-
-                profit = balance * risk_per_trade * (gain_pct / 100)
-                balance += profit
-                equity_curve.append(balance)
-
-            gain = balance - initial_balance
-            percent_return = (gain / initial_balance) * 100
-            results.append({
-                'SL%': sl,
-                'TP%': tp,
-                'Final Balance': round(balance, 2),
-                'Total Return %': round(percent_return, 2)
-            })
-
-            # Save equity curve chart
-            plt.figure(figsize=(10, 4))
-            plt.plot(equity_curve, label=f'SL: {sl}% | TP: {tp}%', color='blue')
-            plt.title(f'Equity Curve - SL: {sl}% | TP: {tp}%')
-            plt.xlabel("Trades")
-            plt.ylabel("Equity ($)")
-            plt.grid(True)
-            plt.tight_layout()
-            plt.savefig(f"{output_dir}/equity_SL{sl}_TP{tp}.png")
-            plt.close()
-
-    # Convert to DataFrame
-    result_df = pd.DataFrame(results).sort_values(by="Final Balance", ascending=False)
-    result_df.to_csv(f"{output_dir}/strategy_summary.csv", index=False)
-
-    # Plot heatmap
-    heatmap_data = result_df.pivot(index="SL%", columns="TP%", values="Total Return %")
-    plt.figure(figsize=(10, 6))
-    sns.heatmap(heatmap_data, annot=True, fmt=".1f", cmap="YlGnBu")
-    plt.title("Total Return % (Final Equity) - SL vs TP")
-    plt.tight_layout()
-    plt.savefig(f"{output_dir}/sl_tp_heatmap.png")
-    plt.close()
-
-    print(f"✅ Optimization complete. Results saved to {output_dir}")
+    if render_top_n and not output_dir:
+        raise ValueError("render_top_n needs an output_dir to write the charts to.")
+    risks = list(risk_values) if risk_values is not None else [risk_per_trade]
+    horizons = list(lookahead_values) if lookahead_values is not None else [None]
+    missing = [f"gain_pct_{h}" for h in horizons if h is not None and f"gain_pct_{h}" not in df.columns]
+    if missing:
+        raise ValueError(f"Missing lookahead columns {missing}; add them with path_simulation.horizon_columns().")
+
+    sl_grid, tp_grid, risk_grid = (g.ravel() for g in np.meshgrid(sl_values, tp_values, risks, indexing="ij"))
+    frames = []
+    for horizon in horizons:
+        suffix = "" if horizon is None else f"_{horizon}"
+        gain, drawdown = trade_arrays(df, f"gain_pct{suffix}", f"drawdown_pct{suffix}")
+        balance, max_dd = final_balances(gain, drawdown, sl_grid, tp_grid, risk_grid, initial_balance, with_drawdown=True)
+
+        frame = pd.DataFrame({'SL%': sl_grid, 'TP%': tp_grid})
+        if risk_values is not None:
+            frame['Risk %'] = risk_grid * 100
+        if lookahead_values is not None:
+            frame['Lookahead'] = horizon
+        frame['Final Balance'] = np.round(balance, 2)
+        frame['Total Return %'] = np.round((balance - initial_balance) / initial_balance * 100, 2)
+        frame['Max Drawdown %'] = np.round(max_dd, 2)
+        frames.append(frame)
+
+    result_df = pd.concat(frames, ignore_index=True).sort_values(by="Final Balance", ascending=False)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+        result_df.drop(columns=['Max Drawdown %']).to_csv(f"{output_dir}/strategy_summary.csv", index=False)
+
+    if render_top_n:
+        from services.render_charts import render_heatmap, render_top_equity_curves
+        render_heatmap(result_df, output_dir)
+        render_top_equity_curves(df, result_df, top_n=render_top_n, output_dir=output_dir,
+                                 initial_balance=initial_balance, risk_per_trade=risk_per_trade)
+
+    print(f"✅ Optimization complete. {len(result_df)} combinations evaluated.")
     return result_df
 
 # Optional: Allow running as a script
 if __name__ == "__main__":
     # Example usage: python optimize_strategy.py
     df = pd.read_csv("backtest_results.csv")
-    optimize_strategy(df)
\ No newline at end of file
+    optimize_strategy(df, render_top_n=25)
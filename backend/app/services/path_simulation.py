@@ -0,0 +1,212 @@
+import numpy as np
+import pandas as pd
+
+from services.add_prices_to_signals import get_symbol
+from services.candle_store import interval_to_ms, to_ms
+
+
+def direction_sign(directions):
+    """Maps 'Bullish'/'Bearish' (any case) to +1/-1, anything else to 0."""
+    d = pd.Series(directions).astype(str).str.lower()
+    return np.where(d == "bullish", 1, np.where(d == "bearish", -1, 0)).astype(np.int8)
+
+
+def build_candle_arrays(signals_df, store, lookahead_minutes=60*6, interval="1m"):
+    """
+    Loads the candle path after every signal from the candle store into contiguous
+    (n_signals, n_candles) buffers. Paths are left-aligned and NaN-padded when the store
+    has fewer candles than the lookahead. Entry price is the close of the first candle.
+    """
+    step = interval_to_ms(interval)
+    n_candles = lookahead_minutes * 60_000 // step
+    n = len(signals_df)
+    open_time = np.zeros((n, n_candles), dtype=np.int64)
+    high = np.full((n, n_candles), np.nan)
+    low = np.full((n, n_candles), np.nan)
+    close = np.full((n, n_candles), np.nan)
+
+    starts = pd.to_datetime(signals_df['timestamp'], utc=True).map(to_ms).to_numpy(dtype="int64")
+    symbols = signals_df['coin'].astype(str).map(get_symbol).to_numpy()
+    for symbol in np.unique(symbols):
+        idx = np.flatnonzero(symbols == symbol)
+        candles = store.load(symbol, interval, int(starts[idx].min()), int(starts[idx].max()) + lookahead_minutes * 60_000)
+        if not len(candles):
+            continue
+        lo = np.searchsorted(candles[:, 0], -(-starts[idx] // step) * step, side="left")
+        for i, a in zip(idx, lo):
+            path = candles[a:a + n_candles]
+            k = len(path)
+            open_time[i, :k] = path[:, 0]
+            high[i, :k] = path[:, 2]
+            low[i, :k] = path[:, 3]
+            close[i, :k] = path[:, 4]
+
+    return {
+        "open_time": open_time,
+        "high": high,
+        "low": low,
+        "close": close,
+        "entry_price": close[:, 0].copy(),
+    }
+
+
+def horizon_columns(signals_df, arrays, horizons, interval="1m"):
+    """
+    gain_pct_{h} / drawdown_pct_{h} columns for every lookahead h (minutes), computed from
+    build_candle_arrays output (loaded for at least max(horizons) minutes). As in
+    simulate_tp_sl, gain is the best move in the trade's direction and drawdown the worst
+    move against it over the first h minutes, in % of entry. These are the columns
+    optimize_strategy(lookahead_values=...) reads; rows without candles stay NaN.
+    """
+    sign = direction_sign(signals_df['direction']).astype(float)
+    entry = np.asarray(arrays["entry_price"], dtype=float)[:, None]
+    long = (sign > 0)[:, None]
+    favorable = np.where(long, arrays["high"], arrays["low"]) / entry - 1
+    adverse = np.where(long, arrays["low"], arrays["high"]) / entry - 1
+    # Running best/worst move, so each horizon is one column lookup
+    best = np.fmax.accumulate(favorable * sign[:, None], axis=1) * 100
+    worst = -np.fmin.accumulate(adverse * sign[:, None], axis=1) * 100
+    traded = sign != 0
+    columns = {}
+    for h in horizons:
+        k = min(max(int(h) * 60_000 // interval_to_ms(interval), 1), best.shape[1]) - 1
+        columns[f"gain_pct_{h}"] = np.where(traded, best[:, k], np.nan)
+        columns[f"drawdown_pct_{h}"] = np.where(traded, worst[:, k], np.nan)
+    return pd.DataFrame(columns, index=signals_df.index)
+
+
+def first_true(mask):
+    """Index of the first True along axis 1, or mask.shape[1] where a row has none."""
+    idx = mask.argmax(axis=1)
+    return np.where(mask.any(axis=1), idx, mask.shape[1])
+
+
+def simulate_paths(entry, sign, high, low, close, open_time=None, risk_pct=0.05, risk_reward=3.0):
+    """
+    Path-dependent TP/SL simulation for all signals at once.
+    entry and sign are (n,) arrays, high/low/close (n, T) candle buffers after entry.
+    Finds the first candle touching the TP and SL levels; when both are touched in the
+    same candle the SL is assumed to come first (1m candles carry no intrabar order).
+    Trades that touch neither exit at the last available close.
+    Returns a DataFrame with outcome, exit index/time/price, gain_pct and MAE/MFE in %.
+    """
+    entry = np.asarray(entry, dtype=float)
+    sign = np.asarray(sign, dtype=float)
+    high = np.ascontiguousarray(high, dtype=float)
+    low = np.ascontiguousarray(low, dtype=float)
+    close = np.ascontiguousarray(close, dtype=float)
+    n, T = high.shape
+    rows = np.arange(n)
+    long = (sign > 0)[:, None]
+
+    sl_price = entry * (1 - sign * risk_pct)
+    tp_price = entry * (1 + sign * risk_pct * risk_reward)
+
+    # Signed moves relative to entry: >0 is in the trade's favour for both directions
+    favorable = np.where(long, high, low)
+    favorable /= entry[:, None]
+    favorable -= 1
+    favorable *= sign[:, None]
+    adverse = np.where(long, low, high)
+    adverse /= entry[:, None]
+    adverse -= 1
+    adverse *= sign[:, None]
+
+    # NaN padding compares False, so padded candles never trigger an exit
+    with np.errstate(invalid="ignore"):
+        sl_idx = first_true(adverse <= -risk_pct)
+        tp_idx = first_true(favorable >= risk_pct * risk_reward)
+
+    last_idx = np.maximum((~np.isnan(close)).sum(axis=1) - 1, 0)
+    is_sl = (sl_idx < T) & (sl_idx <= tp_idx)
+    is_tp = (tp_idx < T) & ~is_sl
+    exit_idx = np.where(is_sl, sl_idx, np.where(is_tp, tp_idx, last_idx))
+    exit_price = np.where(is_sl, sl_price, np.where(is_tp, tp_price, close[rows, last_idx]))
+    gain_pct = sign * (exit_price / entry - 1) * 100
+
+    # Excursions measured up to and including the exit candle
+    after_exit = np.arange(T)[None, :] > exit_idx[:, None]
+    favorable[after_exit] = np.nan
+    adverse[after_exit] = np.nan
+    mfe_pct = np.fmax.reduce(favorable, axis=1) * 100
+    mae_pct = -np.fmin.reduce(adverse, axis=1) * 100
+
+    outcome = np.where(is_sl, "SL", np.where(is_tp, "TP", "None"))
+    result = pd.DataFrame({
+        "outcome": outcome,
+        "exit_idx": exit_idx,
+        "exit_price": exit_price,
+        "TP_price": tp_price,
+        "SL_price": sl_price,
+        "gain_pct": gain_pct,
+        "mae_pct": mae_pct,
+        "mfe_pct": mfe_pct,
+    })
+    if open_time is not None:
+        result["exit_time"] = pd.to_datetime(np.asarray(open_time)[rows, exit_idx], unit="ms", utc=True)
+    return result
+
+
+def backtest_paths(signals_df, arrays, risk_pct=0.05, risk_reward=3.0, exit_model=None, **exit_params):
+    """
+    Runs simulate_paths over candle arrays from build_candle_arrays and returns rows in the
+    backtest_results.csv layout (drawdown_pct is the MAE up to exit), plus exit/MFE columns.
+    exit_model names a model from services.exit_models (ladder, trailing, ...) whose exits
+    replace the fixed TP/SL ones; exit_params are passed to it.
+    """
+    sim = simulate_paths(
+        arrays["entry_price"], direction_sign(signals_df['direction']),
+        arrays["high"], arrays["low"], arrays["close"], arrays.get("open_time"),
+        risk_pct=risk_pct, risk_reward=risk_reward,
+    )
+    if exit_model is not None:
+        sim = apply_exit_model(sim, signals_df, arrays, exit_model, **exit_params)
+    result = pd.DataFrame({
+        "timestamp": signals_df['timestamp'].to_numpy(),
+        "coin": signals_df['coin'].to_numpy(),
+        "direction": signals_df['direction'].to_numpy(),
+        "entry_price": arrays["entry_price"],
+        "TP_price": sim["TP_price"],
+        "SL_price": sim["SL_price"],
+        "gain_pct": sim["gain_pct"].round(2),
+        "drawdown_pct": sim["mae_pct"].round(2),
+        "outcome": sim["outcome"],
+        "exit_time": sim.get("exit_time"),
+        "exit_price": sim["exit_price"],
+        "mfe_pct": sim["mfe_pct"].round(2),
+    })
+    if "targets_hit" in sim.columns:
+        result["targets_hit"] = sim["targets_hit"].to_numpy()
+    if 'raw_message' in signals_df.columns:
+        result["raw_message"] = signals_df['raw_message'].to_numpy()
+    return result[~np.isnan(arrays["entry_price"])].reset_index(drop=True)
+
+
+def apply_exit_model(sim, signals_df, arrays, exit_model, **exit_params):
+    """Overwrites outcome/exit/gain columns of a simulate_paths result with an exit model's, keeping MAE/MFE up to the new exit."""
+    from services.exit_models import simulate_exits
+    sign = direction_sign(signals_df['direction'])
+    exits = simulate_exits(
+        arrays["entry_price"], sign, arrays["high"], arrays["low"], arrays["close"], exit_model, **exit_params
+    )
+    rows = np.arange(len(sim))
+    exit_idx = exits["exit_idx"]
+    entry = np.asarray(arrays["entry_price"], dtype=float)
+    favorable = np.where((sign > 0)[:, None], arrays["high"], arrays["low"]) / entry[:, None] - 1
+    adverse = np.where((sign > 0)[:, None], arrays["low"], arrays["high"]) / entry[:, None] - 1
+    after_exit = np.arange(favorable.shape[1])[None, :] > exit_idx[:, None]
+    favorable = np.where(after_exit, np.nan, favorable * sign[:, None])
+    adverse = np.where(after_exit, np.nan, adverse * sign[:, None])
+    sim = sim.assign(
+        outcome=exits["outcome"],
+        exit_idx=exit_idx,
+        gain_pct=exits["gain_pct"],
+        # Blended exit price of all partial exits
+        exit_price=entry * (1 + sign * exits["gain_pct"] / 100),
+        targets_hit=exits["targets_hit"],
+        mae_pct=-np.fmin.reduce(adverse, axis=1) * 100,
+        mfe_pct=np.fmax.reduce(favorable, axis=1) * 100,
+    )
+    if arrays.get("open_time") is not None:
+        sim["exit_time"] = pd.to_datetime(np.asarray(arrays["open_time"])[rows, exit_idx], unit="ms", utc=True)
+    return sim
@@ -1,18 +1,90 @@
+import numpy as np
 import pandas as pd
 
-def get_equity_curve_data(df, capital=1000, risk_per_trade=0.01):
-    df = df.copy()
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
-    df = df.sort_values("timestamp")
-    equity = [capital]
-    for gain in df['gain_pct']:
-        last = equity[-1]
-        pnl = last * risk_per_trade * (gain / 100)
-        equity.append(last + pnl)
-    df['equity'] = equity[1:]
+from services.metrics import compound_equity
+from services.session_index import group_stats
+
+# Default chart resolution: payloads stay at a few KB whatever the trade count
+DEFAULT_MAX_POINTS = 200
+DEFAULT_BINS = 40
+DEFAULT_MAX_COINS = 30
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+def lttb_indices(x, y, max_points):
+    """
+    Largest-Triangle-Three-Buckets: picks max_points indices that keep the visual shape
+    of the (x, y) line. The first and last points are always kept.
+    """
+    n = len(y)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+    every = (n - 2) / (max_points - 2)
+    indices = np.empty(max_points, dtype=np.int64)
+    indices[0] = a = 0
+    for i in range(max_points - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        indices[i + 1] = a
+    indices[-1] = n - 1
+    return indices
+
+def minmax_indices(y, max_points):
+    """Keeps the endpoints plus the minimum and maximum of equal-sized buckets, in order."""
+    n = len(y)
+    buckets = (max_points - 2) // 2
+    if max_points >= n or buckets < 1:
+        return np.arange(n)
+    bounds = np.linspace(0, n, buckets + 1).astype(np.int64)
+    keep = [0, n - 1]
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        keep.append(start + int(y[start:end].argmin()))
+        keep.append(start + int(y[start:end].argmax()))
+    return np.unique(keep)
+
+def histogram(values, bins=DEFAULT_BINS):
+    """Histogram plus a few quantiles of the finite values."""
+    values = np.asarray(values, dtype=float)
+    values = values[np.isfinite(values)]
+    if not len(values):
+        return {"edges": [], "counts": [], "count": 0, "mean": None, "quantiles": {}}
+    counts, edges = np.histogram(values, bins=bins)
+    quantiles = np.quantile(values, QUANTILES)
+    return {
+        "edges": np.round(edges, 6).tolist(),
+        "counts": counts.tolist(),
+        "count": int(len(values)),
+        "mean": float(values.mean()),
+        "quantiles": {f"p{round(q * 100)}": float(v) for q, v in zip(QUANTILES, quantiles)},
+    }
+
+def get_equity_curve_data(df, capital=1000, risk_per_trade=0.01, max_points=DEFAULT_MAX_POINTS, method="lttb"):
+    """
+    Compounded equity after each trade, downsampled to at most max_points points with
+    LTTB (method="lttb") or per-bucket min/max (method="minmax").
+    """
+    timestamps = pd.to_datetime(df['timestamp'])
+    # Sort on plain datetime64 values; tz-aware columns would go through Python objects
+    naive = timestamps.dt.tz_convert(None) if timestamps.dt.tz is not None else timestamps
+    times = naive.to_numpy()
+    order = np.argsort(times, kind="stable")
+    timestamps = timestamps.iloc[order]
+    gains = np.nan_to_num(df['gain_pct'].to_numpy(dtype=float)[order])
+    equity = compound_equity(gains, risk_per_trade, capital)
+
+    if method == "minmax":
+        keep = minmax_indices(equity, max_points)
+    else:
+        x = times[order].astype("datetime64[s]").astype(np.float64)
+        keep = lttb_indices(x, equity, max_points)
     return {
-        "timestamps": df['timestamp'].dt.strftime('%Y-%m-%d %H:%M').tolist(),
-        "equity": df['equity'].tolist()
+        "timestamps": timestamps.iloc[keep].dt.strftime('%Y-%m-%d %H:%M').tolist(),
+        "equity": equity[keep].tolist(),
+        "total_points": int(len(equity))
     }
 
 def get_win_loss_data(df):
@@ -20,23 +92,51 @@ def get_win_loss_data(df):
     loss_count = (df['direction'].str.lower() == 'bearish').sum()
     return {'Buy Setup': int(win_count), 'Sell setup': int(loss_count)}
 
-def get_gain_distribution_data(df):
+def get_gain_distribution_data(df, bins=DEFAULT_BINS):
     if 'gain_pct' not in df.columns:
-        return []
-    return df['gain_pct'].dropna().tolist()
+        return histogram([], bins)
+    return histogram(df['gain_pct'].to_numpy(dtype=float), bins)
 
-def get_drawdown_distribution_data(df):
+def get_drawdown_distribution_data(df, bins=DEFAULT_BINS, max_coins=DEFAULT_MAX_COINS):
+    """Drawdown histogram plus count/median/p90 for the max_coins most traded coins."""
+    by_coin = {"coins": [], "count": [], "median": [], "p90": []}
     if 'drawdown_pct' not in df.columns or 'coin' not in df.columns:
-        return {"coins": [], "drawdowns": []}
+        return {**histogram([], bins), "by_coin": by_coin}
     df = df.dropna(subset=['drawdown_pct', 'coin'])
-    return {
-        "coins": df['coin'].tolist(),
-        "drawdowns": df['drawdown_pct'].tolist()
+    stats = (
+        df.groupby('coin', observed=True)['drawdown_pct']
+        .agg(count='count', median='median', p90=lambda s: s.quantile(0.9))
+        .sort_values('count', ascending=False, kind="stable")
+        .head(max_coins)
+    )
+    by_coin = {
+        "coins": stats.index.astype(str).tolist(),
+        "count": stats['count'].astype(int).tolist(),
+        "median": stats['median'].tolist(),
+        "p90": stats['p90'].tolist()
     }
+    return {**histogram(df['drawdown_pct'].to_numpy(dtype=float), bins), "by_coin": by_coin}
 
 def get_coin_performance_data(df):
     perf = df.groupby('coin')['gain_pct'].mean().sort_values()
     return {
         "coins": perf.index.tolist(),
         "avg_gain": perf.values.tolist()
-    }
\ No newline at end of file
+    }
+
+# Same payloads answered from a session's aggregate index (see services.session_index)
+
+def get_win_loss_from_index(index):
+    # "Bullish" and "bullish" are separate index keys; sum them like the full scan does
+    counts = {}
+    for key, stats in group_stats(index, 'direction').items():
+        counts[key.lower()] = counts.get(key.lower(), 0) + stats["rows"]
+    return {'Buy Setup': int(counts.get('bullish', 0)), 'Sell setup': int(counts.get('bearish', 0))}
+
+def get_coin_performance_from_index(index):
+    stats = group_stats(index, 'coin', 'gain_pct')
+    perf = sorted((s["mean"], coin) for coin, s in stats.items() if "mean" in s)
+    return {
+        "coins": [coin for _, coin in perf],
+        "avg_gain": [mean for mean, _ in perf]
+    }
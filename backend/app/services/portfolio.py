@@ -0,0 +1,251 @@
+import heapq
+
+import numpy as np
+import pandas as pd
+
+from services.candle_store import interval_to_ms
+from services.metrics import max_drawdown_pct
+from services.plot_backtest_stats import DEFAULT_MAX_POINTS, lttb_indices
+
+# Why a signal was not traded (index into the skip_reason column)
+SKIP_REASONS = ("", "max_positions", "coin_exposure", "capital")
+TAKEN, SKIP_POSITIONS, SKIP_COIN, SKIP_CAPITAL = range(4)
+DEFAULT_HOLD_MINUTES = 60 * 6
+
+
+def tradable_mask(df):
+    """Rows a portfolio can trade: a known gain_pct and entry time, and a bullish/bearish direction if given."""
+    from services.path_simulation import direction_sign
+    mask = np.isfinite(pd.to_numeric(df['gain_pct'], errors="coerce").to_numpy(dtype=float))
+    mask &= pd.to_datetime(df['timestamp'], utc=True, errors="coerce").notna().to_numpy()
+    if 'direction' in df.columns:
+        mask &= direction_sign(df['direction']) != 0
+    return mask
+
+
+def portfolio_arrays(df, hold_minutes=DEFAULT_HOLD_MINUTES):
+    """
+    Entry/exit times (epoch ms), coin codes and gain_pct of a backtested session, ordered by
+    entry time. Sessions without exit_time (simulate_tp_sl output) hold every trade
+    for hold_minutes.
+    """
+    entry = pd.to_datetime(df['timestamp'], utc=True).reset_index(drop=True)
+    entry_ms = entry.dt.tz_convert(None).to_numpy(dtype="datetime64[ms]").astype("int64")
+    exit_ms = entry_ms + hold_minutes * 60_000
+    if 'exit_time' in df.columns:
+        exits = pd.to_datetime(df['exit_time'], utc=True).reset_index(drop=True)
+        known = exits.notna().to_numpy()
+        exit_ms[known] = exits[known].dt.tz_convert(None).to_numpy(dtype="datetime64[ms]").astype("int64")
+    codes, coins = pd.factorize(df['coin'].astype(str).to_numpy())
+    order = np.argsort(entry_ms, kind="stable")
+    return {
+        "order": order,
+        "entry_ms": entry_ms[order],
+        "exit_ms": np.maximum(exit_ms[order], entry_ms[order]),
+        "coin": codes[order],
+        "coins": list(coins),
+        "gain_pct": df['gain_pct'].to_numpy(dtype=float)[order],
+    }
+
+
+def path_marks(signals_df, arrays, interval="1m"):
+    """
+    Mark-to-market inputs from build_candle_arrays output (built with the same interval):
+    per-signal start time and the signed return after each candle, (n, T) float32 with NaN
+    padding carried forward.
+    """
+    from services.path_simulation import direction_sign
+    sign = direction_sign(signals_df['direction']).astype(np.float32)
+    entry = arrays["entry_price"].astype(np.float32)
+    returns = sign[:, None] * (arrays["close"].astype(np.float32) / entry[:, None] - 1)
+    # Forward-fill padding so a mark past the stored path uses the last known close
+    valid = ~np.isnan(returns)
+    last = np.maximum.accumulate(np.where(valid, np.arange(returns.shape[1]), 0), axis=1)
+    returns = np.nan_to_num(np.take_along_axis(returns, last, axis=1))
+    return {"start_ms": arrays["open_time"][:, 0], "step_ms": interval_to_ms(interval), "returns": returns}
+
+
+def simulate_portfolio(
+    entry_ms,
+    exit_ms,
+    coin,
+    gain_pct,
+    risk_per_trade=0.01,
+    initial_balance=1000,
+    max_positions=None,
+    max_coin_exposure=None,
+    max_exposure=1.0,
+    marks=None,
+    progress=None,
+):
+    """
+    Event-driven portfolio over overlapping trades. Entries are walked in time order and open
+    positions sit in a heap keyed by exit time; exits due at or before an entry are settled
+    first, so freed capital can be reused by that entry.
+    Each accepted trade stakes risk_per_trade of current (realized) equity and returns
+    gain_pct of its stake at exit, so without overlaps this equals compound_equity.
+    A trade is skipped when max_positions are already open, when its coin's open stakes would
+    exceed max_coin_exposure x equity, or when all open stakes would exceed max_exposure x equity.
+    marks (see path_marks, in entry order) values open positions at every event; without it
+    open positions are carried at cost.
+    Position state lives in flat arrays indexed by trade; the open set is a swap-remove slot array.
+    """
+    entry_ms = np.asarray(entry_ms, dtype="int64")
+    exit_ms = np.asarray(exit_ms, dtype="int64")
+    n = len(entry_ms)
+    n_coins = int(coin.max()) + 1 if n else 0
+    stakes = np.zeros(n)
+    pnl = np.zeros(n)
+    status = np.zeros(n, dtype=np.int8)
+    taken = np.zeros(n, dtype=bool)
+
+    # Scalar-heavy loop: plain lists index much faster than numpy arrays
+    entries = entry_ms.tolist()
+    exits = exit_ms.tolist()
+    coins = np.asarray(coin).tolist()
+    returns = (np.asarray(gain_pct, dtype=float) / 100).tolist()
+    coin_stake = [0.0] * n_coins
+    open_slots = [0] * n
+    slot_of = [0] * n
+    n_open = 0
+    heap = []
+    equity = float(initial_balance)
+    allocated = 0.0
+    positions_cap = max_positions if max_positions else n + 1
+    max_open = 0
+
+    times = np.empty(2 * n, dtype="int64")
+    realized = np.empty(2 * n)
+    mtm = np.empty(2 * n) if marks is not None else None
+    n_events = 0
+    if marks is not None:
+        mark_start = np.asarray(marks["start_ms"], dtype="int64")
+        mark_step = marks["step_ms"]
+        mark_returns = marks["returns"]
+        last_col = mark_returns.shape[1] - 1
+
+    def settle(i):
+        nonlocal equity, allocated, n_open
+        stake = stakes[i]
+        gain = stake * returns[i]
+        pnl[i] = gain
+        equity += gain
+        allocated -= stake
+        c = coins[i]
+        coin_stake[c] -= stake
+        # Swap-remove from the open slots
+        n_open -= 1
+        moved = open_slots[n_open]
+        open_slots[slot_of[i]] = moved
+        slot_of[moved] = slot_of[i]
+
+    def record(t):
+        nonlocal n_events
+        times[n_events] = t
+        realized[n_events] = equity
+        if mtm is not None:
+            value = equity
+            if n_open:
+                idx = np.fromiter(open_slots[:n_open], dtype=np.int64, count=n_open)
+                col = np.clip((t - mark_start[idx]) // mark_step, 0, last_col)
+                value += float(stakes[idx] @ mark_returns[idx, col])
+            mtm[n_events] = value
+        n_events += 1
+
+    report_every = max(n // 100, 1)
+    for i in range(n):
+        t = entries[i]
+        while heap and heap[0][0] <= t:
+            exit_time, j = heapq.heappop(heap)
+            settle(j)
+            record(exit_time)
+
+        stake = equity * risk_per_trade
+        c = coins[i]
+        if n_open >= positions_cap:
+            status[i] = SKIP_POSITIONS
+        elif max_coin_exposure is not None and coin_stake[c] + stake > max_coin_exposure * equity + 1e-12:
+            status[i] = SKIP_COIN
+        elif allocated + stake > max_exposure * equity + 1e-12 or stake <= 0:
+            status[i] = SKIP_CAPITAL
+        else:
+            taken[i] = True
+            stakes[i] = stake
+            allocated += stake
+            coin_stake[c] += stake
+            open_slots[n_open] = i
+            slot_of[i] = n_open
+            n_open += 1
+            max_open = max(max_open, n_open)
+            heapq.heappush(heap, (exits[i], i))
+            record(t)
+        if progress and (i + 1) % report_every == 0:
+            progress(i + 1, n)
+
+    while heap:
+        exit_time, j = heapq.heappop(heap)
+        settle(j)
+        record(exit_time)
+
+    return {
+        "taken": taken,
+        "skip_reason": status,
+        "stake": stakes,
+        "pnl": pnl,
+        "times": times[:n_events],
+        "equity": realized[:n_events],
+        "mtm_equity": mtm[:n_events] if mtm is not None else None,
+        "final_balance": equity,
+        "max_open": max_open,
+    }
+
+
+def portfolio_backtest(df, risk_per_trade=0.01, initial_balance=1000, max_positions=None, max_coin_exposure=None,
+                       max_exposure=1.0, hold_minutes=DEFAULT_HOLD_MINUTES, marks=None, max_points=DEFAULT_MAX_POINTS,
+                       progress=None):
+    """
+    Runs simulate_portfolio over a backtested session and returns a JSON-friendly summary:
+    stats, skip counts, per-coin results and the (downsampled) equity curve.
+    Rows that cannot be traded (see tradable_mask) are left out and counted as invalid_signals.
+    marks, if given, must follow the session's row order.
+    """
+    valid = tradable_mask(df)
+    df = df[valid]
+    arrays = portfolio_arrays(df, hold_minutes)
+    if marks is not None:
+        rows = np.flatnonzero(valid)[arrays["order"]]
+        marks = {**marks, "start_ms": marks["start_ms"][rows], "returns": marks["returns"][rows]}
+    result = simulate_portfolio(
+        arrays["entry_ms"], arrays["exit_ms"], arrays["coin"], arrays["gain_pct"],
+        risk_per_trade=risk_per_trade, initial_balance=initial_balance, max_positions=max_positions,
+        max_coin_exposure=max_coin_exposure, max_exposure=max_exposure, marks=marks, progress=progress,
+    )
+    equity = result["mtm_equity"] if result["mtm_equity"] is not None else result["equity"]
+    times = result["times"]
+    keep = lttb_indices(times, equity, max_points)
+    taken = result["taken"]
+    skipped = np.bincount(result["skip_reason"], minlength=len(SKIP_REASONS))
+    by_coin = pd.DataFrame({"coin": arrays["coin"], "taken": taken, "pnl": result["pnl"]}).groupby("coin").agg(
+        trades=("taken", "sum"), pnl=("pnl", "sum")
+    )
+    return {
+        "final_balance": round(float(result["final_balance"]), 2),
+        "return_pct": round(float(result["final_balance"] / initial_balance - 1) * 100, 2),
+        "max_drawdown_pct": round(float(max_drawdown_pct(equity, initial_balance)), 2),
+        "signals": int(len(taken)),
+        "invalid_signals": int((~valid).sum()),
+        "trades": int(taken.sum()),
+        "skipped": {reason: int(count) for reason, count in zip(SKIP_REASONS[1:], skipped[1:])},
+        "max_open_positions": result["max_open"],
+        "win_rate": round(float((result["pnl"][taken] > 0).mean() * 100), 2) if taken.any() else 0.0,
+        "mark_to_market": result["mtm_equity"] is not None,
+        "by_coin": [
+            {"coin": arrays["coins"][c], "trades": int(row.trades), "pnl": round(float(row.pnl), 2)}
+            for c, row in by_coin.sort_values("pnl", ascending=False).iterrows()
+        ],
+        "equity_curve": {
+            "timestamps": pd.to_datetime(times[keep], unit="ms").strftime('%Y-%m-%d %H:%M').tolist(),
+            "equity": np.round(equity[keep], 2).tolist(),
+            "total_points": len(equity),
+        },
+    }
@@ -0,0 +1,85 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from services.optimize_strategy import equity_curves
+
+
+def _pyplot():
+    # Non-interactive backend: safe in worker processes and web threads
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def _config_label(config):
+    label = f"SL: {config['SL%']:g}% | TP: {config['TP%']:g}%"
+    name = f"equity_SL{config['SL%']:g}_TP{config['TP%']:g}"
+    if 'Risk %' in config:
+        label += f" | Risk: {config['Risk %']:g}%"
+        name += f"_R{config['Risk %']:g}"
+    if 'Lookahead' in config:
+        label += f" | Lookahead: {config['Lookahead']}"
+        name += f"_H{config['Lookahead']}"
+    return label, name
+
+
+def render_equity_chart(equity_curve, label, path):
+    """Saves a single equity curve PNG. Top-level so it can run in a process pool."""
+    plt = _pyplot()
+    plt.figure(figsize=(10, 4))
+    plt.plot(equity_curve, label=label, color='blue')
+    plt.title(f'Equity Curve - {label}')
+    plt.xlabel("Trades")
+    plt.ylabel("Equity ($)")
+    plt.grid(True)
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close()
+    return path
+
+
+def render_heatmap(result_df, output_dir="simulations"):
+    """Saves the SL vs TP total-return heatmap (best value over any extra dimensions)."""
+    plt = _pyplot()
+    import seaborn as sns
+    os.makedirs(output_dir, exist_ok=True)
+    heatmap_data = result_df.pivot_table(index="SL%", columns="TP%", values="Total Return %", aggfunc="max")
+    plt.figure(figsize=(10, 6))
+    sns.heatmap(heatmap_data, annot=True, fmt=".1f", cmap="YlGnBu")
+    plt.title("Total Return % (Final Equity) - SL vs TP")
+    plt.tight_layout()
+    path = f"{output_dir}/sl_tp_heatmap.png"
+    plt.savefig(path)
+    plt.close()
+    return path
+
+
+def render_top_equity_curves(
+    df,
+    result_df,
+    top_n=5,
+    output_dir="simulations",
+    initial_balance=1000,
+    risk_per_trade=0.01,
+    processes=None
+):
+    """
+    Renders equity curve PNGs for the top_n rows of an optimize_strategy result.
+    Curves are recomputed only for those rows; several charts are drawn in a process pool.
+    The pool uses the spawn start method: forking the threaded web server can deadlock on
+    locks held by its other threads. Returns the list of written paths.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    top = result_df.head(top_n).reset_index(drop=True)
+    curves = equity_curves(df, top, initial_balance=initial_balance, risk_per_trade=risk_per_trade)
+    jobs = []
+    for i, config in top.iterrows():
+        label, name = _config_label(config)
+        jobs.append((curves[i], label, f"{output_dir}/{name}.png"))
+
+    if len(jobs) <= 1 or processes == 1:
+        return [render_equity_chart(*job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return list(pool.map(render_equity_chart, *zip(*jobs)))
@@ -0,0 +1,104 @@
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+
+def _estimate_size(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return 1024
+
+
+class SessionCache:
+    """
+    Memory-bounded LRU cache for parsed session files and the chart payloads derived from them.
+    Entries are keyed on (path, mtime, size), so rewriting a session file invalidates
+    everything cached for it on the next lookup.
+    Cached DataFrames are shared between requests and must not be mutated by callers.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()   # key -> (value, nbytes)
+        self._versions = {}             # path -> (mtime_ns, size) last seen
+        self._inflight = {}             # key -> lock, so concurrent misses compute once
+        self._lock = threading.Lock()
+
+    def _version(self, path):
+        stat = os.stat(path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if self._versions.get(path) != version:
+                self._drop_path(path)
+                self._versions[path] = version
+        return version
+
+    def _drop_path(self, path):
+        for key in [k for k in self._entries if k[0] == path]:
+            self.current_bytes -= self._entries.pop(key)[1]
+
+    def _get_or_compute(self, key, compute):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            key_lock = self._inflight.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                if key in self._entries:
+                    self.hits += 1
+                    return self._entries[key][0]
+                self.misses += 1
+            value = compute()
+            nbytes = _estimate_size(value)
+            with self._lock:
+                self._inflight.pop(key, None)
+                if nbytes <= self.max_bytes and self._versions.get(key[0]) == key[1]:
+                    self._entries[key] = (value, nbytes)
+                    self.current_bytes += nbytes
+                    while self.current_bytes > self.max_bytes:
+                        self.current_bytes -= self._entries.popitem(last=False)[1][1]
+            return value
+
+    def load(self, path, loader=pd.read_csv, columns=None):
+        """
+        Returns the parsed session at path, parsing it only once per file version.
+        With columns, loader(path, columns) is used and the projection is cached separately.
+        """
+        version = self._version(path)
+        if columns is None:
+            return self._get_or_compute((path, version, "__data__"), lambda: loader(path))
+        key = (path, version, "__data__", tuple(columns))
+        return self._get_or_compute(key, lambda: loader(path, list(columns)))
+
+    def payload(self, path, name, compute, loader=pd.read_csv, columns=None, **params):
+        """Returns compute(df, **params) for the session at path, cached per file version and params."""
+        version = self._version(path)
+        key = (path, version, name, tuple(sorted(params.items())))
+        return self._get_or_compute(key, lambda: compute(self.load(path, loader, columns), **params))
+
+    def invalidate(self, path):
+        with self._lock:
+            self._drop_path(path)
+            self._versions.pop(path, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,146 @@
+import contextlib
+import os
+import sqlite3
+import threading
+
+CLEANED_COLUMNS = ['timestamp', 'coin', 'direction', 'raw_message']
+ENRICHED_COLUMNS = ['entry_price', 'future_high', 'future_low']
+SORT_COLUMNS = {'name', 'created', 'modified', 'size', 'row_count', 'first_day', 'last_day'}
+
+
+class SessionCatalog:
+    """
+    SQLite index of the sessions directory: name, file times and size, row count, coins,
+    date range and cleaned/enriched status. SessionStore.write() keeps it current; sync()
+    reconciles it with the directory (one listdir, stat only) for files changed behind its
+    back. Listing, sorting and filtering are indexed queries instead of directory scans.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        with self._connect() as db:
+            db.executescript("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    name TEXT PRIMARY KEY,
+                    path TEXT NOT NULL,
+                    created REAL,
+                    modified REAL,
+                    size INTEGER,
+                    row_count INTEGER,
+                    first_day TEXT,
+                    last_day TEXT,
+                    cleaned INTEGER,
+                    enriched INTEGER
+                );
+                CREATE TABLE IF NOT EXISTS session_coins (
+                    name TEXT NOT NULL,
+                    coin TEXT NOT NULL,
+                    signals INTEGER,
+                    PRIMARY KEY (name, coin)
+                );
+                CREATE INDEX IF NOT EXISTS sessions_modified ON sessions (modified);
+                CREATE INDEX IF NOT EXISTS sessions_row_count ON sessions (row_count);
+                CREATE INDEX IF NOT EXISTS sessions_days ON sessions (first_day, last_day);
+                CREATE INDEX IF NOT EXISTS session_coins_coin ON session_coins (coin);
+            """)
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """A connection that commits (or rolls back) and is closed when the with block exits."""
+        db = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def upsert(self, name, path, columns, index):
+        """Records a session from its file, column list and aggregate index (services.session_index)."""
+        stat = os.stat(path)
+        coins = index["groups"].get("coin", {})
+        days = sorted(index["groups"].get("day", {}))
+        row = (
+            name, path, stat.st_ctime, stat.st_mtime, stat.st_size, index["rows"],
+            days[0] if days else None, days[-1] if days else None,
+            int(all(c in columns for c in CLEANED_COLUMNS)), int(all(c in columns for c in ENRICHED_COLUMNS)),
+        )
+        with self._lock, self._connect() as db:
+            db.execute("INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", row)
+            db.execute("DELETE FROM session_coins WHERE name = ?", (name,))
+            db.executemany(
+                "INSERT INTO session_coins VALUES (?, ?, ?)",
+                [(name, coin, stats["rows"]) for coin, stats in coins.items()]
+            )
+
+    def remove(self, name):
+        with self._lock, self._connect() as db:
+            db.execute("DELETE FROM sessions WHERE name = ?", (name,))
+            db.execute("DELETE FROM session_coins WHERE name = ?", (name,))
+
+    def sync(self, store):
+        """Adds, refreshes or drops catalog rows so they match the files in store.sessions_dir."""
+        with self._connect() as db:
+            known = {name: (path, modified, size) for name, path, modified, size in
+                     db.execute("SELECT name, path, modified, size FROM sessions")}
+        present = set(store.names())
+        changed = 0
+        for name in present:
+            path = store.path(name)
+            stat = os.stat(path)
+            if known.get(name) != (path, stat.st_mtime, stat.st_size):
+                self.upsert(name, path, store.columns(name), store.index(name))
+                changed += 1
+        for name in set(known) - present:
+            self.remove(name)
+            changed += 1
+        return changed
+
+    def list(self, sort="modified", descending=True, coin=None, cleaned=None, enriched=None,
+             search=None, since=None, until=None, limit=None, offset=0):
+        """
+        Sessions as dicts, sorted by one of SORT_COLUMNS. Filters: coin (has signals for it),
+        cleaned/enriched flags, search (substring of the name) and since/until
+        ('YYYY-MM-DD', sessions whose date range overlaps).
+        """
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"Cannot sort by {sort}")
+        where, params = [], []
+        if coin:
+            where.append("name IN (SELECT name FROM session_coins WHERE coin = ?)")
+            params.append(coin.upper())
+        if cleaned is not None:
+            where.append("cleaned = ?")
+            params.append(int(cleaned))
+        if enriched is not None:
+            where.append("enriched = ?")
+            params.append(int(enriched))
+        if search:
+            where.append("instr(name, ?) > 0")
+            params.append(search)
+        if since:
+            where.append("last_day >= ?")
+            params.append(since)
+        if until:
+            where.append("first_day <= ?")
+            params.append(until)
+        sql = "SELECT * FROM sessions"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {sort} {'DESC' if descending else 'ASC'}, name LIMIT ? OFFSET ?"
+        params += [limit if limit is not None else -1, offset]
+
+        with self._connect() as db:
+            db.row_factory = sqlite3.Row
+            rows = [dict(r) for r in db.execute(sql, params)]
+            coins = {}
+            for name, coin in db.execute(
+                f"SELECT name, coin FROM session_coins WHERE name IN ({','.join('?' * len(rows))}) ORDER BY signals DESC",
+                [r["name"] for r in rows]
+            ):
+                coins.setdefault(name, []).append(coin)
+        for r in rows:
+            r["coins"] = coins.get(r["name"], [])
+            r["cleaned"] = bool(r["cleaned"])
+            r["enriched"] = bool(r["enriched"])
+        return rows
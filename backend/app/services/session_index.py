@@ -0,0 +1,139 @@
+import json
+import math
+import os
+
+import pandas as pd
+
+INDEX_VERSION = 1
+INDEX_SUFFIX = ".index.json"
+
+# Columns the index groups by and the metrics it keeps moments of
+GROUP_COLUMNS = ['coin', 'direction', 'outcome']
+METRIC_COLUMNS = ['gain_pct', 'drawdown_pct']
+# Time buckets, keyed on the UTC day of the signal
+BUCKET_GROUP = 'day'
+INDEX_COLUMNS = ['timestamp'] + GROUP_COLUMNS + METRIC_COLUMNS
+
+
+def index_path(session_path):
+    return os.path.splitext(session_path)[0] + INDEX_SUFFIX
+
+
+def _source_version(session_path):
+    stat = os.stat(session_path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _group_stats(keys, df, metrics, key_format=str):
+    """{key: {"rows": n, metric: {count, sum, sumsq, min, max}}} for one grouping."""
+    frame = pd.DataFrame({'key': keys.reset_index(drop=True)})
+    for metric in metrics:
+        values = pd.to_numeric(df[metric], errors='coerce').to_numpy(dtype=float)
+        frame[metric] = values
+        frame[metric + '__sq'] = values * values
+    # Group on the raw values (categorical codes, datetimes) and only format the keys
+    grouped = frame.groupby('key', sort=True, observed=True, dropna=True)
+    rows = grouped.size()
+    labels = {key: key_format(key) for key in rows.index}
+    stats = {labels[key]: {"rows": int(n)} for key, n in rows.items()}
+    for metric in metrics:
+        agg = grouped.agg(
+            count=(metric, 'count'), sum=(metric, 'sum'), sumsq=(metric + '__sq', 'sum'),
+            min=(metric, 'min'), max=(metric, 'max')
+        )
+        for key, row in agg.iterrows():
+            count = int(row['count'])
+            stats[labels[key]][metric] = {
+                "count": count,
+                "sum": float(row['sum']),
+                "sumsq": float(row['sumsq']),
+                "min": float(row['min']) if count else None,
+                "max": float(row['max']) if count else None,
+            }
+    return stats
+
+
+def build_index(df):
+    """
+    Summarises a session: per coin, direction, outcome and UTC day, the row count plus
+    count/sum/sum of squares/min/max of gain_pct and drawdown_pct. Everything is additive,
+    so the summary of appended rows can be merged in without rescanning the session.
+    """
+    metrics = [c for c in METRIC_COLUMNS if c in df.columns]
+    groups = {col: _group_stats(df[col], df, metrics) for col in GROUP_COLUMNS if col in df.columns}
+    if 'timestamp' in df.columns:
+        days = pd.to_datetime(df['timestamp'], utc=True, errors='coerce').dt.floor('D')
+        groups[BUCKET_GROUP] = _group_stats(days, df, metrics, lambda day: day.strftime('%Y-%m-%d'))
+    return {"version": INDEX_VERSION, "rows": int(len(df)), "metrics": metrics, "groups": groups}
+
+
+def _merge_moments(a, b):
+    if a is None or b is None:
+        return a or b
+    mins = [v for v in (a["min"], b["min"]) if v is not None]
+    maxs = [v for v in (a["max"], b["max"]) if v is not None]
+    return {
+        "count": a["count"] + b["count"],
+        "sum": a["sum"] + b["sum"],
+        "sumsq": a["sumsq"] + b["sumsq"],
+        "min": min(mins) if mins else None,
+        "max": max(maxs) if maxs else None,
+    }
+
+
+def merge_index(index, other):
+    """Combines the summaries of two disjoint sets of rows."""
+    metrics = [m for m in index["metrics"] if m in other["metrics"]]
+    groups = {}
+    for group in set(index["groups"]) | set(other["groups"]):
+        left, right = index["groups"].get(group, {}), other["groups"].get(group, {})
+        merged = {}
+        for key in sorted(set(left) | set(right)):
+            a, b = left.get(key, {"rows": 0}), right.get(key, {"rows": 0})
+            merged[key] = {"rows": a["rows"] + b["rows"]}
+            for metric in metrics:
+                moments = _merge_moments(a.get(metric), b.get(metric))
+                if moments is not None:
+                    merged[key][metric] = moments
+        groups[group] = merged
+    return {"version": INDEX_VERSION, "rows": index["rows"] + other["rows"], "metrics": metrics, "groups": groups}
+
+
+def load_index(session_path):
+    """Returns the index stored next to session_path, or None if it is missing or out of date."""
+    path = index_path(session_path)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        index = json.load(f)
+    if index.get("version") != INDEX_VERSION or index.get("source") != _source_version(session_path):
+        return None
+    return index
+
+
+def save_index(session_path, index):
+    """Stores the index, stamped with the session file version it describes."""
+    index = {**index, "source": _source_version(session_path)}
+    path = index_path(session_path)
+    with open(path + ".tmp", "w") as f:
+        json.dump(index, f)
+    os.replace(path + ".tmp", path)
+    return index
+
+
+def group_stats(index, group, metric=None):
+    """
+    Per-key summary for one grouping, computed from the stored moments in O(#keys):
+    rows, and for metric also count, mean, std, min and max.
+    """
+    out = {}
+    for key, entry in index["groups"].get(group, {}).items():
+        stats = {"rows": entry["rows"]}
+        moments = entry.get(metric) if metric else None
+        if moments and moments["count"]:
+            n = moments["count"]
+            mean = moments["sum"] / n
+            variance = max(moments["sumsq"] / n - mean * mean, 0.0) * n / (n - 1) if n > 1 else 0.0
+            stats.update(count=n, mean=mean, std=math.sqrt(variance), min=moments["min"], max=moments["max"])
+        out[key] = stats
+    return out
@@ -0,0 +1,203 @@
+import importlib.util
+import io
+import os
+
+import pandas as pd
+
+from services.session_index import INDEX_COLUMNS, build_index, load_index, merge_index, save_index
+from services.telemetry import timed
+
+# Parquet support is optional; sessions fall back to CSV. pyarrow.parquet itself is only
+# imported when a Parquet session is first touched.
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+
+def _parquet():
+    import pyarrow.parquet as pq
+    return pq
+
+# Low-cardinality string columns stored dictionary-encoded
+CATEGORICAL_COLUMNS = ['coin', 'direction', 'outcome']
+TIMESTAMP_COLUMNS = ['timestamp']
+
+
+def normalize_types(df):
+    """Parses timestamps to UTC datetimes (int64 ns on disk) and makes repeated strings categorical."""
+    df = df.copy()
+    for col in TIMESTAMP_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], utc=True, errors='coerce')
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    return df
+
+
+class CsvSessionStorage:
+    extension = ".csv"
+
+    def columns(self, path):
+        return pd.read_csv(path, nrows=0).columns.tolist()
+
+    def read(self, path, columns=None):
+        if columns is None:
+            return pd.read_csv(path)
+        wanted = set(columns)
+        return pd.read_csv(path, usecols=lambda c: c in wanted)
+
+    def iter_batches(self, path, columns=None, batch_size=10_000, offset=0, limit=None):
+        usecols = None if columns is None else (lambda c, wanted=set(columns): c in wanted)
+        reader = pd.read_csv(
+            path, usecols=usecols, chunksize=batch_size,
+            skiprows=range(1, offset + 1) if offset else None, nrows=limit
+        )
+        with reader:
+            yield from reader
+
+    def write(self, path, df):
+        df.to_csv(path, index=False)
+
+
+class ParquetSessionStorage:
+    """Typed columnar sessions: int64 timestamps, dictionary-encoded coin/direction/outcome."""
+    extension = ".parquet"
+
+    def columns(self, path):
+        return _parquet().read_schema(path).names
+
+    def read(self, path, columns=None):
+        if columns is not None:
+            available = set(self.columns(path))
+            columns = [c for c in columns if c in available]
+        return pd.read_parquet(path, columns=columns, engine="pyarrow")
+
+    def iter_batches(self, path, columns=None, batch_size=10_000, offset=0, limit=None):
+        parquet_file = _parquet().ParquetFile(path)
+        if columns is not None:
+            available = set(parquet_file.schema_arrow.names)
+            columns = [c for c in columns if c in available]
+        # Skip whole row groups before the offset without decoding them
+        metadata = parquet_file.metadata
+        row_groups, skip = [], offset
+        for i in range(metadata.num_row_groups):
+            rows = metadata.row_group(i).num_rows
+            if skip >= rows and not row_groups:
+                skip -= rows
+                continue
+            row_groups.append(i)
+        remaining = limit
+        for batch in parquet_file.iter_batches(batch_size=batch_size, row_groups=row_groups, columns=columns):
+            if skip:
+                dropped = min(skip, batch.num_rows)
+                batch = batch.slice(dropped)
+                skip -= dropped
+            if remaining is not None:
+                batch = batch.slice(0, remaining)
+                remaining -= batch.num_rows
+            if batch.num_rows:
+                yield batch.to_pandas()
+            if remaining == 0:
+                break
+
+    def write(self, path, df):
+        tmp_path = path + ".tmp"
+        normalize_types(df).to_parquet(tmp_path, index=False, engine="pyarrow")
+        os.replace(tmp_path, path)
+
+
+class SessionStore:
+    """
+    Named sessions under one directory. New sessions are written with the columnar backend
+    when pyarrow is installed, CSV otherwise; existing CSV sessions stay readable.
+    """
+
+    def __init__(self, sessions_dir, backend=None, catalog=None):
+        self.sessions_dir = sessions_dir
+        self.catalog = catalog
+        available = [ParquetSessionStorage()] if HAS_PYARROW else []
+        available.append(CsvSessionStorage())
+        self.backend = backend or available[0]
+        self.backends = [self.backend] + [b for b in available if b.extension != self.backend.extension]
+
+    def _backend_for(self, path):
+        return next(b for b in self.backends if path.endswith(b.extension))
+
+    def path(self, name):
+        """Returns the file holding the session, or None if it does not exist."""
+        for backend in self.backends:
+            candidate = os.path.join(self.sessions_dir, name + backend.extension)
+            if os.path.exists(candidate):
+                return candidate
+        return None
+
+    def exists(self, name):
+        return self.path(name) is not None
+
+    def names(self):
+        extensions = tuple(b.extension for b in self.backends)
+        return sorted({os.path.splitext(f)[0] for f in os.listdir(self.sessions_dir) if f.endswith(extensions)})
+
+    def columns(self, name):
+        path = self.path(name)
+        return self._backend_for(path).columns(path)
+
+    def read_path(self, path, columns=None):
+        backend = self._backend_for(path)
+        with timed("session_read_seconds", format=backend.extension.lstrip(".")):
+            return backend.read(path, columns)
+
+    def read(self, name, columns=None):
+        """Reads a session; columns projects to the listed columns that exist."""
+        path = self.path(name)
+        if path is None:
+            raise FileNotFoundError(name)
+        return self.read_path(path, columns)
+
+    def iter_batches(self, name, columns=None, batch_size=10_000, offset=0, limit=None):
+        """Yields the session as DataFrames of at most batch_size rows, starting at row offset."""
+        path = self.path(name)
+        if path is None:
+            raise FileNotFoundError(name)
+        return self._backend_for(path).iter_batches(path, columns, batch_size, offset, limit)
+
+    def write(self, name, df, appended=None):
+        """
+        Writes a session with the default backend, replacing any copy in another format,
+        and refreshes its aggregate index. When df is the previous session plus the rows
+        in appended, only those rows are summarised and merged into the existing index.
+        """
+        os.makedirs(self.sessions_dir, exist_ok=True)
+        previous_path = self.path(name)
+        previous = load_index(previous_path) if appended is not None and previous_path else None
+        path = os.path.join(self.sessions_dir, name + self.backend.extension)
+        with timed("session_write_seconds", format=self.backend.extension.lstrip(".")):
+            self.backend.write(path, df)
+        for backend in self.backends[1:]:
+            stale = os.path.join(self.sessions_dir, name + backend.extension)
+            if os.path.exists(stale):
+                os.remove(stale)
+        index = merge_index(previous, build_index(appended)) if previous is not None else build_index(df)
+        index = save_index(path, index)
+        if self.catalog is not None:
+            self.catalog.upsert(name, path, list(df.columns), index)
+        return path
+
+    def index(self, name):
+        """Returns the session's aggregate index, rebuilding it if missing or out of date."""
+        path = self.path(name)
+        if path is None:
+            raise FileNotFoundError(name)
+        index = load_index(path)
+        if index is None:
+            index = save_index(path, build_index(self.read_path(path, INDEX_COLUMNS)))
+        return index
+
+    def import_csv(self, name, csv_file):
+        """Imports a CSV (path or file object) as a session."""
+        return self.write(name, pd.read_csv(csv_file))
+
+    def export_csv(self, name):
+        """Returns the session as CSV text."""
+        buffer = io.StringIO()
+        self.read(name).to_csv(buffer, index=False)
+        return buffer.getvalue()
@@ -0,0 +1,215 @@
+import json
+import math
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+_NUMBER = r"(\d+(?:,\d{3})*(?:\.\d+)?)\s*(k)?"
+_HAS_DIGIT = re.compile(r"\d").search
+
+
+class SignalPattern:
+    """
+    One channel message format. header must define the named groups coin and direction
+    (optionally continuation); direction_map normalises the direction word.
+    prefilter is a lowercase substring every matching message contains, checked
+    before any regex runs.
+    """
+
+    def __init__(self, name, header, direction_map, prefilter=None, flags=re.IGNORECASE, requires_levels=False):
+        self.name = name
+        self.header = re.compile(header, flags)
+        self.direction_map = direction_map
+        self.prefilter = prefilter
+        # Loose headers ("LONG BTC") also match prose; unless the header captured a
+        # tag group, only accept them when the message carries an entry, TP or SL
+        self.requires_levels = requires_levels
+
+
+# Hashtag format used by the current channels: "#BTC Bullish continuation"
+HASHTAG_PATTERN = SignalPattern(
+    "hashtag",
+    r"#(?P<coin>\w+)\s+(?P<direction>bullish|bearish)(?P<continuation>\s+continuation)?",
+    {"bullish": "Bullish", "bearish": "Bearish"},
+    prefilter="#",
+)
+
+# Common "LONG BTC/USDT entry 42000" / "SHORT #ETH" format. Opt-in per channel (see
+# patterns_for): it needs a #/$ tag or a price level on the message to count as a signal.
+LONG_SHORT_PATTERN = SignalPattern(
+    "long_short",
+    r"\b(?P<direction>(?i:long|short))\s+(?P<tag>[#$])?(?P<coin>[A-Z0-9]{2,15}?)(?:/?USDT)?\b",
+    {"long": "Bullish", "short": "Bearish"},
+    flags=0,
+    requires_levels=True,
+)
+
+PATTERNS = {p.name: p for p in (HASHTAG_PATTERN, LONG_SHORT_PATTERN)}
+DEFAULT_PATTERNS = [HASHTAG_PATTERN]
+
+# Optional trade levels searched in the text after the header
+FIELD_PATTERNS = {
+    "entry": re.compile(rf"(?:entry(?:\s*zone)?|\bIP\s+at|buy(?:\s*zone)?)\s*[:@]?\s*{_NUMBER}(?:\s*-\s*{_NUMBER})?", re.IGNORECASE),
+    # "TP1"/"Target 1" labels: the 1 only counts when it is not the first digit of the price
+    "take_profit": re.compile(
+        rf"(?:\bTP\s*1?\b|target(?:s|ing)?(?:\s*1\b)?(?:\s+to)?)\s*[:=@]?\s*{_NUMBER}", re.IGNORECASE
+    ),
+    "stop_loss": re.compile(rf"(?:\bSL|stop[\s-]?loss|\bstop)\s*[:@]?\s*{_NUMBER}", re.IGNORECASE),
+    "leverage": re.compile(r"(?:leverage\s*[:@]?\s*(\d+(?:\.\d+)?)\s*x?|\b(\d+(?:\.\d+)?)\s*x\b)", re.IGNORECASE),
+}
+
+PARSED_COLUMNS = [
+    'message_idx', 'coin', 'direction', 'continuation', 'entry', 'entry_high',
+    'take_profit', 'stop_loss', 'leverage', 'pattern'
+]
+
+
+def patterns_for(names=None):
+    """Patterns by name (e.g. a channel's "patterns" setting); DEFAULT_PATTERNS when names is empty."""
+    if not names:
+        return DEFAULT_PATTERNS
+    unknown = [name for name in names if name not in PATTERNS]
+    if unknown:
+        raise ValueError(f"Unknown signal pattern(s): {', '.join(unknown)}")
+    return [PATTERNS[name] for name in names]
+
+
+def _number(value, suffix=None):
+    number = float(value.replace(",", ""))
+    return number * 1000 if suffix else number
+
+
+def parse_messages(texts, patterns=DEFAULT_PATTERNS):
+    """
+    Parses a batch of message texts. The first pattern whose header matches wins.
+    Returns a DataFrame with one row per signal: message_idx (position in texts),
+    coin, direction ('Bullish'/'Bearish'), continuation (bool), entry/entry_high,
+    take_profit, stop_loss, leverage (NaN when absent) and the pattern name.
+    """
+    columns = {name: [] for name in PARSED_COLUMNS}
+    nan = float("nan")
+    for idx, text in enumerate(texts):
+        if not text:
+            continue
+        lowered = None
+        for pattern in patterns:
+            if pattern.prefilter is not None:
+                if lowered is None:
+                    lowered = text.lower()
+                if pattern.prefilter not in lowered:
+                    continue
+            match = pattern.header.search(text)
+            if match is None:
+                continue
+            entry = entry_high = take_profit = stop_loss = leverage = nan
+            tail = text[match.end():]
+            # Bare "#BTC Bullish" messages dominate; only scan for levels when numbers follow
+            if _HAS_DIGIT(tail):
+                m = FIELD_PATTERNS["entry"].search(tail)
+                if m:
+                    entry = _number(m.group(1), m.group(2))
+                    entry_high = _number(m.group(3), m.group(4)) if m.group(3) else entry
+                m = FIELD_PATTERNS["take_profit"].search(tail)
+                if m:
+                    take_profit = _number(m.group(1), m.group(2))
+                m = FIELD_PATTERNS["stop_loss"].search(tail)
+                if m:
+                    stop_loss = _number(m.group(1), m.group(2))
+                m = FIELD_PATTERNS["leverage"].search(tail)
+                if m:
+                    leverage = float(m.group(1) or m.group(2))
+            groups = match.groupdict()
+            if pattern.requires_levels and not groups.get("tag") and all(
+                math.isnan(level) for level in (entry, take_profit, stop_loss)
+            ):
+                continue
+            columns['message_idx'].append(idx)
+            columns['coin'].append(groups["coin"].upper())
+            columns['direction'].append(pattern.direction_map[groups["direction"].lower()])
+            columns['continuation'].append(bool(groups.get("continuation")))
+            columns['entry'].append(entry)
+            columns['entry_high'].append(entry_high)
+            columns['take_profit'].append(take_profit)
+            columns['stop_loss'].append(stop_loss)
+            columns['leverage'].append(leverage)
+            columns['pattern'].append(pattern.name)
+            break
+
+    return pd.DataFrame({
+        'message_idx': np.array(columns['message_idx'], dtype=np.int64),
+        'coin': pd.Categorical(columns['coin']),
+        'direction': pd.Categorical(columns['direction']),
+        'continuation': np.array(columns['continuation'], dtype=bool),
+        'entry': np.array(columns['entry'], dtype=float),
+        'entry_high': np.array(columns['entry_high'], dtype=float),
+        'take_profit': np.array(columns['take_profit'], dtype=float),
+        'stop_loss': np.array(columns['stop_loss'], dtype=float),
+        'leverage': np.array(columns['leverage'], dtype=float),
+        'pattern': pd.Categorical(columns['pattern']),
+    })
+
+
+def _export_text(text):
+    # Telegram Desktop exports formatted text as a list of strings and entity dicts
+    if isinstance(text, list):
+        return "".join(part if isinstance(part, str) else part.get("text", "") for part in text)
+    return text or ""
+
+
+def parse_dump(path, patterns=DEFAULT_PATTERNS):
+    """
+    Parses an exported message dump offline: a Telegram Desktop result.json or a CSV
+    with raw_message (and optionally timestamp) columns. Returns signals with timestamp
+    and raw_message attached.
+    """
+    if path.endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            messages = [m for m in json.load(f).get("messages", []) if m.get("type", "message") == "message"]
+        texts = [_export_text(m.get("text")) for m in messages]
+        dates = pd.to_datetime([m.get("date") for m in messages], utc=True)
+        ids = [m.get("id") for m in messages]
+    else:
+        df = pd.read_csv(path)
+        texts = df['raw_message'].fillna("").astype(str).tolist()
+        dates = pd.to_datetime(df['timestamp'], utc=True) if 'timestamp' in df.columns else pd.Series(pd.NaT, index=df.index)
+        ids = df['message_id'].tolist() if 'message_id' in df.columns else list(range(len(df)))
+    parsed = parse_messages(texts, patterns)
+    idx = parsed['message_idx'].to_numpy()
+    parsed.insert(0, 'timestamp', pd.Series(dates).iloc[idx].reset_index(drop=True))
+    parsed['raw_message'] = np.asarray(texts, dtype=object)[idx]
+    parsed['message_id'] = np.asarray(ids, dtype=object)[idx]
+    return parsed.drop(columns='message_idx')
+
+
+def benchmark(n=1_000_000, seed=0):
+    """Parses n synthetic messages and returns messages/sec."""
+    rng = np.random.default_rng(seed)
+    samples = [
+        "#BTC Bullish", "#ETH BEARISH continuation", "gm everyone, market update soon",
+        "#FART Bearish\n\nEntry zone: 0.84-0.9", "#BTC Bullish\n\n- IP at 79k\nSL 74k TP 90k 10x",
+        "LONG SOL/USDT entry 142.5 target 160 stop 135", "Chart of the day", "#XRP bearish\n\nTA: descending triangle",
+    ]
+    texts = [samples[i] for i in rng.integers(0, len(samples), n)]
+    start = time.perf_counter()
+    parsed = parse_messages(texts, list(PATTERNS.values()))
+    elapsed = time.perf_counter() - start
+    rate = n / elapsed
+    print(f"Parsed {n:,} messages ({len(parsed):,} signals) in {elapsed:.2f}s: {rate:,.0f} messages/sec")
+    return rate
+
+
+if __name__ == "__main__":
+    # Example usage:
+    # python -m services.signal_parser result.json out.csv
+    # python -m services.signal_parser --benchmark 1000000
+    import sys
+    if len(sys.argv) == 3 and sys.argv[1] == "--benchmark":
+        benchmark(int(sys.argv[2]))
+    elif len(sys.argv) == 3:
+        signals = parse_dump(sys.argv[1])
+        signals.to_csv(sys.argv[2], index=False)
+        print(f"Saved {len(signals)} signals to {sys.argv[2]}")
+    else:
+        print("Usage: python -m services.signal_parser <dump.json|dump.csv> <out.csv> | --benchmark N")
@@ -1,83 +1,68 @@
+import numpy as np
 import pandas as pd
 
-# Load signal + price data
-df = pd.read_csv("signals_with_price_data.csv")
 
-# Backtest config
-risk_reward = 3.0        # 1:3 RR
-risk_pct = 0.05          # 5% stop-loss (relative to entry)
-results = []
+def simulate_tp_sl(df, risk_pct=0.05, risk_reward=3.0):
+    """
+    Backtests signals against their future high/low with a fixed SL at risk_pct from entry
+    and a TP at risk_pct * risk_reward. The SL is assumed to be hit first when both were
+    touched. Vectorized over all rows; rows without a Bullish/Bearish direction get no result.
+    """
+    direction = df['direction'].to_numpy(dtype=object)
+    entry = df['entry_price'].to_numpy(dtype=float)
+    high = df['future_high'].to_numpy(dtype=float)
+    low = df['future_low'].to_numpy(dtype=float)
+    bullish = direction == "Bullish"
+    bearish = direction == "Bearish"
+    traded = bullish | bearish
 
-for _, row in df.iterrows():
-    direction = row['direction']
-    entry = row['entry_price']
-    high = row['future_high']
-    low = row['future_low']
-    coin = row['coin']
-    timestamp = row['timestamp']
+    sl = np.where(bullish, entry * (1 - risk_pct), np.where(bearish, entry * (1 + risk_pct), np.nan))
+    tp = np.where(bullish, entry * (1 + risk_pct * risk_reward), np.where(bearish, entry * (1 - risk_pct * risk_reward), np.nan))
+    sl_hit = np.where(bullish, low <= sl, high >= sl) & traded
+    tp_hit = np.where(bullish, high >= tp, low <= tp) & traded & ~sl_hit
 
-    sl = tp = outcome = drawdown_pct = gain_pct = None
+    # Neither level touched: best move in the trade direction
+    best_move = np.where(bullish, (high - entry) / entry, (entry - low) / entry) * 100
+    gain_pct = np.select([sl_hit, tp_hit], [-risk_pct * 100, risk_pct * risk_reward * 100], best_move)
+    drawdown_pct = np.where(bullish, (entry - low) / entry, (high - entry) / entry) * 100
+    outcome = np.select([sl_hit, tp_hit, traded], ["SL", "TP", "None"], None)
 
-    if direction == "Bullish":
-        sl = entry * (1 - risk_pct)
-        tp = entry * (1 + risk_pct * risk_reward)
-
-        if low <= sl:
-            outcome = "SL"
-            gain_pct = -risk_pct * 100
-        elif high >= tp:
-            outcome = "TP"
-            gain_pct = risk_pct * risk_reward * 100
-        else:
-            outcome = "None"
-            gain_pct = ((high - entry) / entry) * 100
-
-        drawdown_pct = ((entry - low) / entry) * 100
-
-    elif direction == "Bearish":
-        sl = entry * (1 + risk_pct)
-        tp = entry * (1 - risk_pct * risk_reward)
-
-        if high >= sl:
-            outcome = "SL"
-            gain_pct = -risk_pct * 100
-        elif low <= tp:
-            outcome = "TP"
-            gain_pct = risk_pct * risk_reward * 100
-        else:
-            outcome = "None"
-            gain_pct = ((entry - low) / entry) * 100
-
-        drawdown_pct = ((high - entry) / entry) * 100
-
-    results.append({
-        "timestamp": timestamp,
-        "coin": coin,
+    return pd.DataFrame({
+        "timestamp": df['timestamp'].to_numpy(),
+        "coin": df['coin'].to_numpy(),
         "direction": direction,
         "entry_price": entry,
         "TP_price": tp,
         "SL_price": sl,
-        "gain_pct": round(gain_pct, 2),
-        "drawdown_pct": round(drawdown_pct, 2),
+        "gain_pct": np.where(traded, np.round(gain_pct, 2), np.nan),
+        "drawdown_pct": np.where(traded, np.round(drawdown_pct, 2), np.nan),
         "outcome": outcome,
-        "raw_message": row["raw_message"]
+        "raw_message": df['raw_message'].to_numpy() if 'raw_message' in df.columns else None
     })
 
-result_df = pd.DataFrame(results)
-result_df.to_csv("backtest_results.csv", index=False)
 
-# Print summary
-win_rate = (result_df['outcome'] == 'TP').mean() * 100
-loss_rate = (result_df['outcome'] == 'SL').mean() * 100
-undecided = (result_df['outcome'] == 'None').mean() * 100
-avg_gain = result_df['gain_pct'].mean()
-max_gain = result_df['gain_pct'].max()
-min_gain = result_df['gain_pct'].min()
-avg_drawdown = result_df['drawdown_pct'].mean()
+def print_summary(result_df):
+    win_rate = (result_df['outcome'] == 'TP').mean() * 100
+    loss_rate = (result_df['outcome'] == 'SL').mean() * 100
+    undecided = (result_df['outcome'] == 'None').mean() * 100
+    avg_gain = result_df['gain_pct'].mean()
+    max_gain = result_df['gain_pct'].max()
+    min_gain = result_df['gain_pct'].min()
+    avg_drawdown = result_df['drawdown_pct'].mean()
+
+    print(f"\n✅ Backtest Summary:")
+    print(f"Win Rate (TP): {win_rate:.2f}%")
+    print(f"Loss Rate (SL): {loss_rate:.2f}%")
+    print(f"No Decision (neither TP nor SL): {undecided:.2f}%")
+    print(f"Avg % Gain: {avg_gain:.2f}%, Max: {max_gain:.2f}%, Min: {min_gain:.2f}%")
+    print(f"Avg Drawdown Before TP: {avg_drawdown:.2f}%")
+
+
+if __name__ == "__main__":
+    # Load signal + price data
+    df = pd.read_csv("signals_with_price_data.csv")
 
-print(f"\n✅ Backtest Summary:")
-print(f"Win Rate (TP): {win_rate:.2f}%")
-print(f"Loss Rate (SL): {loss_rate:.2f}%")
-print(f"No Decision (neither TP nor SL): {undecided:.2f}%")
-print(f"Avg % Gain: {avg_gain:.2f}%, Max: {max_gain:.2f}%, Min: {min_gain:.2f}%")
-print(f"Avg Drawdown Before TP: {avg_drawdown:.2f}%")
+    # Backtest config: 1:3 RR, 5% stop-loss (relative to entry)
+    result_df = simulate_tp_sl(df, risk_pct=0.05, risk_reward=3.0)
+    result_df.to_csv("backtest_results.csv", index=False)
+    print_summary(result_df)
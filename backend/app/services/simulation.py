@@ -1,5 +1,8 @@
+import numpy as np
 import pandas as pd
 
+from services.metrics import trade_metrics
+
 def run_simulation_logic(signals_df: pd.DataFrame, stop_loss_pct: float, take_profit_pct: float, risk_per_trade_pct: float):
     """
     Simulate trades given signals DataFrame and risk management params.
@@ -12,7 +15,13 @@ def run_simulation_logic(signals_df: pd.DataFrame, stop_loss_pct: float, take_pr
             "winning_trades": 0,
             "accuracy": 0,
             "net_gain_pct": 0,
-            "equity_curve": []
+            "equity_curve": [],
+            "max_drawdown_pct": 0,
+            "sharpe": 0,
+            "sortino": 0,
+            "profit_factor": None,
+            "longest_win_streak": 0,
+            "longest_loss_streak": 0
         }
 
     # Example assumption: signals_df has columns:
@@ -23,45 +32,31 @@ def run_simulation_logic(signals_df: pd.DataFrame, stop_loss_pct: float, take_pr
     # If gain_pct < -stop_loss_pct => capped loss at -stop_loss_pct
     # If gain_pct > take_profit_pct => capped gain at take_profit_pct
 
-    def capped_gain(row):
-        gain = row['gain_pct']
-        if gain < -stop_loss_pct:
-            return -stop_loss_pct
-        elif gain > take_profit_pct:
-            return take_profit_pct
-        else:
-            return gain
+    signals_df['adjusted_gain_pct'] = np.clip(signals_df['gain_pct'].to_numpy(dtype=float), -stop_loss_pct, take_profit_pct)
 
-    signals_df['adjusted_gain_pct'] = signals_df.apply(capped_gain, axis=1)
+    # Position size = risk_per_trade_pct of current equity; equity starts at 100 (arbitrary units)
+    metrics = trade_metrics(signals_df['adjusted_gain_pct'].to_numpy(), risk_per_trade_pct / 100, initial_balance=100.0)
 
     total_trades = len(signals_df)
-    winning_trades = signals_df[signals_df['adjusted_gain_pct'] > 0].shape[0]
+    winning_trades = int((signals_df['adjusted_gain_pct'] > 0).sum())
     accuracy = (winning_trades / total_trades) * 100 if total_trades > 0 else 0
 
-    # Calculate net gain % assuming risk_per_trade_pct % risk per trade on account balance
-    # For simplicity, assume position size = risk_per_trade_pct of current equity
-    # Equity starts at 100 (arbitrary units)
-
-    equity = 100.0
-    equity_curve = [equity]
-
-    for gain_pct in signals_df['adjusted_gain_pct']:
-        # Profit or loss = risk_per_trade_pct * gain_pct / 100 of current equity
-        pnl = equity * (risk_per_trade_pct / 100) * (gain_pct / 100)
-        equity += pnl
-        equity_curve.append(equity)
-
-    net_gain_pct = ((equity - 100) / 100) * 100  # % gain over starting equity
-
     # Format equity_curve to list of floats (optional rounding)
-    equity_curve = [round(val, 4) for val in equity_curve]
+    equity_curve = [100.0] + np.round(metrics["equity"], 4).tolist()
 
     result = {
         "total_trades": total_trades,
         "winning_trades": winning_trades,
         "accuracy": round(accuracy, 2),
-        "net_gain_pct": round(net_gain_pct, 2),
+        "net_gain_pct": round(metrics["total_return_pct"], 2),
         "equity_curve": equity_curve,
+        "max_drawdown_pct": round(metrics["max_drawdown_pct"], 2),
+        "sharpe": round(metrics["sharpe"], 3),
+        "sortino": round(metrics["sortino"], 3),
+        # None when no trade lost, as for an empty session (see trade_metrics)
+        "profit_factor": None if metrics["profit_factor"] is None else round(metrics["profit_factor"], 3),
+        "longest_win_streak": metrics["longest_win_streak"],
+        "longest_loss_streak": metrics["longest_loss_streak"],
     }
 
     return result
@@ -0,0 +1,76 @@
+import json
+
+import pandas as pd
+
+
+def _records_json(batch):
+    return batch.to_json(orient="records", date_format="iso")
+
+
+def stream_records(batches, fmt="json"):
+    """
+    Serialises DataFrame batches one at a time, either as a single JSON array or as
+    NDJSON (one object per line), so only one batch is ever held in memory.
+    """
+    if fmt == "ndjson":
+        for batch in batches:
+            if len(batch):
+                yield batch.to_json(orient="records", lines=True, date_format="iso").rstrip("\n") + "\n"
+        return
+    yield "["
+    first = True
+    for batch in batches:
+        if not len(batch):
+            continue
+        body = _records_json(batch)[1:-1]
+        yield body if first else "," + body
+        first = False
+    yield "]"
+
+
+def _float_array_json(values):
+    return json.dumps(values.tolist())[1:-1]
+
+
+def stream_values(batches, column):
+    """Streams the non-null values of one column as a flat JSON array."""
+    yield "["
+    first = True
+    for batch in batches:
+        if column not in batch.columns:
+            continue
+        values = batch[column].dropna().to_numpy(dtype=float)
+        if not len(values):
+            continue
+        body = _float_array_json(values)
+        yield body if first else "," + body
+        first = False
+    yield "]"
+
+
+def stream_columns(make_batches, columns, dropna_subset=None):
+    """
+    Streams {"key": [...], ...} where each key maps to a column. make_batches(columns) is
+    called once per output key and re-reads the session, so arrays of any length are written
+    without holding them all in memory. columns maps output keys to column names; rows with
+    nulls in dropna_subset (default: all of them) are skipped so the arrays stay aligned.
+    """
+    subset = list(dropna_subset or columns.values())
+    yield "{"
+    for i, (key, column) in enumerate(columns.items()):
+        yield ("," if i else "") + json.dumps(key) + ":["
+        first = True
+        for batch in make_batches(subset):
+            if not set(subset) <= set(batch.columns):
+                continue
+            values = batch.dropna(subset=subset)[column]
+            if not len(values):
+                continue
+            if pd.api.types.is_numeric_dtype(values.dtype):
+                body = _float_array_json(values.to_numpy(dtype=float))
+            else:
+                body = json.dumps(values.astype(str).tolist())[1:-1]
+            yield body if first else "," + body
+            first = False
+        yield "]"
+    yield "}"
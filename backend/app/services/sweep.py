@@ -0,0 +1,161 @@
+import multiprocessing as mp
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from services.optimize_strategy import final_balances, trade_arrays
+from services.path_simulation import direction_sign
+
+DIRECTION_FILTERS = {"all": 0, "bullish": 1, "bearish": -1}
+
+# Worker-side views onto the shared input arrays, set up once per process
+_shared = {}
+
+
+def _attach(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13: re-registers with the parent's tracker, which is harmless
+        return shared_memory.SharedMemory(name=name)
+
+
+def _init_worker(specs, grid):
+    for key, (name, shape, dtype) in specs.items():
+        shm = _attach(name)
+        _shared[key] = (shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf))
+    _shared["grid"] = grid
+
+
+def _to_shared(arrays):
+    blocks, specs = [], {}
+    for key, arr in arrays.items():
+        arr = np.ascontiguousarray(arr)
+        shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+        np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+        blocks.append(shm)
+        specs[key] = (shm.name, arr.shape, arr.dtype.str)
+    return blocks, specs
+
+
+def _run_chunk(bounds):
+    """Evaluates grid points [start, stop) against the shared trade arrays."""
+    start, stop = bounds
+    grid = _shared["grid"]
+    gains = _shared["gains"][1]
+    drawdowns = _shared["drawdowns"][1]
+    sign = _shared["sign"][1]
+    shape = tuple(len(v) for v in grid["axes"])
+    sl_i, tp_i, risk_i, h_i, dir_i = np.unravel_index(np.arange(start, stop), shape)
+    sl = np.asarray(grid["axes"][0], dtype=float)[sl_i]
+    tp = np.asarray(grid["axes"][1], dtype=float)[tp_i]
+    risk = np.asarray(grid["axes"][2], dtype=float)[risk_i]
+
+    trades = np.zeros(stop - start, dtype=np.int64)
+    balance = np.empty(stop - start)
+    max_dd = np.empty(stop - start)
+    for h in np.unique(h_i):
+        for d in np.unique(dir_i):
+            pick = (h_i == h) & (dir_i == d)
+            wanted = DIRECTION_FILTERS[grid["axes"][4][d]]
+            mask = sign != 0 if wanted == 0 else sign == wanted
+            gain = gains[h][mask]
+            # "clamp" caps the realised gain on both sides like run_simulation_logic
+            drawdown = -gain if grid["model"] == "clamp" else drawdowns[h][mask]
+            balance[pick], max_dd[pick] = final_balances(
+                gain, drawdown, sl[pick], tp[pick], risk[pick], grid["initial_balance"], with_drawdown=True
+            )
+            trades[pick] = int(mask.sum())
+
+    initial = grid["initial_balance"]
+    return pd.DataFrame({
+        'SL%': sl,
+        'TP%': tp,
+        'Risk %': risk * 100,
+        'Lookahead': np.asarray(grid["axes"][3], dtype=object)[h_i],
+        'Direction': np.asarray(grid["axes"][4], dtype=object)[dir_i],
+        'Trades': trades,
+        'Final Balance': np.round(balance, 2),
+        'Total Return %': np.round((balance - initial) / initial * 100, 2),
+        'Max Drawdown %': np.round(max_dd, 2),
+    })
+
+
+def run_sweep(
+    df,
+    sl_values,
+    tp_values,
+    risk_values=(0.01,),
+    lookahead_values=(None,),
+    directions=("all",),
+    initial_balance=1000,
+    model="drawdown",
+    processes=None,
+    chunk_size=None,
+    progress=None,
+    cancel_event=None
+):
+    """
+    Sweeps SL x TP x risk x lookahead x direction filter across a process pool.
+    Trade arrays are placed in multiprocessing.shared_memory once, so workers never
+    receive pickled DataFrames. Yields one result DataFrame per finished chunk
+    (same columns as optimize_strategy plus 'Direction' and 'Trades').
+
+    model="drawdown" applies optimize_strategy's rules (drawdown >= SL is a loss),
+    model="clamp" clamps gain_pct to [-SL, TP] like run_simulation_logic.
+    progress(done, total) is called after each chunk; setting cancel_event stops the
+    sweep and terminates the workers.
+    """
+    horizons = list(lookahead_values)
+    missing = [f"gain_pct_{h}" for h in horizons if h is not None and f"gain_pct_{h}" not in df.columns]
+    if missing:
+        raise ValueError(f"Missing lookahead columns {missing}; add them with path_simulation.horizon_columns().")
+    columns = [trade_arrays(df, *(("gain_pct", "drawdown_pct") if h is None else (f"gain_pct_{h}", f"drawdown_pct_{h}")))
+               for h in horizons]
+    if 'direction' in df.columns:
+        sign = direction_sign(df['direction'])
+        sign = sign[sign != 0]
+    else:
+        sign = np.zeros(0, dtype=np.int8)
+
+    axes = [list(sl_values), list(tp_values), list(risk_values), horizons, list(directions)]
+    total = int(np.prod([len(a) for a in axes]))
+    processes = processes or os.cpu_count() or 1
+    if chunk_size is None:
+        # Several chunks per worker keeps the pool balanced and results streaming
+        chunk_size = max(1, -(-total // (processes * 8)))
+    bounds = [(i, min(i + chunk_size, total)) for i in range(0, total, chunk_size)]
+    grid = {"axes": axes, "initial_balance": initial_balance, "model": model}
+
+    blocks, specs = _to_shared({
+        "gains": np.stack([g for g, _ in columns]),
+        "drawdowns": np.stack([d for _, d in columns]),
+        "sign": sign,
+    })
+    # spawn, not fork: the sweep runs from job threads of the web server, and forking a
+    # process with running threads can deadlock on locks those threads hold
+    pool = mp.get_context("spawn").Pool(processes, initializer=_init_worker, initargs=(specs, grid))
+    done = 0
+    try:
+        for frame in pool.imap_unordered(_run_chunk, bounds):
+            done += len(frame)
+            if progress:
+                progress(done, total)
+            yield frame
+            if cancel_event is not None and cancel_event.is_set():
+                break
+    finally:
+        pool.terminate()
+        pool.join()
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+
+
+def sweep_to_frame(df, *args, **kwargs):
+    """Runs run_sweep to completion and returns all results, best final balance first."""
+    frames = list(run_sweep(df, *args, **kwargs))
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True).sort_values(by="Final Balance", ascending=False)
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+DEFAULT_COINS = ['BTC', 'ETH', 'SOL', 'XRP', 'BNB', 'DOGE', 'ADA', 'LINK', 'SUI', 'TAO', 'ENA', 'LTC']
+CHUNK_SIGNALS = 50_000
+
+
+def synthetic_signals(n, seed=0, start="2024-01-01", span_days=365, coins=DEFAULT_COINS):
+    """
+    n random signals in the session layout (timestamp, coin, direction, raw_message),
+    newest first like extracted sessions. The same seed always gives the same frame.
+    """
+    rng = np.random.default_rng(seed)
+    offsets = np.sort(rng.integers(0, span_days * 86_400, size=n))[::-1]
+    coins = np.asarray(coins, dtype=object)[rng.integers(0, len(coins), size=n)]
+    directions = np.where(rng.random(n) < 0.5, "Bullish", "Bearish").astype(object)
+    return pd.DataFrame({
+        'timestamp': pd.Timestamp(start, tz="UTC") + pd.to_timedelta(offsets, unit="s"),
+        'coin': pd.Categorical(coins),
+        'direction': pd.Categorical(directions),
+        'raw_message': "#" + coins + " " + directions,
+    })
+
+
+def synthetic_candle_paths(n, n_candles=360, seed=0, volatility=0.002, drift=0.0, dtype=np.float32):
+    """
+    Geometric Brownian motion 1m candles after n signals, in the build_candle_arrays layout
+    (high/low/close as (n, n_candles) arrays plus entry_price, without open_time).
+    volatility and drift are per-minute log-return parameters; float32 halves the memory.
+    """
+    rng = np.random.default_rng(seed)
+    entry = (100 * rng.lognormal(0, 1.5, size=n)).astype(dtype)
+    returns = rng.standard_normal((n, n_candles), dtype=np.float32) * np.float32(volatility) + np.float32(drift)
+    close = entry[:, None] * np.exp(np.cumsum(returns, axis=1, dtype=np.float32))
+    previous = np.concatenate([entry[:, None], close[:, :-1]], axis=1)
+    # Wicks: a half-normal excursion beyond the candle body on each side
+    wick = np.abs(rng.standard_normal((2, n, n_candles), dtype=np.float32)) * np.float32(volatility / 2)
+    high = np.maximum(previous, close) * (1 + wick[0])
+    low = np.minimum(previous, close) * (1 - wick[1])
+    return {
+        "high": high.astype(dtype, copy=False),
+        "low": low.astype(dtype, copy=False),
+        "close": close.astype(dtype, copy=False),
+        "entry_price": entry,
+    }
+
+
+def iter_candle_paths(n, n_candles=360, seed=0, chunk_size=CHUNK_SIGNALS, **kwargs):
+    """
+    Yields (start, arrays) for consecutive chunks of at most chunk_size signals so 1M-signal
+    runs never hold every path at once. Chunk i uses the i-th stream spawned from seed.
+    """
+    n_chunks = -(-n // chunk_size)
+    for i, child in enumerate(np.random.SeedSequence(seed).spawn(n_chunks)):
+        start = i * chunk_size
+        yield start, synthetic_candle_paths(min(chunk_size, n - start), n_candles, child, **kwargs)
+
+
+def synthetic_price_data(n, n_candles=360, seed=0, chunk_size=CHUNK_SIGNALS, **kwargs):
+    """
+    Synthetic signals with entry_price, future_high and future_low (the
+    signals_with_price_data.csv layout that simulate_tp_sl consumes), reduced from
+    candle paths chunk by chunk.
+    """
+    df = synthetic_signals(n, seed)
+    entry = np.empty(n)
+    high = np.empty(n)
+    low = np.empty(n)
+    for start, paths in iter_candle_paths(n, n_candles, seed, chunk_size, **kwargs):
+        stop = start + len(paths["entry_price"])
+        entry[start:stop] = paths["entry_price"]
+        high[start:stop] = paths["high"].max(axis=1)
+        low[start:stop] = paths["low"].min(axis=1)
+    df.insert(3, 'entry_price', entry)
+    df.insert(4, 'future_high', high)
+    df.insert(5, 'future_low', low)
+    return df
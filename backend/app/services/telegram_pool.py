@@ -0,0 +1,231 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+
+from services.incremental_extraction import collect_signals
+from services.signal_parser import DEFAULT_PATTERNS, patterns_for
+from services.telemetry import inc, timed
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# One Telethon session file for the long-lived client, instead of one per request
+CLIENT_SESSION = os.path.join(APP_ROOT, "data", "extractor")
+
+log = logging.getLogger(__name__)
+
+
+def telegram_config():
+    """Reads API_ID / API_HASH / PHONE_NUMBER from the environment (and backend/app/.env)."""
+    from dotenv import load_dotenv
+    load_dotenv(dotenv_path=os.path.join(APP_ROOT, '.env'))
+    api_id = os.getenv("API_ID")
+    if not api_id or not os.getenv("API_HASH"):
+        raise RuntimeError("API_ID and API_HASH must be set to use the Telegram API.")
+    return int(api_id), os.getenv("API_HASH"), os.getenv("PHONE_NUMBER")
+
+
+def default_client_factory(session_path=CLIENT_SESSION):
+    """Returns (client, start coroutine function) for a real Telethon client."""
+    from telethon import TelegramClient
+    api_id, api_hash, phone_number = telegram_config()
+    client = TelegramClient(session_path, api_id, api_hash)
+    return client, lambda: client.start(phone_number)
+
+
+def input_channel(channel_id, access_hash):
+    from telethon.tl.types import InputPeerChannel
+    return InputPeerChannel(channel_id, access_hash)
+
+
+def flood_wait_seconds(error):
+    """Seconds Telegram asked us to wait, or None if error is not a flood wait."""
+    try:
+        from telethon.errors import FloodWaitError
+    except ImportError:  # fake clients in tests may raise their own error type
+        FloodWaitError = ()
+    if isinstance(error, FloodWaitError) or type(error).__name__ == "FloodWaitError":
+        return float(getattr(error, "seconds", 0))
+    return None
+
+
+class ProgressAborted(Exception):
+    """Carries an exception raised by a progress callback (e.g. JobCancelled) out of the scraping tasks."""
+
+    def __init__(self, error):
+        super().__init__(str(error))
+        self.error = error
+
+
+class FloodGate:
+    """Shared pause for every scraping task: one flood wait holds back all requests."""
+
+    def __init__(self):
+        self.resume_at = 0.0
+
+    async def wait(self):
+        delay = self.resume_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def hold(self, seconds):
+        self.resume_at = max(self.resume_at, time.monotonic() + seconds)
+
+
+class TelegramPool:
+    """
+    One authenticated client that lives on a background event-loop thread and is reused
+    across extraction jobs, so channels do not each pay a login handshake.
+    extract_channels() scrapes several channels concurrently (at most max_concurrency at a
+    time) and retries a channel after a FloodWaitError once the wait has passed; the wait
+    pauses all channels. client_factory() returns (client, start) and can be swapped for a
+    fake client exposing iter_messages(peer, limit, min_id) and disconnect().
+    """
+
+    def __init__(self, client_factory=default_client_factory, max_concurrency=4, max_flood_retries=3,
+                 peer_factory=input_channel):
+        self.client_factory = client_factory
+        self.peer_factory = peer_factory
+        self.max_concurrency = max_concurrency
+        self.max_flood_retries = max_flood_retries
+        self._client = None
+        self._client_lock = None
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._client_lock = asyncio.Lock()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="telegram-pool", daemon=True)
+                self._thread.start()
+        return self._loop
+
+    def run(self, coro):
+        """Runs a coroutine on the pool's loop from any thread and waits for its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop()).result()
+
+    async def client(self):
+        async with self._client_lock:
+            if self._client is None:
+                client, start = self.client_factory()
+                with timed("telegram_login_seconds"):
+                    await start()
+                self._client = client
+                inc("telegram_logins_total")
+            return self._client
+
+    async def _scrape(self, client, semaphore, gate, channel, start_date, limit, patterns, progress):
+        """Returns (signals, newest id) or the client error that ended the channel's scrape."""
+        channel_id = channel["channel_id"]
+        if channel.get("patterns"):
+            patterns = patterns_for(channel["patterns"])
+
+        def report(scanned):
+            try:
+                progress(channel_id, scanned)
+            except Exception as e:
+                raise ProgressAborted(e) from e
+
+        for attempt in range(self.max_flood_retries + 1):
+            async with semaphore:
+                await gate.wait()
+                try:
+                    messages = client.iter_messages(
+                        self.peer_factory(channel_id, channel["access_hash"]),
+                        limit=limit, min_id=channel.get("min_id", 0)
+                    )
+                    with timed("telegram_fetch_seconds"):
+                        signals, newest_id = await collect_signals(
+                            messages, start_date, patterns, report if progress else None
+                        )
+                    signals.insert(0, 'channel_id', channel_id)
+                    return signals, newest_id
+                except ProgressAborted:
+                    raise
+                except Exception as e:
+                    seconds = flood_wait_seconds(e)
+                    if seconds is None or attempt == self.max_flood_retries:
+                        inc("telegram_channel_errors_total")
+                        return e
+                    inc("telegram_flood_waits_total")
+                    log.warning("Flood wait of %ss on channel %s, retrying.", seconds, channel_id)
+                    gate.hold(seconds)
+
+    async def _extract(self, channels, months_back, limit, patterns, progress):
+        client = await self.client()
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        gate = FloodGate()
+        start_date = datetime.now(timezone.utc) - relativedelta(months=months_back)
+        tasks = [
+            asyncio.ensure_future(self._scrape(client, semaphore, gate, c, start_date, limit, patterns, progress))
+            for c in channels
+        ]
+        try:
+            return await asyncio.gather(*tasks)
+        finally:
+            # A progress abort fails the gather; stop the channels still running
+            for task in tasks:
+                task.cancel()
+
+    def extract_channels(self, channels, months_back, limit=None, patterns=DEFAULT_PATTERNS, progress=None):
+        """
+        channels is a list of {"channel_id", "access_hash", "min_id" (optional), "patterns"
+        (optional pattern names, see signal_parser.patterns_for; default patterns otherwise)}.
+        progress(scanned) gets the total number of messages scanned so far across channels,
+        and is called from the pool's loop thread.
+        Returns (combined signals with a channel_id column, {channel_id: newest id},
+        {channel_id: error message}). An exception raised from progress aborts everything.
+        """
+        scanned = {}
+
+        def report(channel_id, count):
+            scanned[channel_id] = count
+            progress(sum(scanned.values()))
+
+        try:
+            results = self.run(self._extract(channels, months_back, limit, patterns, report if progress else None))
+        except ProgressAborted as e:
+            raise e.error from None
+        frames, newest, errors = [], {}, {}
+        for channel, result in zip(channels, results):
+            channel_id = channel["channel_id"]
+            if isinstance(result, Exception):
+                errors[channel_id] = f"{type(result).__name__}: {result}"
+                continue
+            signals, newest[channel_id] = result
+            frames.append(signals)
+        combined = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        if not combined.empty:
+            combined = combined.sort_values('timestamp', ascending=False, kind="stable").reset_index(drop=True)
+        return combined, newest, errors
+
+    def close(self):
+        """Disconnects the client and stops the loop thread."""
+        if self._loop is None:
+            return
+        if self._client is not None:
+            self.run(self._client.disconnect())
+            self._client = None
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop = None
+
+
+_shared_pool = None
+_shared_lock = threading.Lock()
+
+
+def shared_pool():
+    """The process-wide pool (real Telethon client, logged in on first use)."""
+    global _shared_pool
+    with _shared_lock:
+        if _shared_pool is None:
+            _shared_pool = TelegramPool(max_concurrency=int(os.getenv("TELEGRAM_CONCURRENCY", 4)))
+        return _shared_pool
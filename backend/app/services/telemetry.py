@@ -0,0 +1,235 @@
+import bisect
+import collections
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from functools import wraps
+
+# Latency buckets in seconds (upper bounds), Prometheus-style
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram with count and sum."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (inf if it is past the last bucket)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets + (float("inf"),), self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class Registry:
+    """
+    Process-wide counters and latency histograms keyed by name and labels.
+    Collectors registered with add_collector() are called at render time and return
+    {name: value} gauges (e.g. cache sizes), so nothing has to push them.
+    """
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self.collectors = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def timed(self, name, **labels):
+        """Records the duration of the block in the {name} histogram, also when it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def timer(self, name, **labels):
+        """Decorator form of timed()."""
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.timed(name, **labels):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def add_collector(self, collector):
+        self.collectors.append(collector)
+
+    def snapshot(self):
+        """JSON-friendly view: counters, histogram count/sum/p50/p95/p99 and collected gauges."""
+        with self._lock:
+            counters = [{"name": n, "labels": dict(l), "value": v} for (n, l), v in sorted(self.counters.items())]
+            histograms = [
+                {
+                    "name": n, "labels": dict(l), "count": h.count, "sum": h.sum,
+                    "p50": h.quantile(0.5), "p95": h.quantile(0.95), "p99": h.quantile(0.99),
+                }
+                for (n, l), h in sorted(self.histograms.items())
+            ]
+        gauges = {}
+        for collector in self.collectors:
+            gauges.update(collector())
+        return {"counters": counters, "histograms": histograms, "gauges": gauges}
+
+    def render_prometheus(self):
+        """Prometheus text exposition format."""
+        def fmt(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+        lines = []
+        with self._lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                lines.append(f"{name}{fmt(labels)} {value}")
+            for (name, labels), h in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, n in zip(h.buckets + ("+Inf",), h.counts):
+                    cumulative += n
+                    lines.append(f"{name}_bucket{fmt(labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{name}_sum{fmt(labels)} {h.sum}")
+                lines.append(f"{name}_count{fmt(labels)} {h.count}")
+        for collector in self.collectors:
+            for name, value in collector().items():
+                lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class SamplingProfiler:
+    """
+    Samples the stack of one thread every interval seconds from a background thread
+    (sys._current_frames), so the profiled code runs unmodified. Results are collapsed
+    stacks ("outer;inner;leaf" -> samples), the input format of flame graph tools.
+    """
+
+    def __init__(self, thread_id=None, interval=0.005, max_depth=40):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _frame_stack(self, frame):
+        stack = []
+        while frame is not None and len(stack) < self.max_depth:
+            code = frame.f_code
+            stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+            frame = frame.f_back
+        return ";".join(reversed(stack))
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.samples[self._frame_stack(frame)] += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        return self
+
+    def top(self, n=30):
+        total = sum(self.samples.values())
+        return {
+            "interval": self.interval,
+            "samples": total,
+            "stacks": [{"stack": s, "samples": c} for s, c in self.samples.most_common(n)],
+        }
+
+
+# Shared registry used across services
+registry = Registry()
+inc = registry.inc
+observe = registry.observe
+timed = registry.timed
+timer = registry.timer
+
+# Most recent request profiles, newest last
+profiles = collections.OrderedDict()
+MAX_PROFILES = 20
+
+
+def install(app, enable_profiler=None):
+    """
+    Times every request into http_request_duration_seconds{method, endpoint, status}.
+    When the profiler is enabled (TELEMETRY_PROFILER=1 or enable_profiler=True), a request
+    with ?profile=1 is sampled and its profile kept under the X-Profile-Id response header.
+    """
+    from flask import g, request
+
+    if enable_profiler is None:
+        enable_profiler = os.getenv("TELEMETRY_PROFILER") == "1"
+
+    @app.before_request
+    def _start_timer():
+        g.telemetry_start = time.perf_counter()
+        if enable_profiler and request.args.get("profile") == "1":
+            g.telemetry_profiler = SamplingProfiler(interval=float(request.args.get("profile_interval", 0.005))).start()
+
+    @app.after_request
+    def _record(response):
+        start = g.pop("telemetry_start", None)
+        if start is not None:
+            labels = {"method": request.method, "endpoint": request.url_rule.rule if request.url_rule else "unmatched",
+                      "status": response.status_code}
+            observe("http_request_duration_seconds", time.perf_counter() - start, **labels)
+            inc("http_requests_total", **labels)
+        profiler = g.pop("telemetry_profiler", None)
+        if profiler is not None:
+            profile_id = uuid.uuid4().hex
+            profiles[profile_id] = {"path": request.full_path, **profiler.stop().top()}
+            while len(profiles) > MAX_PROFILES:
+                profiles.popitem(last=False)
+            response.headers["X-Profile-Id"] = profile_id
+        return response
+
+    @app.teardown_request
+    def _stop_profiler(exc):
+        # after_request is skipped when a view raises; teardown always runs
+        profiler = g.pop("telemetry_profiler", None)
+        if profiler is not None:
+            profiler.stop()
@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+
+from services.metrics import compound_equity, max_drawdown_pct
+from services.optimize_strategy import MAX_CHUNK_ELEMENTS, capped_gains, trade_arrays
+
+
+def walk_forward_windows(timestamps, train_days=30, test_days=7, step_days=None, anchored=False):
+    """
+    Slides train/test windows over sorted timestamps (datetime64 values).
+    Each window trains on [train_start, test_start) and tests on [test_start, test_start + test_days);
+    anchored=True keeps train_start at the first signal (expanding window).
+    Returns (train_start, test_start, test_end) as trade indices and as times, one row per window.
+    """
+    timestamps = np.asarray(timestamps, dtype="datetime64[ns]")
+    if not len(timestamps):
+        return np.empty((0, 3), dtype=np.int64), np.empty((0, 3), dtype="datetime64[ns]")
+    train = np.timedelta64(int(train_days * 86400), "s")
+    test = np.timedelta64(int(test_days * 86400), "s")
+    step = np.timedelta64(int((step_days or test_days) * 86400), "s")
+
+    test_starts = np.arange(timestamps[0] + train, timestamps[-1] + np.timedelta64(1, "ns"), step)
+    train_starts = np.full(len(test_starts), timestamps[0]) if anchored else test_starts - train
+    times = np.stack([train_starts, test_starts, test_starts + test], axis=1)
+    return np.searchsorted(timestamps, times, side="left"), times
+
+
+def log_growth_at(gain, drawdown, sl, tp, risk, boundaries):
+    """
+    Cumulative log growth of every grid point at the given trade boundaries: column j is
+    the sum of log(1 + risk * capped gain / 100) over trades [0, boundaries[j]).
+    Trades are processed in chunks with a running total, so memory stays at
+    O(points x chunk + points x boundaries) whatever the number of trades or windows.
+    """
+    sl, tp, risk = (np.asarray(v, dtype=float) for v in (sl, tp, risk))
+    boundaries = np.asarray(boundaries, dtype=np.int64)
+    out = np.zeros((len(sl), len(boundaries)))
+    running = np.zeros(len(sl))
+    step = max(1, MAX_CHUNK_ELEMENTS // max(len(sl), 1))
+    for start in range(0, len(gain), step):
+        stop = min(start + step, len(gain))
+        with np.errstate(divide="ignore"):
+            growth = np.log1p(risk[:, None] * capped_gains(gain[start:stop], drawdown[start:stop], sl, tp) / 100)
+        cumulative = running[:, None] + np.cumsum(growth, axis=1)
+        inside = (boundaries > start) & (boundaries <= stop)
+        out[:, inside] = cumulative[:, boundaries[inside] - start - 1]
+        running = cumulative[:, -1]
+    return out
+
+
+def walk_forward(
+    df,
+    sl_values=[1, 1.5, 2, 2.5, 3],
+    tp_values=[3, 4.5, 5, 6, 7],
+    risk_values=(0.01,),
+    train_days=30,
+    test_days=7,
+    step_days=None,
+    anchored=False,
+    min_train_trades=10,
+    initial_balance=1000
+):
+    """
+    Walk-forward optimization: for every window, picks the SL/TP/risk combination with the
+    best compounded return on the train window and reports how it did on the following
+    test window (out of sample). Windows are read from one set of cumulative log-growth
+    sums, so each extra window costs O(grid size) instead of a new grid search.
+    Windows with fewer than min_train_trades train trades are skipped.
+    Returns one row per window; 'OOS Balance' chains the test returns, which is the
+    out-of-sample equity when step_days >= test_days.
+    """
+    df = df.assign(timestamp=pd.to_datetime(df['timestamp'], utc=True)).sort_values('timestamp', kind="stable")
+    direction = df['direction'].astype(str).str.lower()
+    df = df[direction.isin(["bullish", "bearish"]).to_numpy()]
+    gain, drawdown = trade_arrays(df)
+    timestamps = df['timestamp'].dt.tz_convert(None).to_numpy()
+
+    sl_grid, tp_grid, risk_grid = (g.ravel() for g in np.meshgrid(sl_values, tp_values, risk_values, indexing="ij"))
+    bounds, times = walk_forward_windows(timestamps, train_days, test_days, step_days, anchored)
+    keep = bounds[:, 1] - bounds[:, 0] >= min_train_trades
+    bounds, times = bounds[keep], times[keep]
+    boundaries = np.unique(bounds)
+    growth = log_growth_at(gain, drawdown, sl_grid, tp_grid, risk_grid, boundaries)
+    column = {b: j for j, b in enumerate(boundaries)}
+
+    rows = []
+    oos_balance = float(initial_balance)
+    for (train_start, test_start, test_end), (train_time, test_time, end_time) in zip(bounds, times):
+        train_growth = growth[:, column[test_start]] - growth[:, column[train_start]]
+        best = int(np.argmax(train_growth))
+        test_growth = growth[best, column[test_end]] - growth[best, column[test_start]]
+        test_return = np.expm1(test_growth)
+        oos_balance *= 1 + test_return
+        test_equity = compound_equity(
+            capped_gains(gain[test_start:test_end], drawdown[test_start:test_end], sl_grid[best:best + 1], tp_grid[best:best + 1])[0],
+            risk_grid[best], initial_balance
+        )
+        rows.append({
+            'Train Start': train_time,
+            'Test Start': test_time,
+            'Test End': end_time,
+            'Train Trades': int(test_start - train_start),
+            'Test Trades': int(test_end - test_start),
+            'SL%': sl_grid[best],
+            'TP%': tp_grid[best],
+            'Risk %': risk_grid[best] * 100,
+            'Train Return %': round(float(np.expm1(train_growth[best])) * 100, 4),
+            'Test Return %': round(float(test_return) * 100, 4),
+            'Test Max Drawdown %': round(float(max_drawdown_pct(test_equity, initial_balance)), 4),
+            'OOS Balance': round(oos_balance, 2),
+        })
+
+    result_df = pd.DataFrame(rows)
+    print(f"✅ Walk-forward complete. {len(result_df)} windows, {len(sl_grid)} combinations each.")
+    return result_df
@@ -4,17 +4,21 @@ async function loadAnalysis(sessionName) {
   if (!sessionName) return;
   selectedSession = sessionName;
   document.getElementById('analysisResults').innerText = "Loading analysis for " + sessionName + "...";
-  await renderGainDistributionChart(sessionName, document.getElementById('gainDistRange').value);
-  await renderDrawdownDistributionChart(sessionName, document.getElementById('drawdownDistRange').value);
+  await renderGainDistributionChart(sessionName);
+  await renderDrawdownDistributionChart(sessionName);
   await renderSignalsTable(sessionName);
 }
 
 // --- Chart rendering functions ---
 
-async function renderGainDistributionChart(sessionName, range) {
+// Distribution endpoints return server-side histograms: { edges, counts, count, quantiles }
+function histogramLabels(hist) {
+  return hist.counts.map((_, i) => `${hist.edges[i].toFixed(2)} – ${hist.edges[i + 1].toFixed(2)}`);
+}
+
+async function renderGainDistributionChart(sessionName) {
   if (!sessionName) return;
-  range = range || 1;
-  const res = await fetch(`/api/chart/${sessionName}/gain_distribution?range=${range}`);
+  const res = await fetch(`/api/chart/${sessionName}/gain_distribution`);
   const data = await res.json();
   if (data.error) {
       alert(data.error);
@@ -27,10 +31,10 @@ async function renderGainDistributionChart(sessionName, range) {
   window.gainDistChartInstance = new Chart(ctx, {
       type: 'bar',
       data: {
-          labels: data.map((_, i) => i + 1),
+          labels: histogramLabels(data),
           datasets: [{
-              label: 'Gain (%)',
-              data: data,
+              label: 'Signals',
+              data: data.counts,
               backgroundColor: '#2196f3'
           }]
       },
@@ -38,19 +42,18 @@ async function renderGainDistributionChart(sessionName, range) {
           responsive: true,
           plugins: {
               legend: { display: false },
-              title: { display: true, text: 'Gain Distribution' }
+              title: { display: true, text: `Gain Distribution (%, ${data.count} signals)` }
           },
           scales: {
-              y: { beginAtZero: true }
+              y: { beginAtZero: true, title: { display: true, text: 'Signals' } }
           }
       }
   });
 }
 
-async function renderDrawdownDistributionChart(sessionName, range) {
+async function renderDrawdownDistributionChart(sessionName) {
   if (!sessionName) return;
-  range = range || 1;
-  const res = await fetch(`/api/chart/${sessionName}/drawdown_distribution?range=${range}`);
+  const res = await fetch(`/api/chart/${sessionName}/drawdown_distribution`);
   const data = await res.json();
   if (data.error) {
     alert(data.error);
@@ -63,10 +66,10 @@ async function renderDrawdownDistributionChart(sessionName, range) {
   window.drawdownDistChartInstance = new Chart(ctx, {
     type: 'bar',
     data: {
-      labels: data.coins,
+      labels: histogramLabels(data),
       datasets: [{
-        label: 'Drawdown (%)',
-        data: data.drawdowns,
+        label: 'Signals',
+        data: data.counts,
         backgroundColor: '#e57373'
       }]
     },
@@ -74,19 +77,17 @@ async function renderDrawdownDistributionChart(sessionName, range) {
       responsive: true,
       plugins: {
         legend: { display: false },
-        title: { display: true, text: 'Drawdown Distribution' },
+        title: { display: true, text: `Drawdown Distribution (%, ${data.count} signals)` },
         tooltip: {
           callbacks: {
             label: function(context) {
-              const coin = context.label;
-              const value = context.parsed.y;
-              return `${coin}: ${value}%`;
+              return `${context.label}%: ${context.parsed.y} signals`;
             }
           }
         }
       },
       scales: {
-        y: { beginAtZero: true }
+        y: { beginAtZero: true, title: { display: true, text: 'Signals' } }
       }
     }
   });
@@ -4,5 +4,27 @@ document.getElementById('extractForm').onsubmit = async function(e) {
     const data = new FormData(form);
     const res = await fetch(form.action, { method: 'POST', body: data });
     const json = await res.json();
-    document.getElementById('extractResult').innerText = json.message || json.error;
-  };
\ No newline at end of file
+    const resultDiv = document.getElementById('extractResult');
+    if (!json.job_id) {
+      resultDiv.innerText = json.message || json.error;
+      return;
+    }
+    resultDiv.innerText = "Extraction started...";
+    pollJob(json.job_id, resultDiv);
+  };
+
+async function pollJob(jobId, resultDiv) {
+    const res = await fetch(`/api/jobs/${jobId}`);
+    const job = await res.json();
+    if (job.status === 'queued' || job.status === 'running') {
+      resultDiv.innerText = job.progress ? `Running... ${job.progress} ${job.message || ''}` : "Running...";
+      setTimeout(() => pollJob(jobId, resultDiv), 2000);
+      return;
+    }
+    if (job.status === 'done') {
+      const result = await (await fetch(`/api/jobs/${jobId}/result`)).json();
+      resultDiv.innerText = result.message;
+    } else {
+      resultDiv.innerText = job.error || `Job ${job.status}.`;
+    }
+  }
@@ -1,6 +1,6 @@
 async function loadSession(sessionName) {
     if (!sessionName) return;
-    const res = await fetch(`/api/session/${sessionName}`);
+    const res = await fetch(`/api/session/${sessionName}?limit=6`);
     const data = await res.json();
 
     const sessionDataDiv = document.getElementById('sessionData');
@@ -0,0 +1,72 @@
+"""
+Benchmark suite for the backtest pipeline (pytest-benchmark), on seeded synthetic data.
+
+    python -m pytest backend/benchmarks --benchmark-autosave
+    BENCHMARK_SIZES=1k,100k,1M python -m pytest backend/benchmarks \
+        --benchmark-compare --benchmark-compare-fail=min:25%
+
+BENCHMARK_SIZES picks the input sizes (default 1k) and BENCHMARK_ROUNDS the timed rounds
+per stage (default 3). --benchmark-autosave stores a run under .benchmarks/; with
+--benchmark-compare-fail a stage slower than the last saved run fails the session, which
+is the regression report.
+"""
+import os
+import sys
+
+import pytest
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+SIZES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1M": 1_000_000}
+# Full (n, 360) candle buffers above this many signals would not fit comfortably in memory
+MAX_PATH_SIGNALS = 100_000
+ROUNDS = int(os.getenv("BENCHMARK_ROUNDS", 3))
+
+
+def benchmark_sizes():
+    sizes = [s.strip() for s in os.getenv("BENCHMARK_SIZES", "1k").split(",") if s.strip()]
+    unknown = [s for s in sizes if s not in SIZES]
+    if unknown:
+        raise pytest.UsageError(f"Unknown BENCHMARK_SIZES: {', '.join(unknown)} (choose from {', '.join(SIZES)})")
+    return sizes
+
+
+def pytest_generate_tests(metafunc):
+    if "size" in metafunc.fixturenames:
+        metafunc.parametrize("size", benchmark_sizes(), scope="session")
+
+
+@pytest.fixture(scope="session")
+def n(size):
+    return SIZES[size]
+
+
+@pytest.fixture(scope="session")
+def price_data(n):
+    from services.synthetic import synthetic_price_data
+    return synthetic_price_data(n, seed=0)
+
+
+@pytest.fixture(scope="session")
+def backtest(price_data):
+    from services.simulate_tp_sl import simulate_tp_sl
+    return simulate_tp_sl(price_data)
+
+
+@pytest.fixture(scope="session")
+def paths(n, price_data):
+    if n > MAX_PATH_SIGNALS:
+        pytest.skip(f"candle paths are only built up to {MAX_PATH_SIGNALS:,} signals")
+    from services.path_simulation import direction_sign
+    from services.synthetic import synthetic_candle_paths
+    return {**synthetic_candle_paths(n, seed=0), "sign": direction_sign(price_data['direction'])}
+
+
+@pytest.fixture
+def run(benchmark):
+    """Times fn over ROUNDS rounds (inputs are built by the fixtures, outside the timings)."""
+    def run(fn, *args, **kwargs):
+        return benchmark.pedantic(fn, args=args, kwargs=kwargs, rounds=ROUNDS, iterations=1)
+    return run
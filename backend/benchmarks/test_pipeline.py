@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from services.exit_models import simulate_exits
+from services.metrics import trade_metrics
+from services.optimize_strategy import optimize_strategy
+from services.path_simulation import simulate_paths
+from services.plot_backtest_stats import (
+    DEFAULT_MAX_POINTS,
+    get_drawdown_distribution_data,
+    get_equity_curve_data,
+    get_gain_distribution_data
+)
+from services.portfolio import portfolio_backtest
+from services.session_index import build_index
+from services.simulate_tp_sl import simulate_tp_sl
+from services.simulation import run_simulation_logic
+
+
+def test_simulate_tp_sl(run, price_data, n):
+    result = run(simulate_tp_sl, price_data)
+    assert len(result) == n
+    assert set(result['outcome'].dropna()) <= {"TP", "SL", "None"}
+
+
+def test_simulate_paths(run, paths, n):
+    result = run(simulate_paths, paths["entry_price"], paths["sign"], paths["high"], paths["low"], paths["close"])
+    assert len(result) == n
+    assert np.isfinite(result['gain_pct']).all()
+
+
+@pytest.mark.parametrize("model", ["fixed", "ladder", "atr_trailing"])
+def test_exit_model(run, paths, n, model):
+    result = run(simulate_exits, paths["entry_price"], paths["sign"], paths["high"], paths["low"], paths["close"], model)
+    assert len(result["gain_pct"]) == n
+
+
+def test_optimize_strategy(run, backtest):
+    result = run(optimize_strategy, backtest, output_dir=None)
+    assert len(result) == 25
+    assert result['Final Balance'].is_monotonic_decreasing
+
+
+def test_run_simulation_logic(run, backtest, n):
+    result = run(lambda: run_simulation_logic(backtest.copy(), 2, 6, 1))
+    assert result["total_trades"] == n
+
+
+def test_trade_metrics(run, backtest):
+    result = run(trade_metrics, backtest['gain_pct'].to_numpy(), 0.01)
+    assert len(result["equity"]) == len(backtest)
+
+
+def test_equity_curve_chart(run, backtest):
+    result = run(get_equity_curve_data, backtest)
+    assert len(result["equity"]) <= DEFAULT_MAX_POINTS
+
+
+def test_gain_distribution_chart(run, backtest, n):
+    result = run(get_gain_distribution_data, backtest)
+    assert sum(result["counts"]) == n
+
+
+def test_drawdown_distribution_chart(run, backtest, n):
+    result = run(get_drawdown_distribution_data, backtest)
+    assert sum(result["counts"]) == n
+
+
+def test_session_index(run, backtest, n):
+    result = run(build_index, backtest)
+    assert result["rows"] == n
+
+
+def test_portfolio(run, backtest, n):
+    result = run(portfolio_backtest, backtest, max_positions=50, max_coin_exposure=0.05)
+    assert result["signals"] == n
+    assert result["max_open_positions"] <= 50
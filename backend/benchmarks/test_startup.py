@@ -0,0 +1,43 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+ROUNDS = int(os.getenv("BENCHMARK_ROUNDS", 3))
+# Modules a chart/API worker must not load at startup (network clients, plotting, credentials)
+STARTUP_FORBIDDEN = ("telethon", "matplotlib", "seaborn", "dotenv", "services.telegram_pool",
+                     "services.add_prices_to_signals", "services.optimize_strategy")
+STARTUP_SCRIPT = """
+import tempfile, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+with tempfile.TemporaryDirectory() as data_dir:
+    main.create_app(data_dir=data_dir)
+    print(imported - start, time.perf_counter() - imported)
+"""
+
+
+def startup_once():
+    """One cold start, without Telegram credentials: (import seconds, create_app seconds, imported modules)."""
+    env = {k: v for k, v in os.environ.items() if k not in ("API_ID", "API_HASH", "PHONE_NUMBER")}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", STARTUP_SCRIPT],
+        cwd=APP_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    # "import time:  self [us] | cumulative | imported package"
+    modules = {line.split("|")[2].strip() for line in proc.stderr.splitlines()
+               if line.startswith("import time:") and line.count("|") == 2}
+    import_s, create_s = map(float, proc.stdout.split()[-2:])
+    return import_s, create_s, modules
+
+
+def test_startup(benchmark):
+    import_s, create_s, modules = benchmark.pedantic(startup_once, rounds=ROUNDS, iterations=1)
+    benchmark.extra_info.update(import_main_s=import_s, create_app_s=create_s)
+    forbidden = sorted(m for m in modules if m in STARTUP_FORBIDDEN or m.split(".")[0] in STARTUP_FORBIDDEN)
+    assert not forbidden, f"imported at startup: {', '.join(forbidden)}"
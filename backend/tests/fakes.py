@@ -0,0 +1,92 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+NOW = datetime.now(timezone.utc).replace(microsecond=0)
+
+
+class FakeMessage:
+    def __init__(self, id, text, date):
+        self.id = id
+        self.message = text
+        self.date = date
+
+
+def channel_messages(texts, newest=NOW, spacing=timedelta(minutes=5)):
+    """Messages with ids 1..n, oldest first, the last one dated newest."""
+    n = len(texts)
+    return [FakeMessage(i + 1, text, newest - spacing * (n - 1 - i)) for i, text in enumerate(texts)]
+
+
+class FloodWaitError(Exception):
+    """Named like Telethon's error; TelegramPool recognises flood waits by type name."""
+
+    def __init__(self, seconds):
+        super().__init__(f"A wait of {seconds} seconds is required")
+        self.seconds = seconds
+
+
+class FakeClient:
+    """
+    Stands in for a Telethon client: iter_messages(peer, limit, min_id) yields a channel's
+    messages newest first, above min_id. floods[peer] = n makes the first n calls for that
+    peer raise FloodWaitError(flood_seconds); errors[peer] makes every call raise it.
+    Records every call, the peak number of concurrent iterations and the logins.
+    """
+
+    def __init__(self, channels, floods=None, flood_seconds=0, errors=None, delay=0.0):
+        self.channels = channels
+        self.floods = dict(floods or {})
+        self.flood_seconds = flood_seconds
+        self.errors = errors or {}
+        self.delay = delay
+        self.calls = []
+        self.call_times = []
+        self.logins = 0
+        self.active = 0
+        self.peak_active = 0
+        self.disconnected = False
+        self.handlers = []
+
+    async def start(self):
+        self.logins += 1
+
+    async def disconnect(self):
+        self.disconnected = True
+
+    def add_event_handler(self, handler, event_filter):
+        self.handlers.append((handler, event_filter))
+
+    def remove_event_handler(self, handler, event_filter):
+        self.handlers.remove((handler, event_filter))
+
+    async def iter_messages(self, peer, limit=None, min_id=0):
+        loop = asyncio.get_running_loop()
+        self.calls.append((peer, limit, min_id))
+        self.call_times.append(loop.time())
+        if peer in self.errors:
+            raise self.errors[peer]
+        if self.floods.get(peer, 0) > 0:
+            self.floods[peer] -= 1
+            raise FloodWaitError(self.flood_seconds)
+        self.active += 1
+        self.peak_active = max(self.peak_active, self.active)
+        try:
+            yielded = 0
+            for message in reversed(self.channels.get(peer, [])):
+                if message.id <= min_id or (limit is not None and yielded >= limit):
+                    break
+                await asyncio.sleep(self.delay)
+                yielded += 1
+                yield message
+        finally:
+            self.active -= 1
+
+
+def fake_pool(client, **kwargs):
+    """A TelegramPool around client; peers are the plain channel ids."""
+    from services.telegram_pool import TelegramPool
+
+    def factory():
+        return client, client.start
+
+    return TelegramPool(client_factory=factory, peer_factory=lambda channel_id, access_hash: channel_id, **kwargs)
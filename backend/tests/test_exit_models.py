@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from services.exit_models import simulate_exits
+
+ENTRY = 100.0
+
+
+def run(candles, sign=1, model="fixed", time_stop=None, **params):
+    """One signal entered at ENTRY over candles [(high, low, close), ...]; returns (gain_pct, exit_idx, outcome, targets)."""
+    high, low, close = (np.asarray([[c[k] for c in candles]], dtype=float) for k in range(3))
+    result = simulate_exits(np.array([ENTRY]), np.array([sign]), high, low, close, model, time_stop, **params)
+    return (float(result["gain_pct"][0]), int(result["exit_idx"][0]), result["outcome"][0],
+            int(result["targets_hit"][0]))
+
+
+def flat(n, price=ENTRY, spread=0.5):
+    return [(price + spread, price - spread, price)] * n
+
+
+def test_fixed_stop_wins_ties():
+    gain, idx, outcome, _ = run(flat(2) + [(116, 94, 100)], sl=0.05, tp=0.15)
+    assert (idx, outcome) == (2, "SL") and gain == pytest.approx(-5)
+
+
+def test_breakeven_moves_stop_to_entry():
+    candles = flat(1) + [(106, 101, 105), (105, 99, 100)]
+    gain, idx, outcome, _ = run(candles, model="breakeven", sl=0.05, tp=0.15, trigger=0.05)
+    assert (idx, outcome) == (2, "SL") and gain == pytest.approx(0, abs=1e-4)
+    # Without the trigger being reached the plain stop applies
+    gain, _, _, _ = run(flat(1) + [(104, 101, 103), (104, 94, 95)], model="breakeven", sl=0.05, tp=0.15, trigger=0.05)
+    assert gain == pytest.approx(-5)
+
+
+def test_ladder_partial_exits_then_breakeven():
+    candles = flat(1) + [(106, 101, 105), (111, 104, 110), (110, 99, 100)]
+    gain, idx, outcome, targets = run(candles, model="ladder", sl=0.05, targets=(0.05, 0.10, 0.15),
+                                      sizes=(1 / 3, 1 / 3, 1 / 3), breakeven_after=1)
+    # A third at +5%, a third at +10%, the rest stopped at entry
+    assert targets == 2 and outcome == "SL" and idx == 3
+    assert gain == pytest.approx((5 + 10) / 3, abs=1e-3)
+
+
+def test_ladder_all_targets_close_the_trade():
+    candles = flat(1) + [(106, 101, 105), (116, 104, 115), (110, 50, 60)]
+    gain, idx, outcome, targets = run(candles, model="ladder", sl=0.05, targets=(0.05, 0.10, 0.15),
+                                      sizes=(1 / 3, 1 / 3, 1 / 3))
+    assert (targets, outcome, idx) == (3, "TP", 2)
+    assert gain == pytest.approx(10, abs=1e-3)
+
+
+@pytest.mark.parametrize("sign, candles, exit_price", [
+    # Long: best high 200, stop 10% below it
+    (1, flat(1) + [(200, 150, 190), (195, 170, 175)], 180),
+    # Short: best low 50, stop 10% above it
+    (-1, flat(1) + [(90, 50, 52), (60, 51, 58)], 55),
+])
+def test_trailing_stop_trails_the_best_price(sign, candles, exit_price):
+    gain, idx, outcome, _ = run(candles, sign, model="trailing", sl=0.05, trail=0.10)
+    assert (idx, outcome) == (2, "SL")
+    assert gain == pytest.approx(sign * (exit_price / ENTRY - 1) * 100, abs=1e-3)
+
+
+def test_trailing_activation():
+    candles = flat(1) + [(103, 100, 102), (103, 97, 98)]
+    # Not yet armed at +3%: only the 5% stop applies, so the trade runs to the last close
+    gain, idx, outcome, _ = run(candles, model="trailing", sl=0.05, trail=0.01, activation=0.05)
+    assert (idx, outcome) == (2, "None") and gain == pytest.approx(-2)
+    gain, _, outcome, _ = run(candles, model="trailing", sl=0.05, trail=0.01, activation=0.02)
+    assert outcome == "SL" and gain == pytest.approx((103 * 0.99 / ENTRY - 1) * 100, abs=1e-3)
+
+
+def test_atr_trailing_stop():
+    # Candles 1% either side of entry give a true range of 2%; 1.5 ATR behind the +1% peak is -2%
+    candles = flat(5, spread=1) + [(100, 97.5, 98)]
+    gain, idx, outcome, _ = run(candles, model="atr_trailing", sl=0.05, atr_mult=1.5, atr_period=3)
+    assert (idx, outcome) == (5, "SL") and gain == pytest.approx(-2, abs=1e-3)
+
+
+def test_time_stop_exits_at_that_candle_close():
+    candles = flat(1) + [(104, 100, 103), (105, 101, 104), (125, 101, 120)]
+    gain, idx, outcome, _ = run(candles, time_stop=3, sl=0.05, tp=0.15)
+    assert (idx, outcome) == (2, "None") and gain == pytest.approx(4)
@@ -0,0 +1,122 @@
+import asyncio
+from datetime import timedelta
+
+import pandas as pd
+import pytest
+
+from fakes import NOW, FakeClient, FakeMessage, channel_messages, fake_pool
+from services.incremental_extraction import (
+    append_signals,
+    collect_signals,
+    load_high_water_mark,
+    new_signals,
+    save_high_water_mark
+)
+
+
+async def stream(messages):
+    for message in messages:
+        yield message
+
+
+def collect(messages, start_date, **kwargs):
+    return asyncio.run(collect_signals(stream(messages), start_date, **kwargs))
+
+
+def test_collect_stops_at_start_date():
+    messages = [
+        FakeMessage(5, "#BTC Bullish", NOW),
+        FakeMessage(4, "gm", NOW - timedelta(days=1)),
+        FakeMessage(3, "#ETH bearish continuation", NOW - timedelta(days=2)),
+        FakeMessage(2, "#SOL Bullish", NOW - timedelta(days=40)),
+        FakeMessage(1, "#XRP Bullish", NOW - timedelta(days=50)),
+    ]
+    signals, newest_id = collect(messages, NOW - timedelta(days=30))
+    assert newest_id == 5
+    assert signals['coin'].tolist() == ["BTC", "ETH"]
+    assert signals['message_id'].tolist() == [5, 3]
+    assert signals['continuation'].tolist() == [False, True]
+
+
+def test_collect_reports_progress():
+    messages = [FakeMessage(i, "#BTC Bullish", NOW) for i in range(10, 0, -1)]
+    seen = []
+    collect(messages, NOW - timedelta(days=1), progress=seen.append, progress_every=3)
+    assert seen == [3, 6, 9]
+
+
+def test_high_water_mark_never_moves_back(tmp_path):
+    state = str(tmp_path / "state.json")
+    assert load_high_water_mark("s", 1, state) == 0
+    save_high_water_mark("s", 1, 40, state)
+    save_high_water_mark("s", 1, 30, state)
+    save_high_water_mark("s", 2, 7, state)
+    assert load_high_water_mark("s", 1, state) == 40
+    assert load_high_water_mark("s", 2, state) == 7
+    assert load_high_water_mark("other", 1, state) == 0
+
+
+def test_incremental_run_fetches_only_new_messages(tmp_path):
+    state = str(tmp_path / "state.json")
+    history = channel_messages(["#BTC Bullish", "noise", "#ETH Bearish"])
+    client = FakeClient({100: history})
+    pool = fake_pool(client)
+    try:
+        channel = {"channel_id": 100, "access_hash": 1, "min_id": load_high_water_mark("s", 100, state)}
+        first, newest, errors = pool.extract_channels([channel], months_back=1)
+        assert not errors and newest == {100: 3}
+        save_high_water_mark("s", 100, newest[100], state)
+
+        history.append(FakeMessage(4, "#SOL Bullish", history[-1].date + timedelta(minutes=5)))
+        channel["min_id"] = load_high_water_mark("s", 100, state)
+        second, newest, _ = pool.extract_channels([channel], months_back=1)
+    finally:
+        pool.close()
+
+    assert [call[2] for call in client.calls] == [0, 3]
+    assert client.logins == 1
+    assert second['message_id'].tolist() == [4]
+    session = append_signals(first, second)
+    assert sorted(session['coin']) == ["BTC", "ETH", "SOL"]
+    # Re-appending the same batch adds nothing
+    assert len(append_signals(session, second)) == 3
+
+
+def test_new_signals_dedupes_per_channel():
+    existing = pd.DataFrame({"channel_id": [1, 1], "message_id": [10, 11]})
+    incoming = pd.DataFrame({"channel_id": [1, 2, 2], "message_id": [11, 11, 12]})
+    assert new_signals(existing, incoming).values.tolist() == [[2, 11], [2, 12]]
+
+
+def test_legacy_session_is_deduped_by_timestamp_and_text():
+    # Sessions saved before message ids were recorded: no message_id and no high-water mark
+    messages = channel_messages(["#BTC Bullish", "#ETH Bearish"])
+    legacy = pd.DataFrame({
+        "timestamp": [m.date.isoformat() for m in messages],
+        "coin": ["BTC", "ETH"],
+        "direction": ["Bullish", "Bearish"],
+        "raw_message": [m.message for m in messages],
+    })
+    messages.append(FakeMessage(3, "#SOL Bullish", messages[-1].date + timedelta(minutes=5)))
+    refetched, _ = collect(messages[::-1], NOW - timedelta(days=30))
+    refetched.insert(0, 'channel_id', 100)
+
+    assert new_signals(legacy, refetched)['coin'].tolist() == ["SOL"]
+    session = append_signals(legacy, refetched)
+    assert sorted(session['coin']) == ["BTC", "ETH", "SOL"]
+    # Once mixed, both the legacy rows and the new id-carrying row are recognised
+    assert new_signals(session, refetched).empty
+    assert len(append_signals(session, refetched)) == 3
+
+
+@pytest.mark.parametrize("floods", [1, 2])
+def test_flood_wait_is_retried(floods):
+    client = FakeClient({100: channel_messages(["#BTC Bullish"])}, floods={100: floods}, flood_seconds=0)
+    pool = fake_pool(client, max_flood_retries=3)
+    try:
+        signals, newest, errors = pool.extract_channels([{"channel_id": 100, "access_hash": 1}], months_back=1)
+    finally:
+        pool.close()
+    assert not errors
+    assert signals['coin'].tolist() == ["BTC"]
+    assert len(client.calls) == floods + 1
@@ -0,0 +1,164 @@
+import json
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+
+from services.add_prices_to_signals import ExchangeError, InvalidSymbol, KlineFetcher, TokenBucket, enrich_signals
+from services.candle_store import CandleStore
+
+STEP = 60_000
+T0 = 1_700_000_000_000 // STEP * STEP
+
+
+class FakeBinance(BaseHTTPRequestHandler):
+    """
+    /api/v3/klines over synthetic 1m candles. Per-symbol behaviour comes from the server's
+    script: {"429": n} answers the first n requests with 429 + Retry-After, {"500": n} with
+    500, "invalid" with Binance's 400 invalid-symbol error, {"fail_from": ms} with a 500 for
+    any request starting at or after ms.
+    """
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body, headers=()):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        server = self.server
+        params = dict(urllib.parse.parse_qsl(urllib.parse.urlparse(self.path).query))
+        symbol = params["symbol"]
+        start, end, limit = int(params["startTime"]), int(params["endTime"]), int(params["limit"])
+        with server.lock:
+            server.requests.append((symbol, start, end))
+            script = server.script.get(symbol, {})
+            if script == "invalid":
+                return self._reply(400, {"code": -1121, "msg": "Invalid symbol."})
+            if script.get("429", 0) > 0:
+                script["429"] -= 1
+                return self._reply(429, {"code": -1003}, [("Retry-After", "0.05")])
+            if script.get("500", 0) > 0:
+                script["500"] -= 1
+                return self._reply(500, {"code": -1000})
+            if start >= script.get("fail_from", float("inf")):
+                return self._reply(500, {"code": -1000})
+        first = -(-start // STEP) * STEP
+        rows = []
+        for t in range(first, end + 1, STEP)[:limit]:
+            price = 100 + (t - T0) / STEP
+            rows.append([t, str(price), str(price + 1), str(price - 1), str(price + 0.5), "10"])
+        self._reply(200, rows)
+
+
+@pytest.fixture
+def binance():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeBinance)
+    server.lock = threading.Lock()
+    server.requests = []
+    server.script = {}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield server
+    server.shutdown()
+
+
+def fetcher_for(server, **kwargs):
+    return KlineFetcher(server.url, limiter=TokenBucket(capacity=1000, refill_per_second=1000), backoff=0.01, **kwargs)
+
+
+def test_paginates(binance):
+    rows = fetcher_for(binance)("BTCUSDT", "1m", T0, T0 + 2500 * STEP)
+    assert len(rows) == 2501
+    assert [r[0] for r in rows] == list(range(T0, T0 + 2501 * STEP, STEP))
+    assert len(binance.requests) == 3
+
+
+def test_retries_rate_limit_and_server_errors(binance):
+    binance.script["BTCUSDT"] = {"429": 2, "500": 1}
+    start = time.monotonic()
+    rows = fetcher_for(binance)("BTCUSDT", "1m", T0, T0 + 9 * STEP)
+    assert len(rows) == 10
+    assert len(binance.requests) == 4
+    # Two Retry-After pauses of 0.05s went through the shared limiter
+    assert time.monotonic() - start >= 0.1
+
+
+def test_gives_up_after_max_retries(binance):
+    binance.script["BTCUSDT"] = {"500": 10}
+    with pytest.raises(ExchangeError):
+        fetcher_for(binance, max_retries=2)("BTCUSDT", "1m", T0, T0 + 9 * STEP)
+    assert len(binance.requests) == 3
+
+
+def test_invalid_symbol_is_not_retried(binance):
+    binance.script["NOPEUSDT"] = "invalid"
+    with pytest.raises(InvalidSymbol):
+        fetcher_for(binance)("NOPEUSDT", "1m", T0, T0 + 9 * STEP)
+    assert len(binance.requests) == 1
+
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(capacity=4, refill_per_second=40)
+    start = time.monotonic()
+    for _ in range(6):
+        bucket.acquire(2)
+    # 12 tokens with 4 in the bucket: 8 more at 40/s
+    assert time.monotonic() - start >= 0.18
+
+
+def signals(*rows):
+    return pd.DataFrame(
+        [(pd.Timestamp(T0 + minutes * STEP, unit="ms", tz="UTC"), coin, "Bullish") for coin, minutes in rows],
+        columns=["timestamp", "coin", "direction"],
+    )
+
+
+def test_enrich_rerun_makes_no_requests(binance, tmp_path):
+    binance.script["NOPEUSDT"] = "invalid"
+    store = CandleStore(str(tmp_path))
+    df = signals(("BTC", 0), ("BTC", 30), ("ETH", 5), ("NOPE", 0))
+    first = enrich_signals(df, lookahead_minutes=60, store=store, fetch=fetcher_for(binance))
+    assert sorted(first['coin']) == ["BTC", "BTC", "ETH"]
+    assert first.loc[first['coin'] == "ETH", 'entry_price'].iloc[0] == 100 + 5 + 0.5
+    assert first.loc[first['coin'] == "ETH", 'future_high'].iloc[0] == 100 + 65 + 1
+
+    seen = len(binance.requests)
+    second = enrich_signals(df, lookahead_minutes=60, store=store, fetch=fetcher_for(binance))
+    assert len(binance.requests) == seen
+    pd.testing.assert_frame_equal(first.reset_index(drop=True), second.reset_index(drop=True))
+
+
+def test_enrich_failed_chunk_only_drops_its_signals(binance, tmp_path):
+    # The second signal's window needs candles past the first request, which keeps failing
+    cutoff = T0 + 3000 * STEP
+    binance.script["BTCUSDT"] = {"fail_from": cutoff}
+    store = CandleStore(str(tmp_path))
+    df = signals(("BTC", 0), ("BTC", 3500))
+    out = enrich_signals(
+        df, lookahead_minutes=60, store=store, fetch=fetcher_for(binance, max_retries=1), merge_gap_minutes=0
+    )
+    assert out['timestamp'].tolist() == [df['timestamp'][0]]
+
+
+def test_enrich_writes_each_symbol_once(binance, tmp_path, monkeypatch):
+    store = CandleStore(str(tmp_path))
+    writes = []
+    write = store._write
+    monkeypatch.setattr(store, "_write", lambda symbol, *args: writes.append(symbol) or write(symbol, *args))
+    # A 5000-minute window takes several single-request chunks per symbol
+    out = enrich_signals(signals(("BTC", 0), ("ETH", 0)), lookahead_minutes=5000, store=store, fetch=fetcher_for(binance))
+    assert len(binance.requests) >= 10
+    assert sorted(writes) == ["BTCUSDT", "ETHUSDT"]
+    assert len(out) == 2 and len(store.load("BTCUSDT", "1m", T0, T0 + 5000 * STEP)) == 5001
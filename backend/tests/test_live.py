@@ -0,0 +1,176 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.add_prices_to_signals import ExchangeError, InvalidSymbol
+from services.candle_store import CandleStore
+from services.live import LiveSession, LiveTracker, PollingFeed, ReplayFeed
+from services.path_simulation import backtest_paths, build_candle_arrays
+
+STEP = 60_000
+T0 = 1_700_000_000_000 // STEP * STEP
+LOOKAHEAD = 120
+
+
+def random_walk(seed, n):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    open_ = np.concatenate([[100.0], close[:-1]])
+    spread = np.abs(rng.normal(0, 0.004, n)) * close
+    times = T0 + np.arange(n) * STEP
+    return np.column_stack([times, open_, np.maximum(open_, close) + spread, np.minimum(open_, close) - spread, close,
+                            np.ones(n)])
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = CandleStore(str(tmp_path))
+    for seed, symbol in enumerate(["BTCUSDT", "ETHUSDT", "SOLUSDT"]):
+        store.put(symbol, "1m", T0, T0 + 600 * STEP, random_walk(seed, 600))
+    return store
+
+
+def recorded_signals():
+    rows = [("BTC", "Bullish", 0), ("ETH", "Bearish", 10), ("SOL", "Bullish", 25), ("BTC", "Bearish", 90),
+            ("ETH", "Bullish", 200), ("SOL", "Bearish", 300), ("BTC", "Bullish", 301)]
+    return pd.DataFrame(
+        [(pd.Timestamp(T0 + minutes * STEP + 1, unit="ms", tz="UTC"), coin, direction) for coin, direction, minutes in rows],
+        columns=["timestamp", "coin", "direction"],
+    )
+
+
+def test_replay_matches_backtest(store):
+    signals = recorded_signals()
+    tracker = LiveTracker(risk_pct=0.02, risk_reward=2.0, lookahead_minutes=LOOKAHEAD)
+    feed = ReplayFeed(store, ["BTCUSDT", "ETHUSDT", "SOLUSDT"], T0, T0 + 600 * STEP)
+    tracker.run(feed, signals)
+
+    expected = backtest_paths(signals, build_candle_arrays(signals, store, LOOKAHEAD), risk_pct=0.02, risk_reward=2.0)
+    trades = sorted(tracker.closed, key=lambda t: t["id"])
+    assert not tracker.open_by_symbol
+    assert [t["outcome"] for t in trades] == expected["outcome"].tolist()
+    np.testing.assert_allclose([t["gain_pct"] for t in trades], expected["gain_pct"], atol=0.01)
+    np.testing.assert_allclose([t["exit_price"] for t in trades], expected["exit_price"])
+
+
+def test_equity_is_marked_to_market_every_candle(store):
+    tracker = LiveTracker(risk_pct=0.5, risk_reward=10.0, risk_per_trade=0.1, lookahead_minutes=LOOKAHEAD)
+    tracker.add_signal("BTC", "Bullish", T0)
+    tracker.run(ReplayFeed(store, ["BTCUSDT"], T0, T0 + 30 * STEP))
+
+    candles = store.load("BTCUSDT", "1m", T0, T0 + 30 * STEP)
+    closes = candles[:, 4]
+    assert tracker.equity_times == candles[:, 0].astype("int64").tolist()
+    np.testing.assert_allclose(tracker.equity, 1000 * (1 + 0.1 * (closes / closes[0] - 1)))
+    # Nothing closed, yet the curve follows the open position
+    assert tracker.balance == 1000 and not tracker.closed
+    assert tracker.snapshot()["equity_curve"]["total_points"] == len(candles)
+
+
+class FakeFetcher:
+    """Serves synthetic closed candles per symbol; symbols in failures raise that error instead."""
+
+    def __init__(self, failures=None):
+        self.failures = dict(failures or {})
+        self.calls = []
+
+    def __call__(self, symbol, interval, start_ms, end_ms):
+        self.calls.append(symbol)
+        if symbol in self.failures:
+            raise self.failures[symbol]
+        return [[t, 100.0, 101.0, 99.0, 100.0, 1.0] for t in range(start_ms, end_ms + 1, STEP)]
+
+
+def backdate(feed, minutes=5):
+    for symbol in feed.last_seen:
+        feed.last_seen[symbol] -= minutes * STEP
+
+
+def test_polling_failure_only_skips_its_symbol():
+    tracker = LiveTracker()
+    fetcher = FakeFetcher({"ETHUSDT": ExchangeError("HTTP 500 for ETHUSDT"), "NOPEUSDT": InvalidSymbol("Invalid symbol.")})
+    feed = PollingFeed(fetcher, symbols=["BTCUSDT", "ETHUSDT", "NOPEUSDT"], on_error=tracker.mark_error)
+    now = int(time.time() * 1000)
+    for coin in ["BTC", "ETH", "NOPE"]:
+        tracker.add_signal(coin, "Bullish", now - 10 * STEP)
+    backdate(feed)
+
+    batch = feed.poll()
+    assert {symbol for symbol, _ in batch} == {"BTCUSDT"}
+    assert len(batch) == 5
+    assert set(feed.errors) == {"ETHUSDT", "NOPEUSDT"}
+
+    # A transient error keeps the position open and the symbol subscribed
+    [eth] = tracker.open_by_symbol["ETHUSDT"]
+    assert eth.error == "HTTP 500 for ETHUSDT"
+    assert "ETHUSDT" in feed.last_seen
+    # An invalid symbol is unsubscribed and its position dropped without touching the balance
+    assert "NOPEUSDT" not in feed.last_seen and "NOPEUSDT" not in tracker.open_by_symbol
+    assert [p["outcome"] for p in tracker.snapshot()["errored_positions"]] == ["Error"]
+    assert tracker.balance == tracker.initial_balance
+
+    # ETH recovers on a later poll
+    del fetcher.failures["ETHUSDT"]
+    backdate(feed)
+    batch = feed.poll()
+    assert {symbol for symbol, _ in batch} == {"BTCUSDT", "ETHUSDT"}
+    assert "ETHUSDT" not in feed.errors
+    for symbol, candle in batch:
+        tracker.on_candle(symbol, candle)
+    assert eth.error is None and eth.entry == 100.0
+
+
+def test_session_keeps_running_when_a_symbol_fails():
+    tracker = LiveTracker()
+    fetcher = FakeFetcher({"ETHUSDT": ExchangeError("HTTP 500 for ETHUSDT")})
+    feed = PollingFeed(fetcher, poll_seconds=0.01, on_error=tracker.mark_error)
+    session = LiveSession(tracker, feed)
+    now = int(time.time() * 1000)
+    for coin in ["BTC", "ETH"]:
+        session.add_signal({"coin": coin, "direction": "Bullish", "timestamp": now - 10 * STEP})
+    backdate(feed)
+
+    fed = threading.Event()
+    on_candle = tracker.on_candle
+
+    def recording(symbol, candle):
+        fed.set()
+        return on_candle(symbol, candle)
+
+    tracker.on_candle = recording
+    session.start()
+    try:
+        assert fed.wait(5)
+        deadline = time.monotonic() + 5
+        while fetcher.calls.count("ETHUSDT") < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert session.running() and session.error is None
+        assert fetcher.calls.count("ETHUSDT") >= 2
+        assert tracker.open_by_symbol["BTCUSDT"][0].entry == 100.0
+    finally:
+        session.stop()
+
+
+def test_start_stops_the_poller_when_listening_fails(tmp_path, monkeypatch):
+    import main
+    import services.telegram_pool
+
+    class BrokenPool:
+        def peer_factory(self, channel_id, access_hash):
+            return channel_id
+
+        def run(self, coroutine):
+            coroutine.close()
+            raise ConnectionError("Telegram unreachable")
+
+    monkeypatch.setattr(services.telegram_pool, "shared_pool", BrokenPool)
+    monkeypatch.setattr(main, "live", None)
+    client = main.create_app(data_dir=str(tmp_path)).test_client()
+    response = client.post("/api/live/start", json={"channels": [{"channel_id": 1, "access_hash": 2}]})
+    assert response.status_code == 500
+    assert "Telegram unreachable" in response.get_json()["error"]
+    assert not main.live.running()
+    assert main.live.feed.stopped.is_set()
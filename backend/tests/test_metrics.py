@@ -0,0 +1,18 @@
+import pandas as pd
+import pytest
+
+from services.metrics import trade_metrics
+from services.simulation import run_simulation_logic
+
+
+@pytest.mark.parametrize("gains", [[], [0.0, 0.0], [2.0, 1.0]])
+def test_profit_factor_is_none_without_losing_trades(gains):
+    assert trade_metrics(gains, 0.01)["profit_factor"] is None
+
+
+def test_profit_factor_with_losses():
+    assert trade_metrics([3.0, -1.0, 1.0, -1.0], 0.01)["profit_factor"] == pytest.approx(2.0)
+
+
+def test_empty_simulation_uses_the_same_convention():
+    assert run_simulation_logic(pd.DataFrame(), 2, 6, 1)["profit_factor"] is None
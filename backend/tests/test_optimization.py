@@ -0,0 +1,36 @@
+import types
+
+import numpy as np
+import pandas as pd
+
+from services.optimize_strategy import optimize_strategy
+
+
+def backtested(n=200, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "timestamp": pd.date_range("2024-01-01", periods=n, freq="h", tz="UTC"),
+        "coin": "BTC",
+        "direction": rng.choice(["Bullish", "Bearish", "Neutral"], n),
+        "gain_pct": rng.normal(1, 4, n),
+        "drawdown_pct": -np.abs(rng.normal(2, 2, n)),
+    })
+
+
+def test_summary_csv_keeps_its_columns(tmp_path):
+    result = optimize_strategy(backtested(), sl_values=[1, 2], tp_values=[3, 4], output_dir=str(tmp_path))
+    saved = pd.read_csv(tmp_path / "strategy_summary.csv")
+    assert list(saved.columns) == ['SL%', 'TP%', 'Final Balance', 'Total Return %']
+    assert 'Max Drawdown %' in result.columns
+
+
+def test_both_optimization_paths_return_the_same_records(monkeypatch):
+    import main
+    df = backtested()
+    monkeypatch.setattr(main, "load_session", lambda *args: df)
+    ctx = types.SimpleNamespace(progress=lambda *args: None, check_cancelled=lambda: None, cancel_event=None)
+    in_process = main.run_optimization(ctx, "s", top_n=100)
+    pooled = main.run_optimization(ctx, "s", processes=2, top_n=100)
+    assert list(in_process[0]) == main.OPTIMIZATION_COLUMNS
+    key = lambda record: (record['SL%'], record['TP%'])
+    assert sorted(in_process, key=key) == sorted(pooled, key=key)
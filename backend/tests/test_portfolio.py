@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.portfolio import portfolio_backtest
+
+STEP = 60_000
+T0 = pd.Timestamp("2024-01-01", tz="UTC")
+
+
+def session(rows):
+    return pd.DataFrame(
+        [(T0 + pd.Timedelta(minutes=m), coin, direction, gain) for coin, direction, m, gain in rows],
+        columns=["timestamp", "coin", "direction", "gain_pct"],
+    )
+
+
+CLEAN = [("BTC", "Bullish", 0, 6.0), ("ETH", "Bearish", 30, -2.0), ("SOL", "Bullish", 400, 3.0)]
+BROKEN = [("XRP", "Bullish", 10, np.nan), ("ADA", "Neutral", 20, 5.0), ("DOT", None, 40, 1.0)]
+
+
+def marks_for(df):
+    # One synthetic candle path per row, so a row's marks identify it
+    rows = np.arange(len(df), dtype=np.float32)
+    return {
+        "start_ms": (pd.to_datetime(df['timestamp']).astype("int64") // 1_000_000).to_numpy(),
+        "step_ms": STEP,
+        "returns": np.repeat((rows[:, None] + 1) / 100, 360, axis=1),
+    }
+
+
+def test_untradable_rows_are_left_out():
+    clean = portfolio_backtest(session(CLEAN), max_positions=5)
+    mixed = portfolio_backtest(session(CLEAN[:1] + BROKEN + CLEAN[1:]), max_positions=5)
+    assert mixed["invalid_signals"] == 3 and clean["invalid_signals"] == 0
+    assert {k: v for k, v in mixed.items() if k != "invalid_signals"} == \
+        {k: v for k, v in clean.items() if k != "invalid_signals"}
+    assert np.isfinite(mixed["final_balance"])
+
+
+def test_marks_follow_the_session_rows():
+    clean_df = session(CLEAN)
+    mixed_df = session(BROKEN + CLEAN)
+    # The mixed session's marks keep its own row order, with the broken rows first
+    mixed_marks = marks_for(mixed_df)
+    mixed_marks["returns"] = np.concatenate([np.full((3, 360), 9.0, dtype=np.float32), marks_for(clean_df)["returns"]])
+    clean = portfolio_backtest(clean_df, marks=marks_for(clean_df))
+    mixed = portfolio_backtest(mixed_df, marks=mixed_marks)
+    assert mixed["mark_to_market"]
+    assert mixed["equity_curve"] == clean["equity_curve"]
+    assert mixed["max_drawdown_pct"] == clean["max_drawdown_pct"]
+
+
+def test_marks_with_an_empty_first_path(tmp_path, recwarn):
+    from services.candle_store import CandleStore
+    from services.path_simulation import build_candle_arrays
+    from services.portfolio import path_marks
+
+    store = CandleStore(str(tmp_path))
+    start = int(T0.value // 1_000_000)
+    # BTC closes 0.1 higher every minute; XRP, the first signal, has no stored candles
+    store.put("BTCUSDT", "1m", start, start + 300 * STEP,
+              [[start + i * STEP, 100, 100 + i * 0.1, 100, 100 + i * 0.1, 1] for i in range(300)])
+    df = session([("XRP", "Bullish", 0, 0.0), ("BTC", "Bullish", 10, 20.0)])
+    df["exit_time"] = df["timestamp"] + pd.Timedelta(minutes=60)
+    marks = path_marks(df, build_candle_arrays(df, store, 120))
+    assert marks["step_ms"] == STEP
+
+    result = portfolio_backtest(df, risk_per_trade=0.1, marks=marks)
+    assert not [w for w in recwarn if issubclass(w.category, RuntimeWarning)]
+    # When XRP exits (minute 60) BTC, entered at the minute 10 close, is marked at the minute 60 close
+    times, equity = result["equity_curve"]["timestamps"], result["equity_curve"]["equity"]
+    assert equity[times.index("2024-01-01 01:00")] == pytest.approx(1000 + 100 * (106 / 101 - 1), abs=0.01)
@@ -0,0 +1,66 @@
+import math
+
+import pytest
+
+from services.signal_parser import DEFAULT_PATTERNS, LONG_SHORT_PATTERN, PATTERNS, parse_messages, patterns_for
+
+ALL_PATTERNS = list(PATTERNS.values())
+
+
+def parse_one(text, patterns=DEFAULT_PATTERNS):
+    parsed = parse_messages([text], patterns)
+    return parsed.iloc[0] if len(parsed) else None
+
+
+@pytest.mark.parametrize("text", [
+    "#BTC Bullish\nTP 15000",
+    "#BTC Bullish\nTP1: 15000",
+    "#BTC Bullish\nTarget 1 15000",
+    "#BTC Bullish\nTP 1 = 15000",
+    "#BTC Bullish\ntarget: 15k",
+])
+def test_take_profit_label_does_not_eat_the_price(text):
+    assert parse_one(text)['take_profit'] == 15000
+
+
+def test_levels():
+    row = parse_one("#BTC Bullish\n\n- IP at 79k\nSL 74k TP 90k 10x")
+    assert (row['entry'], row['stop_loss'], row['take_profit'], row['leverage']) == (79000, 74000, 90000, 10)
+
+
+def test_hashtag_only_by_default():
+    assert DEFAULT_PATTERNS == [PATTERNS["hashtag"]]
+    assert parse_one("LONG BTCUSDT entry 42000") is None
+
+
+@pytest.mark.parametrize("text, coin", [
+    ("LONG BTCUSDT entry 42000", "BTC"),
+    ("SHORT ETH/USDT stop 3500", "ETH"),
+    ("long #SOL", "SOL"),
+    ("short $PEPE", "PEPE"),
+    ("LONG USDT entry 1", "USDT"),
+])
+def test_long_short_coin(text, coin):
+    assert parse_one(text, ALL_PATTERNS)['coin'] == coin
+
+
+@pytest.mark.parametrize("text", [
+    "long term view on the market",
+    "LONG TERM VIEW",
+    "SHORT SQUEEZE incoming, 3x volume",
+])
+def test_long_short_ignores_prose(text):
+    assert parse_one(text, ALL_PATTERNS) is None
+
+
+def test_long_short_direction_and_missing_levels():
+    row = parse_one("SHORT #ETH", ALL_PATTERNS)
+    assert row['direction'] == "Bearish" and row['pattern'] == LONG_SHORT_PATTERN.name
+    assert math.isnan(row['entry']) and math.isnan(row['take_profit'])
+
+
+def test_patterns_for():
+    assert patterns_for(None) == DEFAULT_PATTERNS
+    assert patterns_for(["long_short"]) == [LONG_SHORT_PATTERN]
+    with pytest.raises(ValueError):
+        patterns_for(["nope"])
@@ -0,0 +1,33 @@
+import json
+import os
+import subprocess
+import sys
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+HEAVY = ("pandas", "numpy", "telethon")
+SCRIPT = """
+import json, sys, tempfile
+import main
+after_import = sorted(sys.modules)
+with tempfile.TemporaryDirectory() as data_dir:
+    main.create_app(data_dir=data_dir)
+print(json.dumps([after_import, sorted(sys.modules)]))
+"""
+
+
+def loaded_modules():
+    """Modules loaded by `import main` and then by create_app(), in a fresh interpreter without Telegram credentials."""
+    env = {k: v for k, v in os.environ.items() if k not in ("API_ID", "API_HASH", "PHONE_NUMBER")}
+    proc = subprocess.run([sys.executable, "-c", SCRIPT], cwd=APP_DIR, env=env, capture_output=True, text=True,
+                          check=True)
+    return [set(modules) for modules in json.loads(proc.stdout.splitlines()[-1])]
+
+
+def heavy(modules, names):
+    return sorted(m for m in modules if m.split(".")[0] in names)
+
+
+def test_import_main_stays_light():
+    after_import, after_create = loaded_modules()
+    assert not heavy(after_import, HEAVY), "imported by `import main`"
+    assert not heavy(after_create, ("telethon",)), "imported by create_app()"
@@ -0,0 +1,104 @@
+import pytest
+
+from fakes import FakeClient, channel_messages, fake_pool
+from services.jobs import JobCancelled
+
+
+def channel(channel_id, **extra):
+    return {"channel_id": channel_id, "access_hash": channel_id * 10, **extra}
+
+
+def test_extracts_many_channels_with_one_login():
+    client = FakeClient({
+        1: channel_messages(["#BTC Bullish", "#ETH Bearish"]),
+        2: channel_messages(["#SOL Bullish"]),
+        3: channel_messages(["nothing here"]),
+    }, delay=0.01)
+    pool = fake_pool(client, max_concurrency=2)
+    try:
+        signals, newest, errors = pool.extract_channels([channel(1), channel(2), channel(3)], months_back=1)
+        pool.extract_channels([channel(2, min_id=1)], months_back=1)
+    finally:
+        pool.close()
+    assert client.logins == 1
+    assert client.disconnected
+    assert client.peak_active == 2
+    assert not errors
+    assert newest == {1: 2, 2: 1, 3: 1}
+    assert sorted(zip(signals['channel_id'], signals['coin'])) == [(1, "BTC"), (1, "ETH"), (2, "SOL")]
+    assert signals['timestamp'].is_monotonic_decreasing
+
+
+def test_flood_wait_pauses_every_channel():
+    client = FakeClient(
+        {1: channel_messages(["#BTC Bullish"]), 2: channel_messages(["#ETH Bullish"])},
+        floods={1: 1}, flood_seconds=0.3, delay=0.05
+    )
+    pool = fake_pool(client, max_concurrency=1)
+    try:
+        signals, _, errors = pool.extract_channels([channel(1), channel(2)], months_back=1)
+    finally:
+        pool.close()
+    assert not errors and len(signals) == 2
+    peers = [peer for peer, _, _ in client.calls]
+    assert peers == [1, 2, 1] or peers == [1, 1, 2]
+    # Whatever ran after the flood wait started at least flood_seconds later
+    assert min(client.call_times[1:]) - client.call_times[0] >= 0.3
+
+
+def test_gives_up_after_max_flood_retries():
+    client = FakeClient({1: channel_messages(["#BTC Bullish"])}, floods={1: 5})
+    pool = fake_pool(client, max_flood_retries=2)
+    try:
+        signals, newest, errors = pool.extract_channels([channel(1)], months_back=1)
+    finally:
+        pool.close()
+    assert len(client.calls) == 3
+    assert signals.empty and newest == {}
+    assert errors[1].startswith("FloodWaitError")
+
+
+def test_channel_error_does_not_stop_others():
+    client = FakeClient(
+        {1: channel_messages(["#BTC Bullish"]), 2: channel_messages(["#ETH Bullish"])},
+        errors={2: ValueError("channel is private")}
+    )
+    pool = fake_pool(client)
+    try:
+        signals, newest, errors = pool.extract_channels([channel(1), channel(2)], months_back=1)
+    finally:
+        pool.close()
+    assert signals['coin'].tolist() == ["BTC"]
+    assert newest == {1: 1}
+    assert errors == {2: "ValueError: channel is private"}
+
+
+def test_progress_exception_aborts_all_channels():
+    texts = ["#BTC Bullish"] * 2000
+    client = FakeClient({1: channel_messages(texts), 2: channel_messages(texts)})
+    pool = fake_pool(client)
+
+    def progress(scanned):
+        raise JobCancelled()
+
+    try:
+        with pytest.raises(JobCancelled):
+            pool.extract_channels([channel(1), channel(2)], months_back=1, progress=progress)
+        # The pool stays usable after an aborted run
+        signals, _, _ = pool.extract_channels([channel(1)], months_back=1, limit=3)
+    finally:
+        pool.close()
+    assert len(signals) == 3
+
+
+def test_channel_patterns_are_opt_in():
+    texts = ["LONG BTCUSDT entry 42000 stop 40000", "#ETH Bullish"]
+    client = FakeClient({1: channel_messages(texts), 2: channel_messages(texts)})
+    pool = fake_pool(client)
+    try:
+        signals, _, _ = pool.extract_channels(
+            [channel(1), channel(2, patterns=["hashtag", "long_short"])], months_back=1
+        )
+    finally:
+        pool.close()
+    assert sorted(zip(signals['channel_id'], signals['coin'])) == [(1, "ETH"), (2, "BTC"), (2, "ETH")]
@@ -0,0 +1,35 @@
+import threading
+
+import pytest
+from flask import Flask
+
+from services import telemetry
+
+
+def profiler_threads():
+    return [t for t in threading.enumerate() if t.name == "sampling-profiler"]
+
+
+def test_profiler_stops_when_the_view_raises():
+    app = Flask(__name__)
+    telemetry.install(app, enable_profiler=True)
+
+    @app.route("/boom")
+    def boom():
+        raise RuntimeError("boom")
+
+    @app.route("/ok")
+    def ok():
+        return "ok"
+
+    client = app.test_client()
+    assert client.get("/boom?profile=1").status_code == 500
+    assert not profiler_threads()
+    # With propagating exceptions (debug, testing) after_request never runs
+    app.config["PROPAGATE_EXCEPTIONS"] = True
+    with pytest.raises(RuntimeError):
+        client.get("/boom?profile=1")
+    assert not profiler_threads()
+    response = client.get("/ok?profile=1")
+    assert response.headers["X-Profile-Id"] in telemetry.profiles
+    assert not profiler_threads()